@@ -1,10 +1,81 @@
+import re
 import sqlite3
 import pickle
+from blobcodecs import decode_blob, encoder
+from functools import lru_cache
+from itertools import chain, islice
 import unittest
 
+# default SQLITE_MAX_VARIABLE_NUMBER of the linked library
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+TOKEN = re.compile(r'\w+')
+
+# value positions insert() encodes into blobs, and the blobcodecs codec for each;
+# plain pickle is what insert() has always stored in the photo and html columns
+DEFAULT_BLOB_CODECS = {2: 'pickle', 3: 'pickle'}
+
+class Statement:
+    """A compiled statement: its SQL text plus the function that turns call
+    arguments into the parameter tuple. Shared by every call with the same
+    shape. Equality and hashing use command, table, fields and sql only, so
+    statements for the same SQL compare equal even when they were compiled
+    separately (before and after set_codec, say) and carry different binders."""
+    __slots__ = ('command', 'table', 'fields', 'sql', 'binder')
+
+    def __init__(self, command, table, fields, sql, binder):
+        self.command = command
+        self.table = table
+        self.fields = fields
+        self.sql = sql
+        self.binder = binder
+
+    def _key(self):
+        return self.command, self.table, self.fields, self.sql
+
+    def __eq__(self, other):
+        if not isinstance(other, Statement):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Statement(command={self.command!r}, table={self.table!r}, sql={self.sql!r})"
+
+    def bind(self, *args):
+        return self.binder(*args)
+
+
+def _no_params(*args):
+    return ()
+
+
+def _set_values(set_data):
+    # the statement is keyed on tuple(set_data), so values come out in placeholder order
+    return tuple(set_data.values())
+
+
+def match_expression(search_term, prefix=True):
+    """An FTS5 MATCH string requiring every word of search_term, each as a prefix when prefix is set."""
+    tokens = TOKEN.findall(search_term)
+    assert tokens, "Search term must contain a word."
+    return ' '.join(f'"{token}"' + ('*' if prefix else '') for token in tokens)
+
+
+def _match_params(search_term, prefix=True, limit=None):
+    return match_expression(search_term, prefix), -1 if limit is None else limit
+
+
+def _like_pattern(search_term):
+    assert search_term, "Search term cannot be empty."
+    return (f'%{search_term}%',)
+
+
 #the SQL query builder class
 class QueryBuilder:
-    def __init__(self):
+    def __init__(self, cache_size=1024, blob_codecs=None):
         self.command_map = {
             "select": self.select,
             "insert": self.insert,
@@ -14,6 +85,19 @@ class QueryBuilder:
             "connect": self.connect,
             "search": self.search
         }
+        self.builders = {
+            "select": self.build_select,
+            "insert": self.build_insert,
+            "insert_rows": self.build_insert_rows,
+            "delete": self.build_delete,
+            "update": self.build_update,
+            "create_table": self.build_create_table,
+            "search": self.build_search,
+            "full_text_search": self.build_full_text_search,
+        }
+        self.blob_codecs = dict(DEFAULT_BLOB_CODECS if blob_codecs is None else blob_codecs)
+        # LRU of compiled statements keyed by (command, table, *shape)
+        self.statement = lru_cache(maxsize=cache_size)(self.compile)
 
     def query(self, table, command_type, *args):
         command_type = command_type.lower()
@@ -24,48 +108,156 @@ class QueryBuilder:
         except Exception as e:
             raise sqlite3.Error(f"An error occurred: {e}")
 
+    def compile(self, command, table, *shape):
+        """Validates and builds the Statement for a command on a table.
+
+        Callers go through self.statement, the memoized form, so this runs
+        only the first time a shape is seen.
+        """
+        return self.builders[command](table, *shape)
+
+    def set_codec(self, position, codec):
+        """Encodes value position of inserted rows with codec from now on; None stores it as is."""
+        if codec is None:
+            self.blob_codecs.pop(position, None)
+        else:
+            encoder(codec)
+            self.blob_codecs[position] = codec
+        # compiled insert statements carry the old binders
+        self.statement.cache_clear()
+
+    def decode_row(self, row):
+        """Reverses the blob encoding of a fetched row; each blob's header names its codec."""
+        row = list(row)
+        for position in self.blob_codecs:
+            if position < len(row) and isinstance(row[position], bytes):
+                row[position] = decode_blob(row[position])
+        return tuple(row)
+
+    def blob_binder(self):
+        encoders = tuple((position, encoder(codec)) for position, codec in sorted(self.blob_codecs.items()))
+
+        def bind(values):
+            params = list(values)
+            for position, encode in encoders:
+                if position < len(params):
+                    params[position] = encode(params[position])
+            return tuple(params)
+        return bind
+
+    def statement_stats(self):
+        info = self.statement.cache_info()
+        lookups = info.hits + info.misses
+        return {"size": info.currsize, "max_size": info.maxsize, "hits": info.hits,
+                "misses": info.misses, "hit_rate": info.hits / lookups if lookups else 0.0}
+
     def select(self, table, fields='*', condition=''):
+        return self.statement("select", table, fields, condition).sql
+
+    def insert(self, table, fields, values):
+        statement = self.statement("insert", table, fields, len(values))
+        return statement.sql, statement.binder(values)
+
+    def insert_many(self, table, fields, rows, mode="values", max_variables=SQLITE_MAX_VARIABLES):
+        """Plans the insert of an iterable of rows; yields (query, params) pairs.
+
+        mode="values" yields one multi-row INSERT ... VALUES (...), (...) per
+        chunk, with as many rows as fit in max_variables placeholders and the
+        params flattened. mode="executemany" yields a single pair whose params
+        is a lazy iterator of row tuples for cursor.executemany. Rows are
+        read from the iterable only as the plan is consumed, and are bound
+        the same way insert() binds them.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        rows = chain((first,), rows)
+        value_count = len(first)
+        if mode == "executemany":
+            statement = self.statement("insert", table, fields, value_count)
+            yield statement.sql, map(statement.binder, rows)
+            return
+        if mode != "values":
+            raise ValueError(f"Unknown insert_many mode: {mode}")
+        chunk_size = max(1, max_variables // value_count)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            statement = self.statement("insert_rows", table, fields, value_count, len(chunk))
+            yield statement.sql, statement.binder(chunk)
+
+    def delete(self, table, condition):
+        return self.statement("delete", table, condition).sql
+
+    def update(self, table, set_data, condition):
+        statement = self.statement("update", table, tuple(set_data), condition)
+        return statement.sql, statement.binder(set_data)
+
+    def create_table(self, table, fields):
+        return self.statement("create_table", table, fields).sql
+
+    def connect(self, _, database_name):
+        assert database_name, "Database name cannot be empty."
+        return f"CONNECT TO DATABASE {database_name}"
+
+    def search(self, table, search_term, full_text=False, prefix=True, limit=None):
+        """LIKE search on the name column, or with full_text a ranked MATCH
+        against the <table>_fts index that searchindex.SearchIndex maintains."""
+        if full_text:
+            statement = self.statement("full_text_search", table)
+            return statement.sql, statement.binder(search_term, prefix, limit)
+        statement = self.statement("search", table)
+        return statement.sql, statement.binder(search_term)
+
+    def build_select(self, table, fields='*', condition=''):
         self.validate_table_and_fields(table, fields)
         query = f"SELECT {fields} FROM {table}"
         query += f" WHERE {condition}" if condition else ""
-        return query
+        return Statement("select", table, fields, query, _no_params)
 
-    def insert(self, table, fields, values):
-        self.validate_table_fields_values(table, fields, values)
-        pickled_values = list(values)
-        if len(values) >= 3:
-            pickled_values[2] = pickle.dumps(values[2]) 
-        if len(values) >= 4:
-            pickled_values[3] = pickle.dumps(values[3]) 
-
-        placeholders = ', '.join(['?'] * len(pickled_values))
+    def build_insert(self, table, fields, value_count):
+        self.validate_table_fields_values(table, fields, value_count)
+        placeholders = ', '.join(['?'] * value_count)
         query = f"INSERT INTO {table} {fields} VALUES ({placeholders})"
-        return query, tuple(pickled_values)
+        return Statement("insert", table, fields, query, self.blob_binder())
 
-    def delete(self, table, condition):
+    def build_insert_rows(self, table, fields, value_count, row_count):
+        self.validate_table_fields_values(table, fields, value_count)
+        row = f"({', '.join(['?'] * value_count)})"
+        query = f"INSERT INTO {table} {fields} VALUES {', '.join([row] * row_count)}"
+        bind = self.blob_binder()
+        return Statement("insert_rows", table, fields, query,
+                         lambda rows: tuple(chain.from_iterable(map(bind, rows))))
+
+    def build_delete(self, table, condition):
         self.validate_table_and_condition(table, condition)
         query = f"DELETE FROM {table} WHERE {condition}"
-        return query
+        return Statement("delete", table, condition, query, _no_params)
 
-    def update(self, table, set_data, condition):
-        self.validate_table_set_data_condition(table, set_data, condition)
-        set_clause = ', '.join([f"{key} = ?" for key in set_data.keys()])
+    def build_update(self, table, keys, condition):
+        self.validate_table_set_data_condition(table, keys, condition)
+        set_clause = ', '.join([f"{key} = ?" for key in keys])
         query = f"UPDATE {table} SET {set_clause} WHERE {condition}"
-        return query, tuple(set_data.values())
+        return Statement("update", table, keys, query, _set_values)
 
-    def create_table(self, table, fields):
+    def build_create_table(self, table, fields):
         self.validate_table_and_fields(table, fields)
         query = f"CREATE TABLE {table} ({fields})"
-        return query
-
-    def connect(self, _, database_name):
-        assert database_name, "Database name cannot be empty."
-        return f"CONNECT TO DATABASE {database_name}"
+        return Statement("create_table", table, fields, query, _no_params)
 
-    def search(self, table, search_term):
-        self.validate_table_and_fields(table, search_term)
+    def build_search(self, table):
+        self.validate_table_and_fields(table, "name")
         query = f"SELECT * FROM {table} WHERE name LIKE ?"
-        return query, (f'%{search_term}%',)
+        return Statement("search", table, ("name",), query, _like_pattern)
+
+    def build_full_text_search(self, table):
+        self.validate_table_and_fields(table, "*")
+        fts = f"{table}_fts"
+        query = (f"SELECT {table}.* FROM {fts} JOIN {table} ON {table}.rowid = {fts}.rowid "
+                 f"WHERE {fts} MATCH ? ORDER BY {fts}.rank LIMIT ?")
+        return Statement("full_text_search", table, ("*",), query, _match_params)
 
     def validate_table_and_fields(self, table, fields):
         assert table and fields, "Table name and fields cannot be empty."
@@ -98,6 +290,33 @@ class TestQueryBuilder(unittest.TestCase):
         self.assertEqual(query, expected_query)
         self.assertEqual(query_values, (3, "bobdwarf", pickle.dumps("bobdwarf.png"), pickle.dumps("bobdwarf.html")))
 
+    def test_insert_many(self):
+        rows = ((i, f"name{i}", f"{i}.png") for i in range(7))
+        plan = list(self.qBuilder.insert_many("exampleTable", "(id, name, photo)", rows, max_variables=9))
+        self.assertEqual([len(params) for _, params in plan], [9, 9, 3])
+        self.assertEqual(plan[2][0], "INSERT INTO exampleTable (id, name, photo) VALUES (?, ?, ?)")
+        self.assertEqual(plan[0][1][:3], (0, "name0", pickle.dumps("0.png")))
+
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE exampleTable (id INTEGER, name TEXT, photo BLOB)")
+        rows = ((i, f"name{i}", f"{i}.png") for i in range(5))
+        for query, params in self.qBuilder.insert_many("exampleTable", "(id, name, photo)", rows, mode="executemany"):
+            conn.executemany(query, params)
+        self.assertEqual(conn.execute("SELECT COUNT(*), MAX(id) FROM exampleTable").fetchone(), (5, 4))
+        conn.close()
+        self.assertEqual(list(self.qBuilder.insert_many("exampleTable", "(id)", [])), [])
+
+    def test_blob_codecs(self):
+        builder = QueryBuilder(blob_codecs={2: 'raw', 3: 'zlib'})
+        html = "<html>" + "bobdwarf " * 100 + "</html>"
+        query, values = builder.insert("exampleTable", "(id, name, photo, html)", (3, "bob", b"\x89PNG", html))
+        self.assertEqual(values[2], b"\x01\x89PNG")
+        self.assertLess(len(values[3]), len(html) // 10)
+        self.assertEqual(builder.decode_row(values), (3, "bob", b"\x89PNG", html))
+        self.assertEqual(self.qBuilder.decode_row((1, "a", pickle.dumps("a.png"), None)), (1, "a", "a.png", None))
+        builder.set_codec(3, None)
+        self.assertEqual(builder.insert("exampleTable", "(id, name, photo, html)", (3, "bob", b"", html))[1][3], html)
+
     def test_delete(self):
         condition = "id = 1"
         query = self.qBuilder.query("exampleTable", "delete", condition)
@@ -131,6 +350,34 @@ class TestQueryBuilder(unittest.TestCase):
         self.assertEqual(query, expected_query)
         self.assertEqual(query_values, expected_values)
 
+    def test_statements_are_memoized_by_shape(self):
+        first = self.qBuilder.statement("insert", "exampleTable", "(id, name)", 2)
+        second = self.qBuilder.statement("insert", "exampleTable", "(id, name)", 2)
+        self.assertIs(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(first.bind((1, "ceres")), (1, "ceres"))
+        self.qBuilder.update("exampleTable", {"name": "a", "id": 2}, "id = 1")
+        query, values = self.qBuilder.update("exampleTable", {"name": "b", "id": 3}, "id = 1")
+        self.assertEqual(values, ("b", 3))
+        stats = self.qBuilder.statement_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.qBuilder.set_codec(1, 'raw')
+        recompiled = self.qBuilder.statement("insert", "exampleTable", "(id, name)", 2)
+        self.assertIsNot(recompiled, first)
+        self.assertEqual((recompiled, hash(recompiled)), (first, hash(first)))
+        self.assertEqual(len({first, recompiled}), 1)
+        self.assertNotEqual(recompiled.bind((1, b"c")), first.bind((1, b"c")))
+
+    def test_statement_cache_is_bounded(self):
+        builder = QueryBuilder(cache_size=2)
+        for i in range(3):
+            builder.delete("exampleTable", f"id = {i}")
+        self.assertEqual(builder.statement_stats()["size"], 2)
+        builder.delete("exampleTable", "id = 0")
+        self.assertEqual(builder.statement_stats()["misses"], 4)
+        with self.assertRaises(sqlite3.Error):
+            builder.query("exampleTable", "update", {}, "id = 1")
+
     def test_invalid_command(self):
         with self.assertRaises(sqlite3.Error):
             self.qBuilder.query("exampleTable", "invalid_command")
@@ -0,0 +1,174 @@
+import lzma
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+import unittest
+
+# Every encoded blob starts with the id byte of the codec that wrote it, so
+# decode_blob() needs no column metadata. Plain pickle.dumps output (what
+# QueryBuilder.insert always stored) starts with the PROTO opcode 0x80 and is
+# read as the "pickle" codec, whose id is that opcode.
+Codec = namedtuple('Codec', ['name', 'id', 'encode', 'decode'])
+
+CODECS = {}
+CODEC_IDS = {}
+
+PICKLE5_HEADER = struct.Struct('<I')    # out-of-band buffer count
+BUFFER_LENGTH = struct.Struct('<Q')
+NUMERIC_TYPES = {int: 'q', bool: 'q', float: 'd'}
+
+
+def register(name, codec_id, encode, decode):
+    """Adds a codec. encode(value) returns the body; decode(view) reads it back from a memoryview."""
+    if codec_id in CODEC_IDS:
+        raise ValueError(f"Codec id {codec_id:#x} is already used by {CODEC_IDS[codec_id].name}.")
+    codec = CODECS[name] = CODEC_IDS[codec_id] = Codec(name, codec_id, encode, decode)
+    return codec
+
+
+def encode_blob(value, codec='pickle5'):
+    codec = CODECS[codec]
+    if codec.name == 'pickle':
+        return codec.encode(value)
+    return bytes((codec.id,)) + codec.encode(value)
+
+
+def encoder(codec):
+    """A one-argument function encoding values with the named codec."""
+    codec = CODECS[codec]
+    if codec.name == 'pickle':
+        return codec.encode
+    header, encode = bytes((codec.id,)), codec.encode
+    return lambda value: header + encode(value)
+
+
+def decode_blob(data):
+    """Decodes a blob written by any registered codec, picked by its first byte."""
+    view = memoryview(data)
+    try:
+        codec = CODEC_IDS[view[0]]
+    except (KeyError, IndexError):
+        raise ValueError("Blob has no recognised codec header.")
+    return codec.decode(view if codec.name == 'pickle' else view[1:])
+
+
+def _little_endian(arr):
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def _encode_raw(value):
+    return bytes(value)
+
+
+def _encode_text(value):
+    return value.encode('utf-8')
+
+
+def _decode_text(view):
+    return str(view, 'utf-8')
+
+
+def _encode_pickle5(value):
+    """Protocol 5 with PickleBuffer-backed data (NumPy arrays, wrapped bytes) kept out of band.
+
+    Layout: buffer count, each buffer's length, the pickle stream's length,
+    the pickle stream, then the buffers themselves, uncopied by pickle.
+    """
+    buffers = []
+    stream = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    parts = [PICKLE5_HEADER.pack(len(raws))]
+    parts.extend(BUFFER_LENGTH.pack(raw.nbytes) for raw in raws)
+    parts.append(BUFFER_LENGTH.pack(len(stream)))
+    parts.append(stream)
+    parts.extend(raws)
+    return b''.join(parts)
+
+
+def _decode_pickle5(view):
+    (count,) = PICKLE5_HEADER.unpack_from(view)
+    offset = PICKLE5_HEADER.size
+    lengths = [BUFFER_LENGTH.unpack_from(view, offset + i * BUFFER_LENGTH.size)[0] for i in range(count + 1)]
+    offset += (count + 1) * BUFFER_LENGTH.size
+    stream = view[offset:offset + lengths[-1]]
+    offset += lengths[-1]
+    buffers = []
+    for length in lengths[:-1]:
+        buffers.append(view[offset:offset + length])
+        offset += length
+    return pickle.loads(stream, buffers=buffers)
+
+
+def _encode_any(value):
+    """Picks raw, text or pickle5 for a value; used inside the compressing codecs."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return encode_blob(value, 'raw')
+    if isinstance(value, str):
+        return encode_blob(value, 'text')
+    return encode_blob(value, 'pickle5')
+
+
+def _encode_numeric(values):
+    """A sequence of all-int or all-float numbers as a typecode byte and a little-endian array."""
+    typecodes = {NUMERIC_TYPES.get(t) for t in set(map(type, values))}
+    if None in typecodes:
+        raise TypeError("The numeric codec only stores ints and floats.")
+    typecode = 'd' if 'd' in typecodes else 'q'
+    return typecode.encode() + _little_endian(array(typecode, values)).tobytes()
+
+
+def _decode_numeric(view):
+    arr = array(chr(view[0]))
+    arr.frombytes(view[1:])
+    return _little_endian(arr).tolist()
+
+
+register('raw', 0x01, _encode_raw, bytes)
+register('text', 0x02, _encode_text, _decode_text)
+register('pickle5', 0x03, _encode_pickle5, _decode_pickle5)
+register('zlib', 0x04, lambda value: zlib.compress(_encode_any(value), 6),
+         lambda view: decode_blob(zlib.decompress(view)))
+register('lzma', 0x05, lambda value: lzma.compress(_encode_any(value), preset=1),
+         lambda view: decode_blob(lzma.decompress(view)))
+register('numeric', 0x06, _encode_numeric, _decode_numeric)
+register('pickle', 0x80, pickle.dumps, pickle.loads)
+
+
+class TestBlobCodecs(unittest.TestCase):
+    def test_round_trips(self):
+        page = "<html>" + "dwarf planet " * 200 + "</html>"
+        cases = [('raw', b'\x89PNG\x00'), ('text', page), ('pickle5', {'name': 'Ceres', 'a': 2.77}),
+                 ('zlib', page), ('lzma', b'\x00' * 1000), ('zlib', [1, 'two']),
+                 ('numeric', [1, 2, 3]), ('numeric', [1.5, 2, -3.25]), ('pickle', ('legacy', 1))]
+        for codec, value in cases:
+            with self.subTest(codec=codec):
+                blob = encode_blob(value, codec)
+                self.assertEqual(blob[0], CODECS[codec].id)
+                self.assertEqual(decode_blob(blob), value)
+        self.assertLess(len(encode_blob(page, 'zlib')), len(page) // 10)
+
+    def test_pickle5_out_of_band_buffers(self):
+        photo = b'\xff' * 4096
+        blob = encode_blob({'photo': pickle.PickleBuffer(photo), 'name': 'Eris'}, 'pickle5')
+        (count,) = PICKLE5_HEADER.unpack_from(blob, 1)
+        self.assertEqual(count, 1)
+        decoded = decode_blob(blob)
+        self.assertEqual((bytes(decoded['photo']), decoded['name']), (photo, 'Eris'))
+
+    def test_legacy_pickle_and_bad_headers(self):
+        self.assertEqual(decode_blob(pickle.dumps("bobdwarf.png")), "bobdwarf.png")
+        with self.assertRaises(ValueError):
+            decode_blob(b'\x7fjunk')
+        with self.assertRaises(TypeError):
+            encode_blob([1, 'x'], 'numeric')
+        with self.assertRaises(ValueError):
+            register('again', 0x01, bytes, bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,344 @@
+import csv
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
+from array import array
+import numpy as np
+import unittest
+
+INDEX_STEP = 50_000
+SIDECAR_VERSION = 1
+
+
+class CSVOffsetIndex:
+    """Byte offset of every record in a CSV file, so any row range is one seek away.
+
+    build() makes a single pass over the file in binary and yields as it
+    goes, so rows already indexed can be read while the rest of a large file
+    is still being scanned. A line with an odd number of quote characters
+    opens or closes a quoted field, so records with embedded newlines keep a
+    single offset. With key set to a column name, lookup() finds the row
+    number holding a value of that column (first occurrence wins). A column
+    of integers (id, Number) is kept as two sorted int64 arrays searched by
+    bisection; any other column falls back to a dict keyed by text.
+
+    A finished index is saved to a sidecar file and loaded from it next
+    time, as long as the CSV's size and mtime still match. The sidecar is
+    path + '.<key>.idx' (path + '.rows.idx' without a key), so indexes on
+    different columns live side by side; sidecar may name another path, or
+    be None to save nothing.
+    Rows are read through an mmap of the CSV; if the file has changed since
+    the index was built, the next read rebuilds the index first.
+    """
+
+    def __init__(self, path, key=None, encoding='utf-8', sidecar=True):
+        self.path = path
+        self.key = key
+        self.encoding = encoding
+        self.sidecar = f"{path}.{key or 'rows'}.idx" if sidecar is True else sidecar
+        self.from_sidecar = False
+        self._lock = threading.Lock()
+        self._map = None
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.header = []
+        self.offsets = array('q')
+        self.key_values = self.key_rows = None     # integer keys, sorted, and their row numbers
+        self.key_map = None                         # or {text key: row number}
+        self.end = 0            # byte offset just past the last indexed record
+        self.size = self.mtime_ns = None
+        self.complete = False
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def build(self, step=INDEX_STEP):
+        """Indexes the file, yielding the number of rows indexed after every step rows."""
+        self.close()
+        self._reset()
+        offsets = self.offsets
+        int_keys, text_keys = array('q'), None
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            header = self._record(f)
+            self.header = self._fields(header)
+            column = None
+            if self.key is not None:
+                if self.key not in self.header:
+                    raise ValueError(f"Column {self.key!r} is not in the header of {self.path}.")
+                column = self.header.index(self.key)
+            position = record_start = f.tell()
+            in_quotes = False
+            pending = []        # lines of a record still inside a quoted field
+            for line in f:
+                position += len(line)
+                if line.count(b'"') & 1:
+                    in_quotes = not in_quotes
+                if in_quotes:
+                    if column is not None:
+                        pending.append(line)
+                    continue
+                if line.strip():
+                    if column is not None:
+                        field = self._field(b''.join(pending) + line if pending else line, column)
+                        if text_keys is None:
+                            try:
+                                int_keys.append(int(field))
+                            except (TypeError, ValueError, OverflowError):
+                                text_keys = [str(value) for value in int_keys]
+                        if text_keys is not None:
+                            text_keys.append(field.decode(self.encoding) if isinstance(field, bytes) else field)
+                    offsets.append(record_start)
+                    self.end = position
+                    if len(offsets) % step == 0:
+                        yield len(offsets)
+                pending = []
+                record_start = position
+        if column is not None:
+            self._key_index(int_keys, text_keys)
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.complete = True
+        self._store()
+        yield len(offsets)
+
+    def _key_index(self, int_keys, text_keys):
+        if text_keys is None:
+            keys = np.frombuffer(int_keys, dtype=np.int64) if int_keys else np.empty(0, dtype=np.int64)
+            self.key_rows = np.argsort(keys, kind='stable')
+            self.key_values = keys[self.key_rows]
+            return
+        self.key_map = {}
+        for number, value in enumerate(text_keys):
+            if value is not None:
+                self.key_map.setdefault(value, number)
+
+    def ensure(self):
+        """Builds the index unless it is complete and the file is unchanged; returns self."""
+        if not self.complete or self.stale():
+            for _ in self.build():
+                pass
+        return self
+
+    def stale(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_size, stat.st_mtime_ns) != (self.size, self.mtime_ns)
+
+    @staticmethod
+    def _record(f):
+        record = f.readline()
+        while record.count(b'"') & 1:
+            line = f.readline()
+            if not line:
+                break
+            record += line
+        return record
+
+    def _fields(self, record):
+        return next(csv.reader(io.StringIO(record.decode(self.encoding), newline='')), [])
+
+    def _field(self, record, column):
+        """The column's field as bytes, or as text when the record has quotes; None if it is missing."""
+        if b'"' in record:
+            fields = self._fields(record)
+        else:
+            fields = record.rstrip(b'\r\n').split(b',', column + 1)
+        return fields[column] if len(fields) > column else None
+
+    def _mapping(self):
+        with self._lock:
+            if self._map is None:
+                with open(self.path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+    def rows(self, start, stop):
+        """Parsed rows start..stop (exclusive) among those indexed so far."""
+        if self.complete and self.stale():
+            self.ensure()
+        stop = min(stop, len(self.offsets))
+        if start >= stop:
+            return []
+        end = self.offsets[stop] if stop < len(self.offsets) else self.end
+        text = self._mapping()[self.offsets[start]:end].decode(self.encoding)
+        return list(csv.reader(io.StringIO(text, newline='')))
+
+    def row(self, number):
+        rows = self.rows(number, number + 1)
+        return rows[0] if rows else None
+
+    def lookup(self, key):
+        """Row number of the first row whose key column holds key, or None."""
+        if self.key is None:
+            raise ValueError("This index was built without a key column.")
+        self.ensure()
+        if self.key_map is not None:
+            return self.key_map.get(str(key))
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return None
+        i = np.searchsorted(self.key_values, key)
+        if i < len(self.key_values) and self.key_values[i] == key:
+            return int(self.key_rows[i])
+        return None
+
+    def get(self, key, default=None):
+        """The row whose key column holds key, or default."""
+        number = self.lookup(key)
+        return default if number is None else self.row(number)
+
+    def get_many(self, keys):
+        """Rows for several keys, in the order given, with None for missing keys."""
+        return [self.get(key) for key in keys]
+
+    def _load(self):
+        if self.sidecar is None:
+            return
+        try:
+            with open(self.sidecar, 'rb') as f:
+                meta = json.loads(f.readline())
+                if (meta['version'], meta['key'], meta['encoding']) != (SIDECAR_VERSION, self.key, self.encoding):
+                    return
+                offsets = np.frombuffer(f.read(meta['count'] * 8), dtype='<i8')
+                if meta['keys'] == 'int':
+                    key_values = np.frombuffer(f.read(meta['count'] * 8), dtype='<i8')
+                    key_rows = np.frombuffer(f.read(meta['count'] * 8), dtype='<i8')
+                elif meta['keys'] == 'text':
+                    key_map = json.loads(f.read())
+        except (OSError, ValueError, KeyError):
+            return
+        self.size, self.mtime_ns = meta['size'], meta['mtime_ns']
+        if len(offsets) != meta['count'] or self.stale():
+            self._reset()
+            return
+        self.offsets = array('q', offsets.astype(np.int64).tobytes())
+        if meta['keys'] == 'int':
+            if len(key_values) != meta['count'] or len(key_rows) != meta['count']:
+                self._reset()
+                return
+            self.key_values = key_values.astype(np.int64, copy=False)
+            self.key_rows = key_rows.astype(np.int64, copy=False)
+        elif meta['keys'] == 'text':
+            self.key_map = key_map
+        self.header, self.end = meta['header'], meta['end']
+        self.complete = self.from_sidecar = True
+
+    def _store(self):
+        if self.sidecar is None:
+            return
+        kind = 'int' if self.key_values is not None else 'text' if self.key_map is not None else None
+        meta = {'version': SIDECAR_VERSION, 'size': self.size, 'mtime_ns': self.mtime_ns, 'key': self.key,
+                'encoding': self.encoding, 'header': self.header, 'count': len(self.offsets), 'end': self.end,
+                'keys': kind}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.sidecar)), prefix='.csvindex-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+                f.write(np.frombuffer(self.offsets, dtype=np.int64).astype('<i8').tobytes())
+                if kind == 'int':
+                    f.write(self.key_values.astype('<i8').tobytes())
+                    f.write(self.key_rows.astype('<i8').tobytes())
+                elif kind == 'text':
+                    f.write(json.dumps(self.key_map).encode('utf-8'))
+            os.replace(tmp_path, self.sidecar)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class TestCSVOffsetIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'mock.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'first_name', 'last_name', 'email'])
+            for i in range(1, 251):
+                last = 'Mc"Line\nBreak' if i == 7 else f'Last{i}'
+                writer.writerow([i, f'Fïrst{i}', last, f'user{i}@example.com'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_reads_any_range(self):
+        with CSVOffsetIndex(self.path, sidecar=None) as index:
+            self.assertEqual(list(index.build(step=100)), [100, 200, 250])
+            self.assertEqual(index.header, ['id', 'first_name', 'last_name', 'email'])
+            self.assertEqual(index.rows(6, 8), [['7', 'Fïrst7', 'Mc"Line\nBreak', 'user7@example.com'],
+                                                ['8', 'Fïrst8', 'Last8', 'user8@example.com']])
+            self.assertEqual(index.rows(249, 300), [['250', 'Fïrst250', 'Last250', 'user250@example.com']])
+            with open(self.path, newline='', encoding='utf-8') as f:
+                self.assertEqual(index.rows(0, len(index)), list(csv.reader(f))[1:])
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if name.endswith('.idx')], [])
+
+    def test_key_lookup(self):
+        with CSVOffsetIndex(self.path, key='last_name') as by_name, CSVOffsetIndex(self.path, key='id') as by_id:
+            self.assertEqual(by_name.get('Mc"Line\nBreak')[0], '7')
+            self.assertEqual(by_name.get('Last250')[0], '250')
+            self.assertEqual([row and row[1] for row in by_id.get_many([8, '1', 999])], ['Fïrst8', 'Fïrst1', None])
+        with self.assertRaises(ValueError):
+            CSVOffsetIndex(self.path, sidecar=None).get(1)
+
+    def test_missing_key_column(self):
+        with self.assertRaisesRegex(ValueError, "'phone' is not in the header"):
+            CSVOffsetIndex(self.path, key='phone', sidecar=None).ensure()
+        empty = os.path.join(self.tmp.name, 'empty.csv')
+        open(empty, 'w').close()
+        with self.assertRaisesRegex(ValueError, "'id' is not in the header"):
+            CSVOffsetIndex(empty, key='id', sidecar=None).ensure()
+        self.assertEqual(len(CSVOffsetIndex(empty, sidecar=None).ensure()), 0)
+
+    def test_sidecar_reuse_and_invalidation(self):
+        first = CSVOffsetIndex(self.path, key='id').ensure()
+        self.assertFalse(first.from_sidecar)
+        second = CSVOffsetIndex(self.path, key='id')
+        self.assertTrue(second.from_sidecar)
+        self.assertEqual((second.offsets, second.header), (first.offsets, first.header))
+        self.assertEqual((second.key_values.tolist(), second.key_rows.tolist()),
+                         (first.key_values.tolist(), first.key_rows.tolist()))
+        self.assertEqual(second.get(250), first.get(250))
+        by_email = CSVOffsetIndex(self.path, key='email')
+        self.assertFalse(by_email.from_sidecar)
+        by_email.ensure()
+        by_email = CSVOffsetIndex(self.path, key='email')
+        self.assertTrue(by_email.from_sidecar)
+        self.assertEqual(by_email.lookup('user9@example.com'), 8)
+        self.assertTrue(CSVOffsetIndex(self.path, key='id').from_sidecar)     # the email index left it alone
+        self.assertEqual(by_email.sidecar, self.path + '.email.idx')
+        first.close()
+
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([251, 'New', 'Row', 'new@example.com'])
+        os.utime(self.path, ns=(second.mtime_ns + 10**9,) * 2)
+        self.assertEqual(second.get(251), ['251', 'New', 'Row', 'new@example.com'])
+        self.assertEqual(len(second), 251)
+        second.close()
+        self.assertFalse(CSVOffsetIndex(self.path, key='email').from_sidecar)
+        third = CSVOffsetIndex(self.path, key='id')
+        self.assertTrue(third.from_sidecar)
+        self.assertEqual(len(third), 251)
+        third.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,46 +1,67 @@
+import os
 import sqlite3
+import tempfile
+import unittest
 import pandas as pd
 import json
+from itertools import chain, islice
 from Querybuilder import QueryBuilder
+from sqlitemanager import ColumnJSONReader
+
+JSON_COLUMNS = ('Name', 'Distance', 'Period')
+SAMPLE_SIZE = 1000
+BATCH_SIZE = 10000
+COMMIT_EVERY = 1000
 
 class SqliteDB:
-    def __init__(self, json_file):
+    def __init__(self, json_file, commit_every=COMMIT_EVERY):
         self.db_name = json_file.split('.')[0]  # Database name from JSON file name
         self.table_name = "DwarfPlanets"  # You can change this as needed
         self.conn = sqlite3.connect(f"{self.db_name}.db")
         self.cursor = self.conn.cursor()
         self.query_builder = QueryBuilder()
+        self.commit_every = commit_every
+        self.pending = 0  # execute('insert', ...) rows not yet committed
+
+    @staticmethod
+    def iter_json_rows(json_file):
+        """Yields (Name, Distance, Period) for every key present in all three columns.
+
+        The file is read in chunks by sqlitemanager.ColumnJSONReader and only
+        the three wanted columns are kept, not the file text or a full JSON
+        tree. This is not an incremental load: the document is column-oriented,
+        so no row is complete until its last column has been read, and the
+        three columns are held in memory before the first row is yielded. A
+        file holding the document as a JSON string (to_json output passed
+        through json.dump, as KeplerBelt.json is) is unescaped by the reader
+        as it goes.
+        """
+        data = {column: {} for column in JSON_COLUMNS}
+        seen = set()
+        with open(json_file, "r", encoding='utf-8') as infile:
+            for column, entries in ColumnJSONReader(infile).batches():
+                if column in data:
+                    seen.add(column)
+                    data[column].update(entries)
+        missing = [column for column in JSON_COLUMNS if column not in seen]
+        if missing:
+            raise KeyError(f"Missing columns in the JSON data: {', '.join(missing)}")
+        names, distances, periods = (data[column] for column in JSON_COLUMNS)
+        for key, name in names.items():
+            if key in distances and key in periods:
+                yield name, distances[key], periods[key]
 
 #step 1 (load json to df function)
     def load_json_to_df(self, json_file): #I was having a lot of trouble loading in json, so there are a lot of excess error statements.
         try:
-            with open(json_file, "r", encoding='utf-8') as infile:
-                file_content = infile.read()
-            data = json.loads(file_content)
-
-            if not isinstance(data, dict):
-                raise ValueError("Loaded JSON data is not a dictionary")
-            
-            # check if the keys exist in the table
-            if not all(key in data for key in ['Name', 'Distance', 'Period']):
-                print("One of the required keys is missing in the JSON data.")
-                return None
-
-            df_data = [
-                {
-                    'Name': data['Name'][key],
-                    'Distance': data['Distance'][key],
-                    'Period': data['Period'][key]
-                }
-                for key in data['Name'].keys()
-                if key in data['Distance'] and key in data['Period']
-            ]
-
-            return pd.DataFrame(df_data)
+            return pd.DataFrame.from_records(self.iter_json_rows(json_file), columns=JSON_COLUMNS)
 
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON: {e}")
             return None
+        except KeyError as e:
+            print(f"One of the required keys is missing in the JSON data: {e}")
+            return None
         except Exception as e:
             print(f"An error occurred: {e}")
             return None
@@ -48,9 +69,12 @@ class SqliteDB:
     def create_table_from_df(self, table_name, df):
         drop_query = f"DROP TABLE IF EXISTS {table_name}"
         self.cursor.execute(drop_query)
+        self.create_table(table_name, {col: self.get_sqlite_type(df[col]) for col in df.columns})
 
-        columns = ', '.join([f"{col} {self.get_sqlite_type(df[col])}" for col in df.columns])
-        create_query = f"CREATE TABLE {table_name} ({columns})"
+    def create_table(self, table_name, column_types):
+        """CREATE TABLE IF NOT EXISTS with the given {column: SQLite type}; an existing table is kept."""
+        columns = ', '.join([f"{col} {sqlite_type}" for col, sqlite_type in column_types.items()])
+        create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns})"
         
         try:
             self.cursor.execute(create_query)
@@ -58,6 +82,34 @@ class SqliteDB:
         except sqlite3.Error as e:
             print(f"An error occurred while creating the table: {e}")
 
+    def infer_types(self, sample):
+        """{column: SQLite type} for a sample of (Name, Distance, Period) rows, via get_sqlite_type."""
+        df = pd.DataFrame.from_records(sample, columns=JSON_COLUMNS)
+        return {col: self.get_sqlite_type(df[col]) for col in df.columns}
+
+    def bulk_load(self, json_file, table_name=None, batch_size=BATCH_SIZE, sample_size=SAMPLE_SIZE):
+        """Streams the JSON rows into a typed table; returns the number of rows inserted.
+
+        Column types are inferred from the first sample_size rows, the table
+        is created once (kept if it already exists) and rows go in through
+        executemany, batch_size at a time with one commit per batch.
+        """
+        table_name = table_name or self.table_name
+        self.flush()
+        rows = self.iter_json_rows(json_file)
+        sample = list(islice(rows, sample_size))
+        self.create_table(table_name, self.infer_types(sample))
+        insert_query = f"INSERT INTO {table_name} ({', '.join(JSON_COLUMNS)}) VALUES (?, ?, ?)"
+        rows = chain(sample, rows)
+        total = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return total
+            with self.conn:
+                self.conn.executemany(insert_query, batch)
+            total += len(batch)
+
     def get_sqlite_type(self, pd_series):
         if pd.api.types.is_integer_dtype(pd_series):
             return "INTEGER"
@@ -70,6 +122,7 @@ class SqliteDB:
         actions = {
             "insert": self.insert_row,
             "select": self.select_query,
+            "flush": self.flush,
             # Add other queries here
         }
 
@@ -77,10 +130,19 @@ class SqliteDB:
         return action(*args)
 
     def insert_row(self, data):
-        columns = f"({', '.join(['Name', 'Distance', 'Period'])})"
+        """Inserts one row; commits are grouped every commit_every rows, see flush()."""
+        columns = f"({', '.join(JSON_COLUMNS)})"
         insert_query = f"INSERT INTO {self.table_name} {columns} VALUES (?, ?, ?)"
         self.cursor.execute(insert_query, data)
-        self.conn.commit()
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """Commits the rows inserted since the last commit."""
+        if self.pending:
+            self.conn.commit()
+            self.pending = 0
 
     def select_query(self, *args):
         select_query = f"SELECT * FROM {self.table_name}"
@@ -92,24 +154,23 @@ class SqliteDB:
         return None
 
     def close(self):
+        self.flush()
         self.conn.close()
 
-# Example usage
 # Example usage
 if __name__ == "__main__":
     sqdb = SqliteDB("KeplerBelt.json")  # Use the JSON file here
     
-    # Load JSON data into DataFrame
-    df = sqdb.load_json_to_df("KeplerBelt.json")
-    
-    # Check if the DataFrame is loaded successfully
-    if df is not None:
-        # Create the table from DataFrame
-        sqdb.create_table_from_df(sqdb.table_name, df)
+    try:
+        # Infer the column types, create the table and stream the rows in
+        sqdb.bulk_load("KeplerBelt.json")
         
-        # Example: Inserting a row (data as tuple)
+        # Example: Inserting a row (data as tuple); committed by flush() or close()
         data = ('Ceres', 2.77, 4.61)  # Sample data
         sqdb.execute("insert", data)
+        sqdb.execute("flush")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"An error occurred: {e}")
 
     # Query the data
     results = sqdb.execute("select")
@@ -117,3 +178,52 @@ if __name__ == "__main__":
         print(result)
 
     sqdb.close()
+
+
+class TestSqliteDB(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_file = os.path.join(self.tmp.name, 'belt.json')
+        data = {'Name': {'d0': 'Ceres', 'd1': 'Pluto', 'd2': 'Eris'},
+                'Distance': {'d0': 2.77, 'd1': 39.5, 'd2': 67.84},
+                'Period': {'d0': 4.61, 'd1': 248.0}}
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump(json.dumps(data), f)  # wrapped like KeplerBelt.json
+        self.db = SqliteDB(self.json_file, commit_every=2)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def committed_rows(self):
+        with sqlite3.connect(f"{self.db.db_name}.db") as other:
+            return other.execute(f"SELECT * FROM {self.db.table_name}").fetchall()
+
+    def test_bulk_load(self):
+        self.assertEqual(self.db.bulk_load(self.json_file, batch_size=1, sample_size=1), 2)
+        self.assertEqual(self.db.bulk_load(self.json_file), 2)
+        self.assertEqual(self.committed_rows(), [('Ceres', 2.77, 4.61), ('Pluto', 39.5, 248.0)] * 2)
+        types = [row[2] for row in self.db.conn.execute(f"PRAGMA table_info({self.db.table_name})")]
+        self.assertEqual(types, ['TEXT', 'REAL', 'REAL'])
+        self.assertEqual(self.db.load_json_to_df(self.json_file)['Name'].tolist(), ['Ceres', 'Pluto'])
+
+    def test_iter_json_rows_plain_document(self):
+        path = os.path.join(self.tmp.name, 'plain.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'Name': {'d0': 'Ceres'}, 'Moons': {'d0': 0}, 'Distance': {'d0': 2.77}, 'Period': {'d0': 4.61}}, f)
+        self.assertEqual(list(SqliteDB.iter_json_rows(path)), [('Ceres', 2.77, 4.61)])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'Name': {'d0': 'Ceres'}, 'Distance': {'d0': 2.77}}, f)
+        with self.assertRaises(KeyError):
+            list(SqliteDB.iter_json_rows(path))
+
+    def test_grouped_commits(self):
+        self.db.create_table(self.db.table_name, {'Name': 'TEXT', 'Distance': 'REAL', 'Period': 'REAL'})
+        self.db.execute("insert", ('Ceres', 2.77, 4.61))
+        self.assertEqual(self.committed_rows(), [])
+        self.db.execute("insert", ('Pluto', 39.5, 248.0))
+        self.db.execute("insert", ('Eris', 67.84, 559.0))
+        self.assertEqual(len(self.committed_rows()), 2)
+        self.db.execute("flush")
+        self.assertEqual(len(self.committed_rows()), 3)
+        self.assertEqual(len(self.db.execute("select")), 3)
@@ -1,42 +1,171 @@
-from bs4 import BeautifulSoup
-from collections import defaultdict
-import pandas as pd
+from tablestream import iter_table_rows
+from array import array
+import math
 import numpy as np
+import pathlib
 import tkinter as tk
+import unittest
 
-with open('Co2.html', 'r') as file:
-    soup = BeautifulSoup(file, 'html.parser')
+# Mauna Loa monthly export columns and the dtype each is parsed into
+CO2_COLUMNS = {
+    'year': np.int64,
+    'month': np.int64,
+    'decimal': np.float64,
+    'average': np.float64,
+    'interpolated': np.float64,
+    'trend': np.float64,
+    '#days': np.float64,
+}
+# values the export uses for "no measurement"; they become NaN
+MISSING = {'average': -99.99, 'interpolated': -99.99, 'trend': -99.99, '#days': -1}
 
-table = soup.find('table')
 
-data_dict = defaultdict(list)
+def load_co2(source=pathlib.Path('Co2.html'), table=0):
+    """Reads a Mauna Loa CO2 table into a dict of typed NumPy arrays, one per column.
 
-rows = table.find_all('tr')
-headers = [header.get_text(strip=True) for header in rows[2].find_all('td')]
+    source is anything iter_table_rows accepts: a pathlib.Path, HTML markup
+    as a str or bytes, or a file-like object. Each row is converted as it is
+    streamed and appended to one array buffer per column, so no text copy
+    of the table is kept. Comment rows and anything before the 'year' header
+    row are skipped, as are rows with the wrong number of cells and rows
+    whose year or month is not an integer. Empty or non-numeric cells and
+    the missing-value sentinels come back as NaN in the float columns.
+    """
+    rows = iter_table_rows(source, index=table)
+    for header in rows:
+        if header and header[0].lower() == 'year':
+            break
+    else:
+        raise ValueError(f"No 'year' header row found in {source}.")
+    names = [name.lower() for name in header]
+    integer = [CO2_COLUMNS.get(name, np.float64) is np.int64 for name in names]
+    int_columns = [i for i, is_int in enumerate(integer) if is_int]
+    float_columns = [i for i, is_int in enumerate(integer) if not is_int]
+    buffers = [array('q') if is_int else array('d') for is_int in integer]
+    for row in rows:
+        if len(row) != len(names) or row[0].startswith('#'):
+            continue
+        try:
+            keys = [int(row[i]) for i in int_columns]
+        except ValueError:
+            continue    # empty or non-integer year/month: no row to attach values to
+        for i, key in zip(int_columns, keys):
+            buffers[i].append(key)
+        for i in float_columns:
+            buffers[i].append(_float(row[i]))
+    columns = {}
+    for name, is_int, buffer in zip(names, integer, buffers):
+        dtype = np.int64 if is_int else np.float64
+        column = np.frombuffer(buffer, dtype=dtype) if buffer else np.empty(0, dtype=dtype)
+        if name in MISSING:
+            column[column == MISSING[name]] = np.nan
+        columns[name] = column
+    return columns
 
-for row in rows[3:]:
-    cells = row.find_all('td')
-    row_data = [cell.get_text(strip=True) or '0' for cell in cells]
-    for header, value in zip(headers, row_data):
-        data_dict[header].append(value)
 
-df = pd.DataFrame(data_dict)
+def _float(cell):
+    """The cell as a float; NaN when it is empty or not a number (a footnote mark, 'n/a')."""
+    try:
+        return float(cell)
+    except ValueError:
+        return math.nan
 
-df['average'] = pd.to_numeric(df['average'], errors='coerce')
-annual_data = df.groupby('year')['average'].mean().reset_index() 
 
-def display_yearly_averages():
+def group_stats(keys, values):
+    """Mean, min, max and count of values for each distinct key, ignoring NaN.
+
+    Returns a dict of arrays aligned with the sorted distinct keys; groups
+    with no measurements get NaN for mean, min and max.
+    """
+    groups, inverse = np.unique(keys, return_inverse=True)
+    present = ~np.isnan(values)
+    counts = np.bincount(inverse, weights=present, minlength=len(groups))
+    sums = np.bincount(inverse, weights=np.where(present, values, 0.0), minlength=len(groups))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    # min/max per group via reduceat over the values sorted by group
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(len(groups)))
+    ordered = values[order]
+    if len(ordered):
+        mins = np.fmin.reduceat(ordered, starts)
+        maxs = np.fmax.reduceat(ordered, starts)
+    else:
+        mins = maxs = np.empty(0)
+    return {'key': groups, 'mean': means, 'min': mins, 'max': maxs, 'count': counts.astype(np.int64)}
+
+
+def yearly_averages(data, column='average'):
+    return group_stats(data['year'], data[column])
+
+
+def monthly_averages(data, column='average'):
+    """Statistics per calendar month across all years: the seasonal cycle."""
+    return group_stats(data['month'], data[column])
+
+
+def display_yearly_averages(annual_data):
     root = tk.Tk()
     root.title("CO2 averages by year")
 
     text_area = tk.Text(root, width=60, height=20)
     text_area.pack(padx=10, pady=10)
 
-    for year, avg in zip(annual_data['year'], annual_data['average']):
+    for year, avg in zip(annual_data['key'], annual_data['mean']):
         text_area.insert(tk.END, f"Year: {year}, Average CO2:  {avg:.2f}\n")
 
     text_area.config(state=tk.DISABLED)
 
     root.mainloop()
 
-display_yearly_averages()
+
+class TestCo2Loader(unittest.TestCase):
+    PAGE = """<table>
+    <tr><td># comment</td></tr>
+    <tr><td>year</td><td>month</td><td>decimal</td><td>average</td><td>interpolated</td><td>trend</td><td>#days</td></tr>
+    <tr><td>1958</td><td>3</td><td>1958.208</td><td>315.71</td><td>315.71</td><td>314.62</td><td>-1</td></tr>
+    <tr><td>1958</td><td>4</td><td>1958.292</td><td>317.45</td><td>317.45</td><td>315.29</td><td>-1</td></tr>
+    <tr><td>1958</td><td>6</td><td>1958.458</td><td>-99.99</td><td>317.10</td><td>314.85</td><td>-1</td></tr>
+    <tr><td>1959</td><td>3</td><td>1959.208</td><td>316.71</td><td>316.71</td><td>315.62</td><td>20</td></tr>
+    </table>"""
+
+    def test_typed_columns_and_sentinels(self):
+        data = load_co2(self.PAGE)
+        self.assertEqual(data['year'].dtype, np.int64)
+        self.assertEqual(data['month'].tolist(), [3, 4, 6, 3])
+        self.assertTrue(np.isnan(data['average'][2]))
+        self.assertEqual(np.isnan(data['#days']).tolist(), [True, True, True, False])
+
+    def test_rows_without_integer_keys_are_skipped(self):
+        page = self.PAGE.replace('<td>1958</td><td>4</td>', '<td></td><td>4</td>').replace('<td>6</td>', '<td>x</td>')
+        data = load_co2(page)
+        self.assertEqual(data['year'].tolist(), [1958, 1959])
+        self.assertEqual(data['month'].tolist(), [3, 3])
+        self.assertEqual(data['average'].tolist(), [315.71, 316.71])
+
+    def test_non_numeric_float_cells_are_nan(self):
+        page = self.PAGE.replace('<td>317.45</td><td>317.45</td>', '<td>n/a</td><td>317.45*</td>')
+        data = load_co2(page)
+        self.assertEqual(len(data['year']), 4)
+        self.assertTrue(np.isnan(data['average'][1]) and np.isnan(data['interpolated'][1]))
+        self.assertEqual(data['trend'][1], 315.29)
+
+    def test_aggregates(self):
+        data = load_co2(self.PAGE)
+        yearly = yearly_averages(data)
+        self.assertEqual(yearly['key'].tolist(), [1958, 1959])
+        self.assertAlmostEqual(yearly['mean'][0], (315.71 + 317.45) / 2)
+        self.assertEqual(yearly['count'].tolist(), [2, 1])
+        monthly = monthly_averages(data)
+        self.assertEqual(monthly['key'].tolist(), [3, 4, 6])
+        self.assertEqual(monthly['max'][0], 316.71)
+        self.assertTrue(np.isnan(monthly['mean'][2]))
+
+    def test_co2_file(self):
+        data = load_co2(pathlib.Path(__file__).resolve().parent / 'Co2.html')
+        self.assertEqual(len(data['year']), 731)
+        self.assertEqual(data['average'][0], 315.62)
+
+
+if __name__ == "__main__":
+    display_yearly_averages(yearly_averages(load_co2()))
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+from threadinggreenhouse import SqliteDB, ClientPhase
+
+ROWS = 1_000_000
+
+
+def synthetic_rows(count=ROWS):
+    """Yields (year, CO2, CH4, N2O, CFCs, HCFCs, HFCs) rows without building them all in memory."""
+    for year in range(count):
+        step = (year % 44) / 44
+        yield (year, 1.0 + step, 0.4 + step / 5, 0.1 + step / 5, 0.2 + step / 10, step / 10, step / 20)
+
+
+def per_row_insert(db, rows):
+    """The original insert_data: one execute per row, one commit at the end."""
+    for row in rows:
+        db.cursor.execute('''INSERT OR REPLACE INTO greenhouse_data 
+                                (year, CO2, CH4, N2O, CFCs, HCFCs, HFCs)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)''', row)
+    db.conn.commit()
+
+
+def benchmark_insert(count=ROWS):
+    print(f"{count} synthetic year/gas rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SqliteDB(os.path.join(tmp, 'per_row.db'))
+        start = time.perf_counter()
+        per_row_insert(db, synthetic_rows(count))
+        elapsed = time.perf_counter() - start
+        print(f"{'per-row execute':<24} {count / elapsed:>12,.0f} rows/sec")
+        db.close()
+
+        for batch_size in (1000, 10000, 100000):
+            db = SqliteDB(os.path.join(tmp, f'bulk_{batch_size}.db'))
+            _, rows_per_sec = db.bulk_insert(synthetic_rows(count), batch_size=batch_size)
+            print(f"{f'bulk_insert({batch_size})':<24} {rows_per_sec:>12,.0f} rows/sec")
+            db.close()
+
+
+class RangeServer:
+    """Stands in for Server with an in-memory year range so only the analytics are timed."""
+    def __init__(self, count):
+        self.rows = {row[0]: row[1:] for row in synthetic_rows(count)}
+
+    def handle_range(self, start_year, end_year):
+        return self.rows
+
+
+def benchmark_executors(years=300_000, window=30):
+    server = RangeServer(years)
+    print(f"\nper-gas analytics over {years} years x 6 gases")
+    print(f"{'mode':<10} {'workers':>8} {'seconds':>9}")
+    for mode, worker_counts in (("inline", (1,)), ("thread", (1, 6)), ("process", (1, 2, 4, 6))):
+        for workers in worker_counts:
+            phase = ClientPhase(server, mode=mode, max_workers=workers, window=window,
+                                start_year=0, end_year=years - 1)
+            start = time.perf_counter()
+            phase.run()
+            print(f"{mode:<10} {workers:>8} {time.perf_counter() - start:>9.2f}")
+
+
+if __name__ == "__main__":
+    benchmark_insert()
+    benchmark_executors()
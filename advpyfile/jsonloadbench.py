@@ -0,0 +1,132 @@
+import json
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from itertools import islice
+import pandas as pd
+import databases
+from sqlitemanager import SqliteDB
+
+ROWS = 1_000_000
+
+
+def write_column_json(path, count=ROWS):
+    """Writes a KeplerBelt-shaped column-oriented file with count rows, one column at a time."""
+    columns = {
+        "Name": lambda i: f"dwarf planet {i}",
+        "Distance": lambda i: 2.77 + (i % 1000) / 10,
+        "Period": lambda i: 4.61 + (i % 5000) / 3,
+    }
+    with open(path, 'w') as f:
+        f.write('{')
+        for n, (column, value) in enumerate(columns.items()):
+            f.write(('' if n == 0 else ',') + json.dumps(column) + ':{')
+            f.write(','.join(f'"dwarf{i}":{json.dumps(value(i))}' for i in range(count)))
+            f.write('}')
+        f.write('}')
+    return os.path.getsize(path)
+
+
+def dataframe_load(path):
+    """The original load_data/create_table: whole file into a DataFrame, then to_sql."""
+    with open(path) as f:
+        df = pd.DataFrame(json.load(f))
+    df.rename(columns={"Name": "Dwarf"}, inplace=True)
+    with sqlite3.connect(path.replace('.json', '.db')) as conn:
+        df.to_sql('DwarfPlanets', conn, if_exists='replace', index_label='id')
+    return len(df)
+
+
+def streaming_load(path):
+    db = SqliteDB(path, 'DwarfPlanets')
+    rows = db.conn.execute("SELECT COUNT(*) FROM DwarfPlanets").fetchone()[0]
+    db.conn.close()
+    return rows
+
+
+def measure(func, path, results):
+    start = time.perf_counter()
+    rows = func(path)
+    elapsed = time.perf_counter() - start
+    results.put((rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run_isolated(func, path):
+    """Runs one loader in a fresh process so its peak RSS is its own."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(func, path, results))
+    process.start()
+    process.join()
+    return results.get() if process.exitcode == 0 else None
+
+
+def main(count=ROWS):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dwarfs.json')
+        size = write_column_json(path, count)
+        print(f"{count} rows, {size / 2**20:.1f} MiB of column-oriented JSON")
+        print(f"{'loader':<20} {'seconds':>8} {'rows/sec':>12} {'peak RSS':>10}")
+        for name, func in (("json.load + to_sql", dataframe_load), ("streaming", streaming_load)):
+            result = run_isolated(func, path)
+            if result is None:
+                print(f"{name:<20} failed")
+                continue
+            rows, elapsed, peak = result
+            assert rows == count
+            print(f"{name:<20} {elapsed:>8.2f} {rows / elapsed:>12,.0f} {peak:>8.0f}MB")
+            os.remove(path.replace('.json', '.db'))
+
+
+def databases_row_load(path):
+    """databases.SqliteDB before bulk_load: DataFrame, create_table_from_df, then a commit per inserted row."""
+    db = databases.SqliteDB(path, commit_every=1)
+    df = db.load_json_to_df(path)
+    db.create_table_from_df(db.table_name, df)
+    for row in df.itertuples(index=False):
+        db.execute("insert", tuple(row))
+    rows = db.conn.execute(f"SELECT COUNT(*) FROM {db.table_name}").fetchone()[0]
+    db.close()
+    return rows
+
+
+def databases_grouped_load(path):
+    """The same per-row execute('insert') loop with commits grouped by commit_every."""
+    db = databases.SqliteDB(path)
+    db.create_table(db.table_name, db.infer_types(islice(db.iter_json_rows(path), databases.SAMPLE_SIZE)))
+    for row in db.iter_json_rows(path):
+        db.execute("insert", row)
+    db.execute("flush")
+    rows = db.conn.execute(f"SELECT COUNT(*) FROM {db.table_name}").fetchone()[0]
+    db.close()
+    return rows
+
+
+def databases_bulk_load(path):
+    db = databases.SqliteDB(path)
+    rows = db.bulk_load(path)
+    db.close()
+    return rows
+
+
+def databases_main(count=100_000):
+    """databases.SqliteDB loaders on an on-disk database, where every commit is a sync."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dwarfs.json')
+        write_column_json(path, count)
+        print(f"\ndatabases.SqliteDB, {count} rows")
+        print(f"{'loader':<20} {'seconds':>8} {'rows/sec':>12} {'peak RSS':>10}")
+        for name, func in (("commit per row", databases_row_load), ("grouped commits", databases_grouped_load),
+                           ("bulk_load", databases_bulk_load)):
+            rows, elapsed, peak = run_isolated(func, path)
+            assert rows == count
+            print(f"{name:<20} {elapsed:>8.2f} {rows / elapsed:>12,.0f} {peak:>8.0f}MB")
+            os.remove(os.path.splitext(path)[0] + '.db')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
+    databases_main()
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from socketserverclient import AsyncSocketServer, SocketServer, QUERY, CLOSE, pack_frame, read_frame
+
+CONNECTIONS = 1000
+QUERY_TEXT = b"SELECT name FROM example_table WHERE id = 1"
+
+
+async def one_request(host, port, timeout=30.0):
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(pack_frame(QUERY, 1, QUERY_TEXT) + pack_frame(CLOSE, 0))
+        await writer.drain()
+        response = await asyncio.wait_for(read_frame(reader), timeout)
+    finally:
+        writer.close()
+    return time.perf_counter() - start, response
+
+
+async def generate_load(host, port, connections=CONNECTIONS):
+    """Opens all connections at once and returns per-request latencies in seconds."""
+    results = await asyncio.gather(*(one_request(host, port) for _ in range(connections)),
+                                   return_exceptions=True)
+    latencies = [r[0] for r in results if not isinstance(r, BaseException) and r[1]]
+    failures = len(results) - len(latencies)
+    return latencies, failures
+
+
+def percentile(values, pct):
+    if len(values) < 2:
+        return values[0] if values else float('nan')
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def report(name, latencies, failures, elapsed):
+    print(f"{name:<10} ok={len(latencies):>5} failed={failures:>4} "
+          f"p50={percentile(latencies, 50) * 1000:>8.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:>8.1f}ms "
+          f"total={elapsed:>6.2f}s")
+
+
+def start_in_background(server):
+    threading.Thread(target=server.start_server, daemon=True).start()
+
+
+def run_load(name, port):
+    start = time.perf_counter()
+    latencies, failures = asyncio.run(generate_load('localhost', port))
+    elapsed = time.perf_counter() - start
+    return name, latencies, failures, elapsed
+
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        async_server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'async.db'))
+        async_server.db.execute_query("INSERT INTO example_table (name) VALUES ('ceres')")
+        start_in_background(async_server)
+        async_server.ready.wait(5)
+        results.append(run_load("asyncio", async_server.port))
+        async_server.stop_server()
+
+        threaded_server = SocketServer('localhost', 0, os.path.join(tmp, 'threaded.db'))
+        threaded_server.db.execute_query("INSERT INTO example_table (name) VALUES ('ceres')")
+        start_in_background(threaded_server)
+        while threaded_server.server_socket is None:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        results.append(run_load("threaded", threaded_server.server_socket.getsockname()[1]))
+
+    print(f"{CONNECTIONS} concurrent connections")
+    for result in results:
+        report(*result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import csv
+import os
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
+import unittest
+from csvindex import CSVOffsetIndex, INDEX_STEP
+
+PAGE_SIZE = 100
+CACHE_PAGES = 32
+CLOSE = object()
+
+
+class PagedModel:
+    """Fixed-size pages of an index's rows with a small LRU page cache.
+
+    Only pages that are full, or the last page once the index is complete,
+    are cached, so a page read while the index is still growing is re-read
+    later rather than served short. The cache is dropped when the file
+    changes under a complete index.
+    """
+
+    def __init__(self, index, page_size=PAGE_SIZE, cache_pages=CACHE_PAGES):
+        self.index = index
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.pages = OrderedDict()
+
+    def __len__(self):
+        return len(self.index)
+
+    def page(self, number):
+        if self.index.complete and self.index.stale():
+            self.pages.clear()
+            self.index.ensure()
+        rows = self.pages.get(number)
+        if rows is not None:
+            self.pages.move_to_end(number)
+            return rows
+        start = number * self.page_size
+        rows = self.index.rows(start, start + self.page_size)
+        if len(rows) == self.page_size or self.index.complete:
+            self.pages[number] = rows
+            if len(self.pages) > self.cache_pages:
+                self.pages.popitem(last=False)
+        return rows
+
+    def window(self, start, count):
+        """Rows start..start + count, read from the pages that cover them."""
+        first, last = start // self.page_size, (start + count - 1) // self.page_size
+        rows = []
+        for number in range(first, last + 1):
+            rows.extend(self.page(number))
+        offset = start - first * self.page_size
+        return rows[offset:offset + count]
+
+
+class PageLoader:
+    """Builds a model's index and reads its windows on one background thread.
+
+    request() records the window the view wants; only the newest pending
+    request is served, as soon as its rows are indexed. Results go to the
+    results queue as ("progress", (rows indexed, complete)),
+    ("window", (start, rows)) or ("error", message) for the GUI thread to
+    poll, since Tk must only be touched from the thread running mainloop.
+    """
+
+    def __init__(self, model, step=INDEX_STEP):
+        self.model = model
+        self.step = step
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def request(self, start, count):
+        self.requests.put((start, count))
+
+    def close(self):
+        self.requests.put(CLOSE)
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            self.results.put(("error", f"{type(e).__name__}: {e}"))
+
+    def _run(self):
+        index = self.model.index
+        steps = None if index.complete else index.build(self.step)
+        if steps is None:
+            self.results.put(("progress", (len(index), True)))
+        pending = None
+        while True:
+            # block only when there is nothing left to index or serve
+            try:
+                while True:
+                    item = self.requests.get(block=steps is None and pending is None)
+                    if item is CLOSE:
+                        return
+                    pending = item
+            except queue.Empty:
+                pass
+            if steps is not None:
+                if next(steps, None) is None or index.complete:
+                    steps = None
+                self.results.put(("progress", (len(index), index.complete)))
+            if pending is not None:
+                start, count = pending
+                if index.complete or start + count <= len(index):
+                    self.results.put(("window", (start, self.model.window(start, count))))
+                    pending = None
+
+
+class TestPagedModel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'mock.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'first_name', 'last_name', 'email'])
+            for i in range(1, 251):
+                last = 'Mc"Line\nBreak' if i == 7 else f'Last{i}'
+                writer.writerow([i, f'Fïrst{i}', last, f'user{i}@example.com'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_and_partial_index(self):
+        index = CSVOffsetIndex(self.path, sidecar=None)
+        steps = index.build(step=100)
+        next(steps)
+        model = PagedModel(index, page_size=30, cache_pages=2)
+        self.assertEqual([row[0] for row in model.window(95, 10)], ['96', '97', '98', '99', '100'])
+        self.assertNotIn(3, model.pages)    # page 3 is cut short by the partial index
+        list(steps)
+        self.assertEqual([row[0] for row in model.window(95, 10)], [str(i) for i in range(96, 106)])
+        self.assertEqual(list(model.pages), [3])
+        model.page(8)
+        model.page(0)
+        self.assertEqual(list(model.pages), [8, 0])
+        self.assertEqual(len(model.page(8)), 10)
+
+    def test_loader_uses_saved_index(self):
+        CSVOffsetIndex(self.path).ensure().close()
+        loader = PageLoader(PagedModel(CSVOffsetIndex(self.path))).start()
+        loader.request(0, 3)
+        self.assertEqual(loader.results.get(timeout=5), ("progress", (250, True)))
+        kind, (start, rows) = loader.results.get(timeout=5)
+        loader.close()
+        self.assertEqual((kind, start, [row[0] for row in rows]), ("window", 0, ['1', '2', '3']))
+
+    def test_loader_serves_newest_request(self):
+        loader = PageLoader(PagedModel(CSVOffsetIndex(self.path, sidecar=None), page_size=40), step=100)
+        loader.request(0, 15)
+        loader.request(240, 15)
+        loader.start()
+        messages = []
+        while not any(kind == "window" for kind, _ in messages):
+            messages.append(loader.results.get(timeout=5))
+        loader.close()
+        loader.thread.join(timeout=5)
+        self.assertIn(("progress", (250, True)), messages)
+        (start, rows), = [payload for kind, payload in messages if kind == "window"]
+        self.assertEqual((start, [row[0] for row in rows]), (240, [str(i) for i in range(241, 251)]))
+
+    def test_loader_reports_errors(self):
+        loader = PageLoader(PagedModel(CSVOffsetIndex(os.path.join(self.tmp.name, 'missing.csv'), sidecar=None))).start()
+        kind, message = loader.results.get(timeout=5)
+        self.assertEqual(kind, "error")
+        self.assertIn("FileNotFoundError", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
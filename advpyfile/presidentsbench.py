@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from presidentsdb import (PresidentDF, PRESIDENTS_QUERY, convert_to_date, calculate_years_served, dates_to_str,
+                          parse_office_dates)
+
+ROWS = 1_000_000
+
+
+def day_month_year(dates):
+    """d/m/Y strings without the day's leading zero (%-d is glibc-only)."""
+    return dates.strftime('%d/%m/%Y').str.lstrip('0')
+
+
+def synthetic_officeholders(count=ROWS, seed=0):
+    """A Presidents.html-shaped frame with d/m/Y date strings; every 50th holder is still in office."""
+    rng = np.random.default_rng(seed)
+    took = pd.Timestamp('1789-04-30') + pd.to_timedelta(rng.integers(0, 80_000, count), unit='D')
+    left = took + pd.to_timedelta(rng.integers(30, 4_000, count), unit='D')
+    left_text = day_month_year(left).to_numpy(dtype=object)
+    left_text[::50] = 'Incumbent'
+    return pd.DataFrame({
+        'Presidency': np.arange(1, count + 1),
+        'President': [f'Officeholder {i}' for i in range(count)],
+        'Took office': day_month_year(took),
+        'Left office': left_text,
+    })
+
+
+def per_row_ingest(df, db):
+    """The original path: strptime and Years Served per cell/row, then one execute per iterrows() row."""
+    df['Took office'] = df['Took office'].apply(convert_to_date)
+    df['Left office'] = df['Left office'].apply(convert_to_date)
+    df['Years Served'] = df.apply(calculate_years_served, axis=1)
+    df = dates_to_str(df)
+    for _, row in df.iterrows():
+        db.cursor.execute('''
+            INSERT INTO presidents (Presidency, President, Took_office, Left_office, Years_Served)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (row['Presidency'], row['President'], row['Took office'], row['Left office'], row['Years Served']))
+    db.create_indexes()
+    db.conn.commit()
+
+
+def vectorized_ingest(df, db):
+    db.insert_data(parse_office_dates(df))
+
+
+def benchmark_ingest(count=ROWS):
+    source = synthetic_officeholders(count)
+    print(f"{count} synthetic officeholders")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ingest in (("per-row apply/iterrows", per_row_ingest), ("vectorized/executemany", vectorized_ingest)):
+            db = PresidentDF(os.path.join(tmp, f'{ingest.__name__}.db'))
+            start = time.perf_counter()
+            ingest(source.copy(), db)
+            elapsed = time.perf_counter() - start
+            results[name] = db.cursor.execute(
+                "SELECT COUNT(*), SUM(Years_Served), MIN(Took_office), COUNT(Left_office) FROM presidents").fetchone()
+            db.conn.close()
+            print(f"{name:<24} {elapsed:>8.2f}s {count / elapsed:>12,.0f} rows/sec")
+    first, second = results.values()
+    assert first[0] == second[0] and first[2:] == second[2:] and abs(first[1] - second[1]) < 1e-6 * count
+
+
+def fetchall_report(db):
+    """The original report: fetchall() every row, then count and average them in Python."""
+    rows = db.conn.execute(PRESIDENTS_QUERY).fetchall()
+    total = sum(row[1] for row in rows)
+    return len(rows), total / len(rows)
+
+
+def streaming_report(db):
+    """Walk the rows lazily as display_pres does, with the summary computed by SQLite."""
+    for _ in db.fetch_pres():
+        pass
+    stats = db.tenure_stats()
+    list(db.tenure_by_era())
+    return stats.count, stats.average
+
+
+def benchmark_report(count=ROWS):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PresidentDF(os.path.join(tmp, 'report.db'))
+        db.insert_data(parse_office_dates(synthetic_officeholders(count)))
+        print(f"\n{count} row report")
+        results = []
+        for name, report in (("fetchall + Python sums", fetchall_report), ("fetchmany + SQL aggregates", streaming_report)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            results.append(report(db))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<28} {elapsed:>8.2f}s {peak / 2**20:>10.1f} MB peak")
+        start = time.perf_counter()
+        stats = db.tenure_stats()
+        print(f"{'tenure_stats() alone':<28} {time.perf_counter() - start:>8.2f}s")
+        db.conn.close()
+    (count_a, avg_a), (count_b, avg_b) = results
+    assert count_a == count_b == stats.count and abs(avg_a - avg_b) < 1e-9
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    benchmark_ingest(rows)
+    benchmark_report(rows)
@@ -1,8 +1,17 @@
 import unittest
 import pandas as pd
 import sqlite3
+from collections import namedtuple
 from datetime import datetime
+import io
 import os
+from contextlib import redirect_stdout
+
+PRESIDENTS_QUERY = "SELECT President, Years_Served, Took_office, Left_office FROM presidents WHERE Years_Served IS NOT NULL"
+BATCH_SIZE = 1000
+ERA_YEARS = 50
+
+TenureStats = namedtuple('TenureStats', ['count', 'average', 'shortest', 'longest'])
 
 #convert to dataframe + into sqlite database
 class PresidentDF:
@@ -29,8 +38,19 @@ class PresidentDF:
         self.conn.close()
 
     def __iter__(self):
-        self.cursor.execute("SELECT President, Years_Served, Took_office, Left_office FROM presidents WHERE Years_Served IS NOT NULL")
-        return iter(self.cursor.fetchall())
+        return self.iter_rows(PRESIDENTS_QUERY)
+
+    def iter_rows(self, query, params=(), batch_size=BATCH_SIZE):
+        """Yields the query's rows, fetching batch_size at a time on a cursor of its own."""
+        cursor = self.conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
         
     def create_table(self):
         try:
@@ -47,26 +67,63 @@ class PresidentDF:
         except sqlite3.Error as e:
             print(f"An error occurred while creating the table: {e}")
 
+    def create_indexes(self):
+        """Covering indexes: COUNT/AVG tenure and the era grouping scan an
+        index instead of the table; MIN/MAX tenure are index seeks when each
+        is queried on its own (see tenure_stats).
+
+        insert_data builds them after its executemany, so a bulk load does
+        not pay for index maintenance row by row.
+        """
+        self.conn.execute("CREATE INDEX IF NOT EXISTS presidents_years_served ON presidents (Years_Served)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS presidents_took_office ON presidents (Took_office, Years_Served)")
+
     def insert_data(self, df):
-        df = dates_to_str(df) 
-        
-        for _, row in df.iterrows():
-            try:
-                self.cursor.execute('''
+        """Writes the frame with one executemany in a single transaction, then indexes it; df is left unchanged."""
+        rows = zip(column_values(df['Presidency']), column_values(df['President']),
+                   date_strings(df['Took office']), date_strings(df['Left office']),
+                   column_values(df['Years Served']))
+        try:
+            with self.conn:
+                self.conn.executemany('''
                     INSERT INTO presidents (Presidency, President, Took_office, Left_office, Years_Served) 
                     VALUES (?, ?, ?, ?, ?)
-                ''', (row['Presidency'], row['President'], row['Took office'], row['Left office'], row['Years Served']))
-            except sqlite3.Error as e:
-                print(f"An error occurred during insertion: {e}")
-        self.conn.commit()
+                ''', rows)
+                self.create_indexes()
+        except sqlite3.Error as e:
+            print(f"An error occurred during insertion: {e}")
 
-    def fetch_pres(self):
+    def fetch_pres(self, batch_size=BATCH_SIZE):
+        """Lazily yields (President, Years_Served, Took_office, Left_office) for every row with a tenure."""
         try:
-            self.cursor.execute("SELECT President, Years_Served, Took_office, Left_office FROM presidents WHERE Years_Served IS NOT NULL")
-            return self.cursor.fetchall()
+            yield from self.iter_rows(PRESIDENTS_QUERY, batch_size=batch_size)
         except sqlite3.Error as e:
             print(f"An error occurred while fetching data: {e}")
-            return []
+
+    def tenure_stats(self):
+        """Count and average/shortest/longest Years_Served, computed by SQLite.
+
+        MIN and MAX are separate subqueries: SQLite only answers a lone MIN
+        or MAX with a seek to one end of the index, while COUNT and AVG need
+        a full index scan.
+        """
+        row = self.conn.execute('''
+            SELECT COUNT(Years_Served), AVG(Years_Served),
+                   (SELECT MIN(Years_Served) FROM presidents), (SELECT MAX(Years_Served) FROM presidents)
+            FROM presidents
+        ''').fetchone()
+        return TenureStats(*row)
+
+    def tenure_by_era(self, era_years=ERA_YEARS):
+        """Yields (era start year, count, average, shortest, longest) per era_years-long era of Took_office."""
+        return self.iter_rows('''
+            SELECT CAST(substr(Took_office, 1, 4) AS INTEGER) / :era * :era AS Era,
+                   COUNT(Years_Served), AVG(Years_Served), MIN(Years_Served), MAX(Years_Served)
+            FROM presidents
+            WHERE Took_office IS NOT NULL AND Years_Served IS NOT NULL
+            GROUP BY Era
+            ORDER BY Era
+        ''', {'era': era_years})
 
 def convert_to_date(date_str):
     try:
@@ -74,9 +131,25 @@ def convert_to_date(date_str):
     except ValueError:
         return None
 
+DATE_FORMAT = '%d/%m/%Y'
+SQL_DATE_FORMAT = '%Y-%m-%d'
+
+
+def column_values(series):
+    """The column as a list of plain Python values, with None for missing ones."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def date_strings(series):
+    """Dates as 'YYYY-MM-DD' strings (None when missing); strings pass through unchanged."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime(SQL_DATE_FORMAT)
+    return column_values(series)
+
+
 def dates_to_str(df):
-    df['Took office'] = df['Took office'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notnull(x) else None)
-    df['Left office'] = df['Left office'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notnull(x) else None)
+    df['Took office'] = pd.Series(date_strings(df['Took office']), index=df.index, dtype=object)
+    df['Left office'] = pd.Series(date_strings(df['Left office']), index=df.index, dtype=object)
     return df
 
 def calculate_years_served(row):
@@ -84,36 +157,58 @@ def calculate_years_served(row):
         return round((row['Left office'] - row['Took office']).days / 365.25, 2)
     return 0.0
 
+def years_served(took_office, left_office):
+    """Column-wise calculate_years_served: whole days between the dates in years, 0.0 when either is missing."""
+    return ((left_office - took_office).dt.days / 365.25).round(2).fillna(0.0)
+
+def parse_dates(series):
+    """d/m/Y strings to datetime64, NaT where missing or unparseable.
+
+    Terms start and end on shared dates, so each distinct string is parsed
+    once and the results are spread back out by their factorize codes.
+    """
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(uniques, format=DATE_FORMAT, errors='coerce')
+    return pd.Series(parsed.take(codes, fill_value=pd.NaT), index=series.index, name=series.name)
+
+def parse_office_dates(df):
+    """Parses the d/m/Y office columns in place (unparseable dates become NaT) and adds Years Served."""
+    df['Took office'] = parse_dates(df['Took office'])
+    df['Left office'] = parse_dates(df['Left office'])
+    df['Years Served'] = years_served(df['Took office'], df['Left office'])
+    return df
+
 def load_data(file_path):
     dfs = pd.read_html(file_path)
-    df = dfs[0]
-    
-    df['Took office'] = df['Took office'].apply(convert_to_date)
-    df['Left office'] = df['Left office'].apply(convert_to_date)
-    
-    df['Years Served'] = df.apply(calculate_years_served, axis=1)
-    
-    return df
+    return parse_office_dates(dfs[0])
+
+def display_pres(pres_data, stats):
+    """Prints each row as it arrives, so pres_data can be a lazy cursor over any number of rows.
 
-def display_pres(pres_data):
+    The summary comes from stats (a TenureStats from tenure_stats()) rather
+    than from totals kept while printing.
+    """
     print("\n=== Presidents and Years Served ===")
     print(f"{'President':<30} {'Years Served':>15} {'Took Office':<15} {'Left Office':<15}")
     print("=" * 75)
     
-    total_presidents = len(pres_data)
-    total_years_served = 0
-    
     for president, years_served, took_office, left_office in pres_data:
-        total_years_served += years_served
         took_office_str = took_office if took_office else "Unknown"
         left_office_str = left_office if left_office else "Present"
         
-        print(f"{president:<30} {years_served:>15.2f} {took_office_str:<15} {left_office_str:<15}")
+        print(f"{president or 'Unknown':<30} {years_served:>15.2f} {took_office_str:<15} {left_office_str:<15}")
     
-    avg_years = total_years_served / total_presidents if total_presidents > 0 else 0
     print("=" * 75)
-    print(f"Total Presidents: {total_presidents}")
-    print(f"Average Years Served: {avg_years:.2f}")
+    print(f"Total Presidents: {stats.count}")
+    print(f"Average Years Served: {stats.average or 0:.2f}")
+
+def display_eras(eras, era_years=ERA_YEARS):
+    print(f"\n=== Years Served by {era_years}-Year Era ===")
+    print(f"{'Era':<12} {'Presidents':>10} {'Average':>10} {'Shortest':>10} {'Longest':>10}")
+    print("=" * 56)
+    for era, count, average, shortest, longest in eras:
+        print(f"{f'{era}-{era + era_years - 1}':<12} {count:>10} {average:>10.2f} {shortest:>10.2f} {longest:>10.2f}")
+
 #outputs a table of all presidents + years served + office in and out. Also give the average years served and total pres.
 if __name__ == '__main__':
     try:
@@ -124,8 +219,8 @@ if __name__ == '__main__':
         president_db = PresidentDF()
         president_db.insert_data(pres_df)
         
-        pres_data = president_db.fetch_pres()
-        display_pres(pres_data)
+        display_pres(president_db.fetch_pres(), president_db.tenure_stats())
+        display_eras(president_db.tenure_by_era())
         
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -158,12 +253,55 @@ class TestPresidentDF(unittest.TestCase):
         df = pd.DataFrame(test_data)
         self.president_db.insert_data(df)
         
-        fetched_data = self.president_db.fetch_pres()
+        fetched_data = list(self.president_db.fetch_pres())
         
         self.assertEqual(len(fetched_data), 1)
         self.assertEqual(fetched_data[0][0], 'George Washington')
         self.assertAlmostEqual(fetched_data[0][1], 7.84)
 
+    def test_parse_office_dates(self):
+        df = pd.DataFrame({
+            'Presidency': [1, 45, 46],
+            'President': ['George Washington', None, 'Nobody'],
+            'Took office': ['30/04/1789', '20/01/2017', '20/01/2017'],
+            'Left office': ['4/03/1797', None, 'Incumbent'],
+        })
+        parse_office_dates(df)
+        expected = df.apply(calculate_years_served, axis=1)
+        self.assertEqual(df['Years Served'].tolist(), expected.tolist())
+        self.assertEqual(df['Years Served'].tolist(), [7.84, 0.0, 0.0])
+        self.president_db.insert_data(df)
+        rows = self.president_db.cursor.execute("SELECT * FROM presidents ORDER BY Presidency").fetchall()
+        self.assertEqual(rows, [(1, 'George Washington', '1789-04-30', '1797-03-04', 7.84),
+                                (45, None, '2017-01-20', None, 0.0),
+                                (46, 'Nobody', '2017-01-20', None, 0.0)])
+
+    def test_lazy_iteration_and_aggregates(self):
+        df = pd.DataFrame({
+            'Presidency': [1, 2, 16, 26, 45],
+            'President': ['George Washington', 'John Adams', 'Abraham Lincoln', 'Theodore Roosevelt', 'Incumbent'],
+            'Took office': ['30/04/1789', '4/03/1797', '4/03/1861', '14/09/1901', '20/01/2025'],
+            'Left office': ['4/03/1797', '4/03/1801', '15/04/1865', '4/03/1909', None],
+        })
+        self.president_db.insert_data(parse_office_dates(df))
+        rows = self.president_db.iter_rows(PRESIDENTS_QUERY + " ORDER BY Took_office", batch_size=2)
+        self.assertEqual(next(rows)[0], 'George Washington')
+        self.assertEqual([row[0] for row in rows][-1], 'Incumbent')
+        self.assertEqual(len(list(self.president_db)), 5)
+        stats = self.president_db.tenure_stats()
+        self.assertEqual((stats.count, stats.shortest, stats.longest), (5, 0.0, 7.84))
+        self.assertAlmostEqual(stats.average, sum(df['Years Served']) / 5)
+        plan = [row[-1] for row in self.president_db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT (SELECT MIN(Years_Served) FROM presidents)")]
+        self.assertTrue(any(step.startswith('SEARCH') for step in plan), plan)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            display_pres(self.president_db.fetch_pres(), stats)
+        self.assertIn("Total Presidents: 5\nAverage Years Served: 4.68", output.getvalue())
+        self.assertEqual(list(self.president_db.tenure_by_era(100)),
+                         [(1700, 2, 5.92, 4.0, 7.84), (1800, 1, 4.11, 4.11, 4.11), (1900, 1, 7.47, 7.47, 7.47),
+                          (2000, 1, 0.0, 0.0, 0.0)])
+
     def test_fetch_pres(self):
         """Test fetching presidents data."""
         test_data = {
@@ -176,7 +314,7 @@ class TestPresidentDF(unittest.TestCase):
         df = pd.DataFrame(test_data)
         self.president_db.insert_data(df)
         
-        fetched_data = self.president_db.fetch_pres()
+        fetched_data = list(self.president_db.fetch_pres())
 
         self.assertEqual(len(fetched_data), 1)
         self.assertEqual(fetched_data[0][0], 'George Washington')
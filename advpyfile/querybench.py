@@ -0,0 +1,227 @@
+import csv
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from itertools import islice, cycle
+from blobcodecs import encode_blob, decode_blob
+from Querybuilder import QueryBuilder
+from csvindex import CSVOffsetIndex
+from pagedmodel import PagedModel
+from searchindex import SearchIndex
+
+FIELDS = "(id, first_name, last_name, email)"
+ROWS = 100_000
+
+
+def mock_rows(count=ROWS, path='MOCK_DATA.csv'):
+    """MOCK_DATA.csv rows cycled to count, with fresh ids."""
+    with open(path, newline='') as f:
+        base = [(row['first_name'], row['last_name'], row['email']) for row in csv.DictReader(f)]
+    for i, row in enumerate(islice(cycle(base), count)):
+        yield (i,) + row
+
+
+def fresh_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE MOCK_DATA (id INTEGER PRIMARY KEY, first_name TEXT, last_name BLOB, email BLOB)")
+    return conn
+
+
+def per_row(qb, conn, rows):
+    """The querydisplay loop: one insert() and one execute per row."""
+    for row in rows:
+        query, values = qb.insert("MOCK_DATA", FIELDS, row)
+        conn.execute(query, values)
+    conn.commit()
+
+
+def planned(mode):
+    def run(qb, conn, rows):
+        for query, params in qb.insert_many("MOCK_DATA", FIELDS, rows, mode=mode):
+            if mode == "executemany":
+                conn.executemany(query, params)
+            else:
+                conn.execute(query, params)
+        conn.commit()
+    return run
+
+
+def benchmark_insert_many(count=ROWS):
+    print(f"{count} MOCK_DATA-shaped rows into in-memory SQLite")
+    for name, run in (("per-row insert()", per_row),
+                      ("insert_many values", planned("values")),
+                      ("insert_many executemany", planned("executemany"))):
+        qb = QueryBuilder()
+        conn = fresh_db()
+        start = time.perf_counter()
+        run(qb, conn, mock_rows(count))
+        elapsed = time.perf_counter() - start
+        assert conn.execute("SELECT COUNT(*) FROM MOCK_DATA").fetchone()[0] == count
+        conn.close()
+        print(f"{name:<26} {count / elapsed:>12,.0f} rows/sec")
+
+
+def blob_payloads():
+    """Representative photo, html, numeric and record payloads with their size in bytes."""
+    rng = random.Random(0)
+    # a PNG-like body: mostly incompressible, with some flat runs
+    photo = b''.join(rng.randbytes(4096) if i % 4 else b'\x00' * 4096 for i in range(128))
+    with open('Dwarfplanets.html', 'rb') as f:
+        html = f.read().decode('utf-8', errors='replace') * 20
+    readings = [rng.uniform(300, 420) for _ in range(200_000)]
+    with open('MOCK_DATA.csv', newline='') as f:
+        records = list(csv.DictReader(f))
+    return [
+        ("photo", photo, len(photo), ("raw", "pickle5", "zlib", "lzma")),
+        ("html", html, len(html.encode('utf-8')), ("text", "pickle5", "zlib", "lzma")),
+        ("numeric", readings, 8 * len(readings), ("numeric", "pickle5", "zlib")),
+        ("records", records, len(encode_blob(records, 'pickle5')), ("pickle5", "zlib", "lzma")),
+    ]
+
+
+def timed(func, arg, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def benchmark_codecs():
+    print(f"\n{'payload':<9} {'codec':<9} {'stored KB':>10} {'ratio':>6} {'encode MB/s':>12} {'decode MB/s':>12}")
+    for name, value, size, codecs in blob_payloads():
+        for codec in ("pickle",) + codecs:
+            blob, encode_time = timed(lambda v: encode_blob(v, codec), value)
+            decoded, decode_time = timed(decode_blob, blob)
+            assert decoded == value or codec == "numeric" and decoded == list(value)
+            print(f"{name:<9} {codec:<9} {len(blob) / 1024:>10.0f} {len(blob) / size:>6.2f} "
+                  f"{size / encode_time / 2**20:>12.0f} {size / decode_time / 2**20:>12.0f}")
+
+
+SEARCH_TERMS = ("farr", "izaks", "myspace", "barrett", "de cruce", "scribd", "zzz")
+SEARCH_COLUMNS = ("first_name", "last_name", "email")
+
+
+def search_latencies(search, repeat=5):
+    """Median latency in ms for each search term."""
+    latencies = {}
+    for term in SEARCH_TERMS:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search(term)
+            samples.append(time.perf_counter() - start)
+        latencies[term] = statistics.median(samples) * 1000
+    return latencies
+
+
+def benchmark_search(count=1_000_000, trigram_count=None):
+    """Top-20 search latency: LIKE scans until 20 rows match, the index looks them up and ranks.
+
+    Both backends run on count rows so their numbers line up. The trigram
+    index lives in process memory (about 1.8 GB peak RSS at 1M rows); trigram_count
+    scales it down on smaller machines, and the output then says so.
+    """
+    like = " OR ".join(f"{column} LIKE ?" for column in SEARCH_COLUMNS)
+    like_query = f"SELECT * FROM MOCK_DATA WHERE {like} LIMIT 20"
+    trigram_count = count if trigram_count is None else trigram_count
+    if trigram_count != count:
+        print(f"\ntrigram runs on {trigram_count} rows, not {count}: compare it with the LIKE column "
+              f"of its own table only; its build time and memory grow about linearly with rows")
+    for backend, rows in (("fts5", count), ("trigram", trigram_count)):
+        conn = fresh_db()
+        conn.executemany("INSERT INTO MOCK_DATA VALUES (?, ?, ?, ?)", mock_rows(rows))
+        conn.commit()
+        like_ms = search_latencies(lambda term: conn.execute(like_query, (f"%{term}%",) * 3).fetchall())
+        start = time.perf_counter()
+        index = SearchIndex(conn, "MOCK_DATA", SEARCH_COLUMNS, backend=backend)
+        build = time.perf_counter() - start
+        index_ms = search_latencies(lambda term: index.search(term, limit=20))
+        print(f"\n{rows} rows, {backend} index built in {build:.1f}s")
+        print(f"{'term':<10} {'LIKE ms':>9} {backend + ' ms':>11}")
+        for term in SEARCH_TERMS:
+            print(f"{term:<10} {like_ms[term]:>9.2f} {index_ms[term]:>11.2f}")
+        conn.close()
+
+
+def write_mock_csv(path, count):
+    with open('MOCK_DATA.csv', newline='') as f:
+        header = next(csv.reader(f))
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(row + ('Male', '10.0.0.1') for row in mock_rows(count))
+
+
+def traced(func):
+    """func's result, run time, and peak traced MiB from a second, traced run (tracing slows it several-fold)."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def benchmark_paged_display(count=2_000_000, visible=15):
+    """QueryDisplayApp startup: every row as a dict versus an offset index read a window at a time."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'MOCK_DATA.csv')
+        write_mock_csv(path, count)
+        print(f"\n{count} row CSV ({os.path.getsize(path) / 2**20:.0f} MiB)")
+
+        def read_all():
+            with open(path, newline='') as f:
+                return list(csv.DictReader(f))
+        rows, elapsed, peak = traced(read_all)
+        assert len(rows) == count
+        del rows
+        print(f"{'list of dicts':<22} {elapsed:>8.2f}s {peak:>10.0f} MB peak")
+
+        start = time.perf_counter()
+        index = CSVOffsetIndex(path, sidecar=None)
+        next(index.build(50_000))
+        index.rows(0, visible)
+        first_elapsed = time.perf_counter() - start
+
+        def build():
+            index = CSVOffsetIndex(path, key='id')
+            list(index.build())
+            index.close()
+            return index
+        index, elapsed, peak = traced(build)
+        assert len(index) == count
+        print(f"{'offset index + id map':<22} {elapsed:>8.2f}s {peak:>10.0f} MB peak "
+              f"(first window after {first_elapsed * 1000:.0f} ms)")
+        index, elapsed, peak = traced(lambda: CSVOffsetIndex(path, key='id'))
+        assert index.from_sidecar and len(index) == count
+        print(f"{'sidecar reload':<22} {elapsed:>8.2f}s {peak:>10.0f} MB peak")
+
+        rng = random.Random(0)
+        ids = [rng.randrange(count) for _ in range(1000)]
+        start = time.perf_counter()
+        assert all(index.get_many(ids))
+        print(f"{'1000 rows by id':<22} {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+        model = PagedModel(index)
+        latencies = []
+        for _ in range(200):
+            start = time.perf_counter()
+            window = model.window(rng.randrange(count - visible), visible)
+            latencies.append(time.perf_counter() - start)
+            assert len(window) == visible
+        print(f"{'random window':<22} {statistics.median(latencies) * 1000:>8.2f} ms median")
+
+
+if __name__ == "__main__":
+    benchmark_insert_many()
+    benchmark_codecs()
+    benchmark_search()
+    benchmark_paged_display()
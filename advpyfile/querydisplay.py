@@ -1,7 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import csv
+import queue
 from Querybuilder import QueryBuilder  
+from csvindex import CSVOffsetIndex
+from pagedmodel import PagedModel, PageLoader
+
+MOCK_DATA = "MOCK_DATA.csv"
+VISIBLE_ROWS = 15
+POLL_MS = 50
 
 class QueryDisplayApp:
     def __init__(self, root):
@@ -11,7 +18,13 @@ class QueryDisplayApp:
 
         self.qb = QueryBuilder()
 
-        self.mock_data = self.read_mock_data() #the file of data i chose was a csv file
+        # the file of data i chose was a csv file; it is indexed in the background
+        # (or loaded from MOCK_DATA.csv.id.idx) and only the rows on screen are read
+        self.model = PagedModel(CSVOffsetIndex(MOCK_DATA, key='id'))
+        self.loader = PageLoader(self.model).start()
+        self.total_rows = 0
+        self.view_start = 0
+        self.showing_data = False
 
         #creating buttons + text more visible:
         style = ttk.Style()
@@ -32,39 +45,51 @@ class QueryDisplayApp:
         self.execute_btn.grid(row=0, column=2, padx=10)
 
         # displaying the query results
-        self.tree = ttk.Treeview(self.root, columns=("QueryType", "Fields", "Values"), show='headings', height=15)
+        self.frame_tree = ttk.Frame(self.root)
+        self.frame_tree.pack(pady=10, padx=10)
+        self.tree = ttk.Treeview(self.frame_tree, columns=("QueryType", "Fields", "Values"), show='headings',
+                                 height=VISIBLE_ROWS)
         self.tree.heading('QueryType', text="Type of Query")
         self.tree.heading('Fields', text="Field Headers")
         self.tree.heading('Values', text="Data Values")
         self.tree.column('QueryType', anchor='center', width=100)
         self.tree.column('Fields', anchor='center', width=200)
         self.tree.column('Values', anchor='center', width=300)
-        self.tree.pack(pady=20, padx=10)
+        # the scrollbar spans every row of the file, not just the rows in the tree
+        self.scrollbar = ttk.Scrollbar(self.frame_tree, orient="vertical", command=self.scroll)
+        self.tree.pack(side="left")
+        self.scrollbar.pack(side="right", fill="y")
+        for event in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(event, self.on_mousewheel)
+
+        self.status = ttk.Label(self.root, text=f"Indexing {MOCK_DATA}...", foreground="black")
+        self.status.pack()
 
         style.configure("Treeview.Heading", foreground="black")
+        self.root.after(POLL_MS, self.poll_loader)
 
     def read_mock_data(self):
+        """Streams MOCK_DATA.csv as dicts, one row at a time."""
         try:
-            with open("MOCK_DATA.csv", newline='') as csvfile: # edit the file read, in order to read from the query you want.
-                reader = csv.DictReader(csvfile)
-                return [row for row in reader]
+            with open(MOCK_DATA, newline='') as csvfile: # edit the file read, in order to read from the query you want.
+                yield from csv.DictReader(csvfile)
         except FileNotFoundError:
             messagebox.showerror("Error", "MOCK_DATA.csv not found.")
-            return []
 
     def execute_query(self):
         query_type = self.query_type_var.get().lower()
+        self.showing_data = False
 
         if query_type == "select":
             query = self.qb.select("MOCK_DATA", "*", "")
             self.display_all_data(query_type)
 
         elif query_type == "insert":
-            if self.mock_data:  
-                for data in self.mock_data:  
-                    query, values = self.qb.insert("MOCK_DATA", "(id, first_name, last_name, email)", 
-                                                    (data['id'], data['first_name'], data['last_name'], data['email']))
-                    self.display_query(query_type, "(id, first_name, last_name, email)", values)
+            rows = ((data['id'], data['first_name'], data['last_name'], data['email']) for data in self.read_mock_data())
+            self.tree.delete(*self.tree.get_children())
+            for query, values in self.qb.insert_many("MOCK_DATA", "(id, first_name, last_name, email)", rows):
+                self.tree.insert('', 'end', values=(query_type, "(id, first_name, last_name, email)",
+                                                    f"{len(values) // 4} rows"))
 
         elif query_type == "update":
             query, values = self.qb.update("MOCK_DATA", {"first_name": "Jane"}, "id = 1")
@@ -92,11 +117,65 @@ class QueryDisplayApp:
         self.tree.insert('', 'end', values=(query_type, fields, values))
 
     def display_all_data(self, query_type):
-        # Clear previous results
+        # Clear previous results; the rows arrive from the loader thread
+        self.tree.delete(*self.tree.get_children())
+        self.data_query_type = query_type
+        self.showing_data = True
+        self.show_window(0)
+
+    def show_window(self, start):
+        """Asks the loader for the VISIBLE_ROWS rows from start; poll_loader draws them."""
+        self.view_start = max(0, min(start, self.total_rows - VISIBLE_ROWS))
+        self.loader.request(self.view_start, VISIBLE_ROWS)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if not self.showing_data or not self.total_rows:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.view_start / self.total_rows,
+                           min(1.0, (self.view_start + VISIBLE_ROWS) / self.total_rows))
+
+    def scroll(self, action, amount, unit=None):
+        if not self.showing_data:
+            return
+        if action == "moveto":
+            self.show_window(int(float(amount) * self.total_rows))
+        else:
+            step = VISIBLE_ROWS if unit == "pages" else 1
+            self.show_window(self.view_start + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll("scroll", -3, "units")
+        else:
+            self.scroll("scroll", 3, "units")
+        return "break"
+
+    def poll_loader(self):
+        while True:
+            try:
+                kind, payload = self.loader.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.total_rows, complete = payload
+                self.status.configure(text=f"{self.total_rows:,} rows" + ("" if complete else " (indexing...)"))
+                self.update_scrollbar()
+            elif kind == "window":
+                start, rows = payload
+                if self.showing_data and start == self.view_start:
+                    self.render_rows(rows)
+            elif kind == "error":
+                self.status.configure(text="")
+                messagebox.showerror("Error", f"Could not read {MOCK_DATA}: {payload}")
+        self.root.after(POLL_MS, self.poll_loader)
+
+    def render_rows(self, rows):
         self.tree.delete(*self.tree.get_children())
-        for data in self.mock_data:
-            values = (data['id'], data['first_name'], data['last_name'], data['email'])
-            self.tree.insert('', 'end', values=(query_type, "(id, first_name, last_name, email)", values))
+        for row in rows:
+            values = tuple(row[:4])  # id, first_name, last_name, email
+            self.tree.insert('', 'end', values=(self.data_query_type, "(id, first_name, last_name, email)", values))
 
 if __name__ == "__main__":
     root = tk.Tk()
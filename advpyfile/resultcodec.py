@@ -0,0 +1,282 @@
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Iterable, Iterator, List, Sequence, Tuple
+import unittest
+
+# A result is a header block followed by any number of batch blocks.
+#   header: column count (H), then each column name as length (H) + utf-8 bytes
+#   batch:  row count (I), then per column: type code (c), null flag (B),
+#           a null bitmap when the flag is set, then the packed column values
+INT = b'q'      # int64 array
+FLOAT = b'd'    # float64 array
+TEXT = b's'     # uint32 length array + utf-8 bytes
+JOINED = b't'   # text with no NUL characters: uint32 byte length + NUL-separated utf-8
+BLOB = b'b'     # uint32 length array + raw bytes
+NULL = b'n'     # every value is NULL, no data
+MIXED = b'v'    # one tag per value, then each value packed by its own tag
+
+COUNT = struct.Struct('<H')
+ROWS = struct.Struct('<I')
+COLUMN = struct.Struct('<cB')
+BLOCK = struct.Struct('<I')
+SCALAR = {INT: struct.Struct('<q'), FLOAT: struct.Struct('<d')}
+
+
+def _little_endian(arr: array) -> array:
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+TYPE_CODES = {type(None): NULL, bool: INT, int: INT, float: FLOAT, str: TEXT,
+              bytes: BLOB, bytearray: BLOB, memoryview: BLOB}
+
+
+def _code_for_type(value_type: type) -> bytes:
+    try:
+        return TYPE_CODES[value_type]
+    except KeyError:
+        raise TypeError(f"Cannot encode value of type {value_type.__name__}.")
+
+
+def _type_code(value) -> bytes:
+    return _code_for_type(type(value))
+
+
+def _column_type(values: Sequence) -> bytes:
+    codes = {_code_for_type(t) for t in set(map(type, values))} - {NULL}
+    if not codes:
+        return NULL
+    # ints next to floats stay MIXED: promoting them to float64 would turn 3
+    # into 3.0 and round anything past 2**53
+    return codes.pop() if len(codes) == 1 else MIXED
+
+
+def _pack_sized(values: Iterable, text: bool) -> bytes:
+    data = [v.encode('utf-8') if text else bytes(v) for v in values]
+    return _little_endian(array('I', map(len, data))).tobytes() + b''.join(data)
+
+
+def _pack_values(code: bytes, values: List) -> bytes:
+    if code in SCALAR:
+        return _little_endian(array(code.decode(), values)).tobytes()
+    if code in (TEXT, BLOB):
+        return _pack_sized(values, code == TEXT)
+    # MIXED: a tag byte per value, then each value on its own
+    tags = [_type_code(v) for v in values]
+    parts = [b''.join(tags)]
+    for tag, value in zip(tags, values):
+        if tag in SCALAR:
+            parts.append(SCALAR[tag].pack(value))
+        elif tag != NULL:
+            parts.append(_pack_sized([value], tag == TEXT))
+    return b''.join(parts)
+
+
+def encode_header(names: Sequence[str]) -> bytes:
+    parts = [COUNT.pack(len(names))]
+    for name in names:
+        encoded = name.encode('utf-8')
+        parts.append(COUNT.pack(len(encoded)) + encoded)
+    return b''.join(parts)
+
+
+def encode_batch(rows: Sequence[Sequence], column_count: int) -> bytes:
+    """Packs a batch of rows column by column."""
+    parts = [ROWS.pack(len(rows))]
+    columns = list(zip(*rows)) if rows else [()] * column_count
+    for values in columns:
+        code = _column_type(values)
+        if code in (NULL, MIXED):
+            parts.append(COLUMN.pack(code, 0) + (_pack_values(code, values) if code == MIXED else b''))
+            continue
+        bitmap = b''
+        present = values
+        if None in values:
+            nulls = bytearray((len(values) + 7) // 8)
+            for i, value in enumerate(values):
+                if value is None:
+                    nulls[i >> 3] |= 1 << (i & 7)
+            bitmap = bytes(nulls)
+            present = [v for v in values if v is not None]
+        if code == TEXT:
+            joined = '\x00'.join(present)
+            if joined.count('\x00') == len(present) - 1:
+                data = joined.encode('utf-8')
+                parts.append(COLUMN.pack(JOINED, bool(bitmap)) + bitmap + ROWS.pack(len(data)) + data)
+                continue
+        parts.append(COLUMN.pack(code, bool(bitmap)) + bitmap + _pack_values(code, present))
+    return b''.join(parts)
+
+
+def iter_encoded(cursor, batch_size: int = 1000) -> Iterator[bytes]:
+    """Yields the header block, then one block per fetchmany batch of the cursor."""
+    names = [column[0] for column in cursor.description or ()]
+    yield encode_header(names)
+    if not names:
+        return
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield encode_batch(rows, len(names))
+
+
+def encode_result(cursor, batch_size: int = 1000) -> bytes:
+    """The whole result as one buffer of length-prefixed blocks."""
+    return b''.join(BLOCK.pack(len(block)) + block for block in iter_encoded(cursor, batch_size))
+
+
+def decode_header(data: bytes) -> Tuple[str, ...]:
+    view = memoryview(data)
+    (count,), offset = COUNT.unpack_from(view), COUNT.size
+    names = []
+    for _ in range(count):
+        (length,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        names.append(bytes(view[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return tuple(names)
+
+
+def _unpack_sized(view: memoryview, offset: int, count: int, text: bool) -> Tuple[List, int]:
+    lengths = array('I')
+    lengths.frombytes(view[offset:offset + 4 * count])
+    bounds = list(accumulate(_little_endian(lengths), initial=offset + 4 * count))
+    chunks = (bytes(view[start:end]) for start, end in zip(bounds, bounds[1:]))
+    values = [chunk.decode('utf-8') for chunk in chunks] if text else list(chunks)
+    return values, bounds[-1]
+
+
+def _unpack_values(code: bytes, view: memoryview, offset: int, count: int) -> Tuple[List, int]:
+    if code in SCALAR:
+        arr = array(code.decode())
+        arr.frombytes(view[offset:offset + arr.itemsize * count])
+        return _little_endian(arr).tolist(), offset + arr.itemsize * count
+    if code == JOINED:
+        (length,) = ROWS.unpack_from(view, offset)
+        offset += ROWS.size
+        text = bytes(view[offset:offset + length]).decode('utf-8')
+        return (text.split('\x00') if count else []), offset + length
+    if code in (TEXT, BLOB):
+        return _unpack_sized(view, offset, count, code == TEXT)
+    tags = [bytes((b,)) for b in view[offset:offset + count]]
+    offset += count
+    values = []
+    for tag in tags:
+        if tag == NULL:
+            values.append(None)
+        elif tag in SCALAR:
+            values.append(SCALAR[tag].unpack_from(view, offset)[0])
+            offset += SCALAR[tag].size
+        else:
+            (length,) = ROWS.unpack_from(view, offset)
+            offset += ROWS.size
+            chunk = bytes(view[offset:offset + length])
+            values.append(chunk.decode('utf-8') if tag == TEXT else chunk)
+            offset += length
+    return values, offset
+
+
+def decode_batch(data: bytes, column_count: int) -> Iterator[tuple]:
+    """Unpacks one batch block and yields its rows."""
+    view = memoryview(data)
+    (count,), offset = ROWS.unpack_from(view), ROWS.size
+    columns = []
+    for _ in range(column_count):
+        code, has_nulls = COLUMN.unpack_from(view, offset)
+        offset += COLUMN.size
+        if code == NULL:
+            columns.append([None] * count)
+            continue
+        nulls = None
+        if has_nulls:
+            bitmap = view[offset:offset + (count + 7) // 8]
+            offset += len(bitmap)
+            nulls = [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(count)]
+            present = count - sum(nulls)
+        else:
+            present = count
+        values, offset = _unpack_values(code, view, offset, present)
+        if nulls:
+            it = iter(values)
+            values = [None if is_null else next(it) for is_null in nulls]
+        columns.append(values)
+    return zip(*columns) if columns else iter(())
+
+
+def decode_blocks(blocks: Iterable[bytes]) -> Iterator[tuple]:
+    """Yields the column names, then every row, from a header block and its batch blocks."""
+    blocks = iter(blocks)
+    names = decode_header(next(blocks))
+    yield names
+    for block in blocks:
+        yield from decode_batch(block, len(names))
+
+
+def split_blocks(data: bytes) -> Iterator[bytes]:
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (length,) = BLOCK.unpack_from(view, offset)
+        offset += BLOCK.size
+        yield view[offset:offset + length]
+        offset += length
+
+
+def decode_result(data: bytes) -> Iterator[tuple]:
+    """Lazily decodes an encode_result buffer: column names first, then rows."""
+    return decode_blocks(split_blocks(data))
+
+
+class TestResultCodec(unittest.TestCase):
+    def setUp(self):
+        import sqlite3
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE t (id INTEGER, name TEXT, score REAL, photo BLOB, misc)")
+        self.rows = [
+            (1, 'Ceres', 2.77, b'\x89PNG', 'a'),
+            (2, None, 39.5, b'', 3),
+            (3, '', None, None, 4.5),
+            (4, 'Eris', 67, b'\x00\x01', None),
+        ]
+        self.conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?)", self.rows)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_round_trip(self):
+        data = encode_result(self.conn.execute("SELECT * FROM t"), batch_size=3)
+        decoded = list(decode_result(data))
+        self.assertEqual(decoded[0], ('id', 'name', 'score', 'photo', 'misc'))
+        self.assertEqual(decoded[1:], [(1, 'Ceres', 2.77, b'\x89PNG', 'a'), (2, None, 39.5, b'', 3),
+                                       (3, '', None, None, 4.5), (4, 'Eris', 67.0, b'\x00\x01', None)])
+
+    def test_mixed_int_and_float_column(self):
+        rows = [(3,), (1.5,), (None,), (2**60 + 1,)]
+        self.assertEqual(list(decode_batch(encode_batch(rows, 1), 1)), rows)
+        self.conn.execute("DELETE FROM t")
+        self.conn.executemany("INSERT INTO t (id, misc) VALUES (?, ?)", [(1, 3), (2, 4.5), (3, 2**60 + 1)])
+        decoded = list(decode_result(encode_result(self.conn.execute("SELECT misc FROM t ORDER BY id"))))
+        self.assertEqual(decoded, [('misc',), (3,), (4.5,), (2**60 + 1,)])
+        self.assertIs(type(decoded[1][0]), int)
+
+    def test_text_with_nul_characters(self):
+        rows = [('a\x00b',), ('',), (None,), ('c',)]
+        data = encode_batch(rows, 1)
+        self.assertEqual(list(decode_batch(data, 1)), rows)
+
+    def test_empty_result(self):
+        data = encode_result(self.conn.execute("SELECT id FROM t WHERE id > 10"))
+        self.assertEqual(list(decode_result(data)), [('id',)])
+
+    def test_batches_stream_from_cursor(self):
+        blocks = list(iter_encoded(self.conn.execute("SELECT id FROM t"), batch_size=2))
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(list(decode_batch(blocks[2], 1)), [(3,), (4,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import re
+import sqlite3
+from collections import defaultdict
+from itertools import count
+import unittest
+from Querybuilder import QueryBuilder, TOKEN, match_expression
+
+_trigger_ids = count()
+
+
+def fts5_available(conn):
+    options = {row[0] for row in conn.execute("PRAGMA compile_options")}
+    return 'ENABLE_FTS5' in options
+
+
+class TrigramIndex:
+    """In-process substring index over a table's searchable columns.
+
+    Every document is the lower-cased text of its columns, keyed by rowid,
+    with a postings set of rowids per trigram. A search intersects the
+    postings of the query's trigrams and then checks the candidates, so
+    words shorter than three characters still match, only more slowly.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.postings = defaultdict(set)
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, rowid, text):
+        self.remove(rowid)
+        text = (text or '').lower()
+        self.documents[rowid] = text
+        for trigram in self.trigrams(text):
+            self.postings[trigram].add(rowid)
+
+    def remove(self, rowid):
+        text = self.documents.pop(rowid, None)
+        if text is None:
+            return
+        for trigram in self.trigrams(text):
+            rowids = self.postings[trigram]
+            rowids.discard(rowid)
+            if not rowids:
+                del self.postings[trigram]
+
+    def search(self, search_term, prefix=True, limit=None):
+        """rowids whose text holds every word of search_term, best first.
+
+        As with the FTS5 backend, each word must start a word of the document
+        with prefix, and match a whole word without it. Documents where more of
+        the words match whole words rank first, then shorter documents.
+        """
+        words = [word.lower() for word in TOKEN.findall(search_term)]
+        assert words, "Search term must contain a word."
+        candidates = None
+        for word in words:
+            for trigram in self.trigrams(word):
+                rowids = self.postings.get(trigram, set())
+                candidates = set(rowids) if candidates is None else candidates & rowids
+                if not candidates:
+                    return []
+        if candidates is None:
+            candidates = self.documents.keys()
+        whole = [re.compile(r'\b' + re.escape(word) + r'\b') for word in words]
+        patterns = [re.compile(r'\b' + re.escape(word)) for word in words] if prefix else whole
+        scored = []
+        for rowid in candidates:
+            text = self.documents[rowid]
+            if all(pattern.search(text) for pattern in patterns):
+                exact = sum(1 for pattern in whole if pattern.search(text))
+                scored.append((-exact, len(text), rowid))
+        scored.sort()
+        return [rowid for _, _, rowid in scored[:limit]]
+
+
+class SearchIndex:
+    """Full-text search over some columns of a table, kept in sync by triggers.
+
+    With FTS5 compiled into SQLite, an external-content ``<table>_fts``
+    virtual table mirrors the columns and ranks matches with bm25. Without
+    it, a TrigramIndex in this process is fed by TEMP triggers that call
+    back into Python, so it only sees writes made through this connection,
+    and a rolled-back write is not undone in it.
+    """
+
+    def __init__(self, conn, table, columns=('name',), backend=None, query_builder=None):
+        self.conn = conn
+        self.table = table
+        self.columns = tuple(columns)
+        self.backend = backend or ('fts5' if fts5_available(conn) else 'trigram')
+        self.qb = query_builder or QueryBuilder()
+        if self.backend == 'fts5':
+            self._create_fts5()
+        elif self.backend == 'trigram':
+            self._create_trigram()
+        else:
+            raise ValueError(f"Unknown search backend: {self.backend}")
+
+    def _create_fts5(self):
+        table, fts = self.table, f"{self.table}_fts"
+        columns = ', '.join(self.columns)
+        new = ', '.join(f"new.{column}" for column in self.columns)
+        old = ', '.join(f"old.{column}" for column in self.columns)
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        self.conn.executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='rowid');
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old});
+                INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new});
+            END;
+        """)
+        if not exists:
+            self.rebuild()
+
+    def _create_trigram(self):
+        self.trigram = TrigramIndex()
+        function = f"_search_sync_{next(_trigger_ids)}"
+        self.conn.create_function(function, 3, self._sync, deterministic=False)
+        text = " || ' ' || ".join(f"coalesce({{row}}.{column}, '')" for column in self.columns)
+        new = text.format(row='new')
+        prefix = f"{self.table}_{function}"
+        self.conn.executescript(f"""
+            CREATE TEMP TRIGGER {prefix}_ai AFTER INSERT ON main.{self.table} BEGIN
+                SELECT {function}('+', new.rowid, {new});
+            END;
+            CREATE TEMP TRIGGER {prefix}_ad AFTER DELETE ON main.{self.table} BEGIN
+                SELECT {function}('-', old.rowid, NULL);
+            END;
+            CREATE TEMP TRIGGER {prefix}_au AFTER UPDATE ON main.{self.table} BEGIN
+                SELECT {function}('-', old.rowid, NULL);
+                SELECT {function}('+', new.rowid, {new});
+            END;
+        """)
+        self.rebuild()
+
+    def _sync(self, op, rowid, text):
+        if op == '+':
+            self.trigram.add(rowid, text)
+        else:
+            self.trigram.remove(rowid)
+
+    def rebuild(self):
+        """Re-indexes every row of the table."""
+        if self.backend == 'fts5':
+            fts = f"{self.table}_fts"
+            with self.conn:
+                self.conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            return
+        self.trigram = TrigramIndex()
+        columns = ', '.join(self.columns)
+        for rowid, *values in self.conn.execute(f"SELECT rowid, {columns} FROM {self.table}"):
+            self.trigram.add(rowid, ' '.join(value or '' for value in values))
+
+    def search(self, search_term, prefix=True, limit=None):
+        """Rows of the table matching every word of search_term, best match first."""
+        if self.backend == 'fts5':
+            query, params = self.qb.search(self.table, search_term, full_text=True, prefix=prefix,
+                                           limit=limit)
+            return self.conn.execute(query, params).fetchall()
+        rowids = self.trigram.search(search_term, prefix=prefix, limit=limit)
+        if not rowids:
+            return []
+        placeholders = ', '.join(['?'] * len(rowids))
+        rows = self.conn.execute(f"SELECT rowid, * FROM {self.table} WHERE rowid IN ({placeholders})", rowids)
+        by_rowid = {row[0]: row[1:] for row in rows}
+        return [by_rowid[rowid] for rowid in rowids if rowid in by_rowid]
+
+
+class TestSearchIndex(unittest.TestCase):
+    ROWS = [(1, 'Farr', 'Izaks', 'fizaks0@myspace.com'), (2, 'Barrett', 'De Cruce', 'bdecruce1@scribd.com'),
+            (3, 'Farrah', 'Barr', 'fbarr2@farr.org'), (4, 'Ceres', 'Dwarf', 'ceres@belt.net')]
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE MOCK_DATA (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)")
+        self.conn.executemany("INSERT INTO MOCK_DATA VALUES (?, ?, ?, ?)", self.ROWS[:3])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def check_backend(self, backend):
+        index = SearchIndex(self.conn, 'MOCK_DATA', ('first_name', 'last_name', 'email'), backend=backend)
+        ids = lambda *args, **kwargs: [row[0] for row in index.search(*args, **kwargs)]
+        self.assertEqual(sorted(ids('farr')), [1, 3])
+        self.assertEqual(ids('barr'), [3, 2])
+        self.assertEqual(ids('barr', limit=1), [3])
+        self.assertEqual(ids('barr', prefix=False), [3])
+        self.assertEqual(ids('ceres'), [])
+        with self.conn:
+            self.conn.execute("INSERT INTO MOCK_DATA VALUES (?, ?, ?, ?)", self.ROWS[3])
+            self.conn.execute("UPDATE MOCK_DATA SET first_name = 'Zed' WHERE id = 1")
+            self.conn.execute("DELETE FROM MOCK_DATA WHERE id = 2")
+        self.assertEqual(ids('ceres dwarf'), [4])
+        self.assertEqual(ids('farr'), [3])
+        self.assertEqual(ids('barrett'), [])
+
+    def test_fts5(self):
+        if not fts5_available(self.conn):
+            self.skipTest("SQLite was built without FTS5")
+        self.check_backend('fts5')
+
+    def test_trigram_fallback(self):
+        self.check_backend('trigram')
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression('john "o\'neil', prefix=True), '"john"* "o"* "neil"*')
+        self.assertEqual(match_expression('john', prefix=False), '"john"')
+
+
+if __name__ == "__main__":
+    unittest.main()
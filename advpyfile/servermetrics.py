@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Optional
+import unittest
+
+# upper bounds in seconds; anything slower lands in the final +Inf bucket
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are reported as bucket upper bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100
+        seen = 0
+        for bound, n in zip(self.buckets + (self.max,), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class LockWait:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "total_ms": self.total * 1000, "max_ms": self.max * 1000}
+
+
+class ServerMetrics:
+    """Thread-safe request counters for a socket server.
+
+    Tracks latency per request type, bytes in and out, open connections,
+    time spent waiting for pooled database connections, and replies by
+    error status. snapshot() returns everything as a JSON-ready dict.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.lock_waits: Dict[str, LockWait] = defaultdict(LockWait)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.active_connections = 0
+        self.total_connections = 0
+        self._snapshot_stop = None
+        self._snapshot_thread = None
+
+    def connection_opened(self):
+        with self.lock:
+            self.active_connections += 1
+            self.total_connections += 1
+
+    def connection_closed(self):
+        with self.lock:
+            self.active_connections -= 1
+
+    def record_request(self, kind: str, seconds: float, bytes_in: int, bytes_out: int,
+                       error: Optional[str] = None):
+        with self.lock:
+            self.requests += 1
+            self.latency[kind].observe(seconds)
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            if error:
+                self.errors[error] += 1
+
+    def record_lock_wait(self, lane: str, seconds: float):
+        with self.lock:
+            self.lock_waits[lane].observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_s": time.time() - self.started,
+                "requests": self.requests,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "active_connections": self.active_connections,
+                "total_connections": self.total_connections,
+                "errors": dict(self.errors),
+                "latency": {kind: h.snapshot() for kind, h in self.latency.items()},
+                "lock_wait": {lane: w.snapshot() for lane, w in self.lock_waits.items()},
+            }
+
+    def write_snapshot(self, path: str):
+        """Writes snapshot() as JSON, replacing the file atomically."""
+        directory = os.path.dirname(path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.stats-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def start_snapshots(self, path: str, interval: float = 10.0):
+        """Rewrites the snapshot file every interval seconds until stop_snapshots()."""
+        self.stop_snapshots()
+        stop = self._snapshot_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    logging.getLogger(__name__).warning("Could not write stats file %s: %s", path, e)
+
+        self._snapshot_thread = threading.Thread(target=run, daemon=True)
+        self._snapshot_thread.start()
+
+    def stop_snapshots(self):
+        """Stops the snapshot thread and waits for a write in progress to finish."""
+        if self._snapshot_stop is not None:
+            self._snapshot_stop.set()
+            self._snapshot_stop = None
+            if self._snapshot_thread is not threading.current_thread():
+                self._snapshot_thread.join()
+            self._snapshot_thread = None
+
+
+class SamplingFilter(logging.Filter):
+    """Passes every WARNING and above, and only a sample_rate share of quieter records."""
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.sample_rate
+
+
+def configure_logging(name: str, level=logging.INFO, sample_rate: float = 1.0, stream=None) -> logging.Logger:
+    """Sends a module's log records to stream at the given level and sample rate.
+
+    Unconfigured, only warnings and errors reach stderr; pass level=logging.WARNING
+    or sample_rate=0 to keep request logging off in production.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        if getattr(handler, 'sampled', False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.sampled = True
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    handler.addFilter(SamplingFilter(sample_rate))
+    logger.addHandler(handler)
+    return logger
+
+
+class TestServerMetrics(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.observe(0.0008)
+        histogram.observe(0.2)
+        histogram.observe(30.0)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        self.assertAlmostEqual(snapshot["p50_ms"], 1.0)
+        self.assertAlmostEqual(snapshot["p99_ms"], 250.0)
+        self.assertEqual(snapshot["buckets"]["+Inf"], 1)
+
+    def test_snapshot_file(self):
+        metrics = ServerMetrics()
+        metrics.connection_opened()
+        metrics.record_request("query", 0.002, 40, 10)
+        metrics.record_request("query", 0.004, 40, 30, error="NAK")
+        metrics.record_lock_wait("writer", 0.001)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stats.json')
+            metrics.write_snapshot(path)
+            with open(path) as f:
+                snapshot = json.load(f)
+        self.assertEqual(snapshot["requests"], 2)
+        self.assertEqual((snapshot["bytes_in"], snapshot["bytes_out"]), (80, 40))
+        self.assertEqual(snapshot["active_connections"], 1)
+        self.assertEqual(snapshot["errors"], {"NAK": 1})
+        self.assertEqual(snapshot["latency"]["query"]["count"], 2)
+        self.assertEqual(snapshot["lock_wait"]["writer"]["count"], 1)
+
+    def test_sampling_filter(self):
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg", None, None)
+        self.assertFalse(SamplingFilter(0.0).filter(record))
+        self.assertTrue(SamplingFilter(1.0).filter(record))
+        record.levelno = logging.ERROR
+        self.assertTrue(SamplingFilter(0.0).filter(record))
+
+
+if __name__ == "__main__":
+    unittest.main()
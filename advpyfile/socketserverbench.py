@@ -0,0 +1,127 @@
+import csv
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from socketserverclient import SqliteDB, ACK, NAK
+from resultcodec import encode_result, decode_result
+
+QUERIES_PER_CLIENT = 2000
+CLIENT_COUNTS = (1, 8, 64)
+MOCK_DATA_COPIES = 100
+
+
+class LegacySqliteDB:
+    """The original execute_query: one global lock and a new connection per query."""
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+
+    def execute_query(self, query, params=()):
+        with self.lock:
+            conn = None
+            try:
+                conn = sqlite3.connect(self.db_file)
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                conn.commit()
+                result = cursor.fetchall()
+                return result if result else ACK
+            except sqlite3.DatabaseError as e:
+                return NAK + str(e).encode('utf-8')
+            finally:
+                if conn:
+                    conn.close()
+
+    def close(self):
+        pass
+
+
+def seed(db_file, rows=1000):
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS example_table (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)")
+        conn.executemany("INSERT INTO example_table (name) VALUES (?)", ((f"name{i}",) for i in range(rows)))
+
+
+def run_clients(db, clients, write_every=10):
+    def work(n):
+        for i in range(QUERIES_PER_CLIENT):
+            if i % write_every == 0:
+                db.execute_query("INSERT INTO example_table (name) VALUES (?)", (f"client{n}",))
+            else:
+                db.execute_query("SELECT name FROM example_table WHERE id = ?", (i % 1000 + 1,))
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return clients * QUERIES_PER_CLIENT / elapsed
+
+
+def benchmark_pool():
+    print(f"{'clients':>8} {'legacy q/s':>12} {'pooled q/s':>12} {'speedup':>8}")
+    for clients in CLIENT_COUNTS:
+        rates = []
+        for factory in (LegacySqliteDB, SqliteDB):
+            with tempfile.TemporaryDirectory() as tmp:
+                db_file = os.path.join(tmp, 'bench.db')
+                seed(db_file)
+                db = factory(db_file)
+                rates.append(run_clients(db, clients))
+                db.close()
+        legacy, pooled = rates
+        print(f"{clients:>8} {legacy:>12.0f} {pooled:>12.0f} {pooled / legacy:>7.1f}x")
+
+
+def load_mock_data(conn, copies=MOCK_DATA_COPIES):
+    with open("MOCK_DATA.csv", newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        rows = [(int(row[0]),) + tuple(row[1:]) for row in reader]
+    conn.execute(f"CREATE TABLE MOCK_DATA ({header[0]} INTEGER, {', '.join(f'{h} TEXT' for h in header[1:])})")
+    step = len(rows)
+    for copy in range(copies):
+        conn.executemany(f"INSERT INTO MOCK_DATA VALUES ({', '.join('?' * len(header))})",
+                         ((row[0] + copy * step,) + row[1:] for row in rows))
+
+
+def time_it(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_encoding():
+    conn = sqlite3.connect(':memory:')
+    load_mock_data(conn)
+    query = "SELECT * FROM MOCK_DATA"
+    codecs = {
+        'json': (lambda: json.dumps(conn.execute(query).fetchall()).encode('utf-8'),
+                 lambda data: json.loads(data)),
+        'pickle': (lambda: pickle.dumps(conn.execute(query).fetchall()),
+                   lambda data: pickle.loads(data)),
+        'columnar': (lambda: encode_result(conn.execute(query)),
+                     lambda data: list(decode_result(data))),
+    }
+    count = conn.execute("SELECT COUNT(*) FROM MOCK_DATA").fetchone()[0]
+    print(f"\n{count} MOCK_DATA rows")
+    print(f"{'codec':>10} {'bytes':>12} {'encode ms':>10} {'decode ms':>10}")
+    for name, (encode, decode) in codecs.items():
+        encode_time, data = time_it(encode)
+        decode_time, _ = time_it(lambda: decode(data))
+        print(f"{name:>10} {len(data):>12} {encode_time * 1000:>10.1f} {decode_time * 1000:>10.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    benchmark_pool()
+    benchmark_encoding()
@@ -1,13 +1,29 @@
+import asyncio
 import socket
 import threading
 import sqlite3
 import pickle
-from typing import Any, Union, Tuple
+import queue
+import struct
+import itertools
+import logging
+from collections import OrderedDict, namedtuple
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, List, Optional, Union, Tuple
 import unittest
 from unittest.mock import patch
 import io
+import os
+import tempfile
+import time
 import json
 import pandas as pd
+from servermetrics import ServerMetrics
+from resultcodec import iter_encoded, decode_blocks, encode_batch, decode_batch, encode_result, decode_result
+
+logger = logging.getLogger(__name__)
 
 ACK = b'\x06'
 NAK = b'\x00'
@@ -15,6 +31,38 @@ INSERT_ERROR = b'\x01'
 DELETE_ERROR = b'\x02'
 UPDATE_ERROR = b'\x03'
 
+READ_COMMANDS = {'SELECT', 'EXPLAIN'}
+ERROR_STATUS = {'INSERT': INSERT_ERROR, 'DELETE': DELETE_ERROR, 'UPDATE': UPDATE_ERROR}
+
+# request message types; responses carry one of the status bytes above instead
+QUERY = b'Q'
+BINARY = b'B'
+ROWS = b'R'
+PREPARE = b'P'
+EXECUTE = b'E'
+STATS = b'S'
+UPLOAD = b'U'
+CLOSE = b'C'
+
+# every frame: payload length, message type/status byte, request id, then the payload
+FRAME_HEADER = struct.Struct('!IcI')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# an UPLOAD frame's payload: file size, sha256 digest, then the utf-8 file name;
+# the raw file bytes follow the frame on the stream
+UPLOAD_HEADER = struct.Struct('!Q32s')
+CHUNK_SIZE = 256 * 1024
+
+MESSAGE_NAMES = {QUERY: 'query', BINARY: 'binary', ROWS: 'rows', PREPARE: 'prepare',
+                 EXECUTE: 'execute', STATS: 'stats', UPLOAD: 'upload', CLOSE: 'close'}
+STATUS_NAMES = {ACK: 'ACK', NAK: 'NAK', INSERT_ERROR: 'INSERT_ERROR',
+                DELETE_ERROR: 'DELETE_ERROR', UPDATE_ERROR: 'UPDATE_ERROR'}
+
+# a PREPARE reply's payload is the statement id; an EXECUTE request's payload is
+# the statement id and parameter count, then the parameters as a one-row resultcodec batch
+STATEMENT_ID = struct.Struct('!I')
+EXECUTE_HEADER = struct.Struct('!IH')
+
 class BitstringConverter:
     def __init__(self, input_string: str = "string"):
         if not isinstance(input_string, str):
@@ -175,10 +223,154 @@ class QueryBuilder:
         assert table and set_data and condition, "Table name, set data, and condition cannot be empty."
 
 
+Statement = namedtuple('Statement', ['statement_id', 'sql', 'is_read'])
+
+
+class StatementCache:
+    """LRU of the prepared statements a connection has run, with hit/miss counters.
+
+    The connection is opened with ``cached_statements`` equal to this cache's
+    size, but sqlite3's own statement cache is shared with every ad-hoc
+    execute_query on the connection, which can push prepared statements out
+    of it. The counters therefore only approximate how often sqlite3 reuses a
+    compiled statement: a hit means the statement ran recently here, not that
+    sqlite3 skipped parsing it.
+    """
+
+    def __init__(self, size: int = 128):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()
+
+    def get(self, statement: Statement) -> str:
+        if statement.statement_id in self._statements:
+            self._statements.move_to_end(statement.statement_id)
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._statements[statement.statement_id] = statement
+            if len(self._statements) > self.size:
+                self._statements.popitem(last=False)
+        return statement.sql
+
+    def __len__(self):
+        return len(self._statements)
+
+
+class PooledConnection(sqlite3.Connection):
+    def __init__(self, *args, cached_statements: int = 128, **kwargs):
+        super().__init__(*args, cached_statements=cached_statements, **kwargs)
+        self.statements = StatementCache(cached_statements)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections in WAL mode.
+
+    Readers check out one of up to ``max_connections`` read-only connections,
+    so plain SELECTs run concurrently. Writes share a single writer connection
+    guarded by ``write_lock``, which is the only writer lane SQLite allows.
+    A thread that already holds a connection gets the same one back, so nested
+    calls never deadlock on the pool.
+    """
+
+    def __init__(self, db_file: str, max_connections: int = 8, timeout: float = 30.0,
+                 statement_cache_size: int = 128, metrics: Optional[ServerMetrics] = None):
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1.")
+        self.db_file = db_file
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        self.metrics = metrics
+        self.write_lock = threading.Lock()
+        self._idle = queue.LifoQueue(maxsize=max_connections)
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._local = threading.local()
+        self._all = []
+        self._all_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout, check_same_thread=False,
+                               factory=PooledConnection, cached_statements=self.statement_cache_size)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        with self._all_lock:
+            self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Check out a read-only connection for the duration of the block."""
+        conn = getattr(self._local, "reader", None)
+        if conn is not None:
+            yield conn
+            return
+        self._acquire(self._slots, 'reader')
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect(read_only=True)
+            self._local.reader = conn
+            try:
+                yield conn
+            finally:
+                self._local.reader = None
+                self._idle.put_nowait(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def writer(self):
+        """Hold the single writer connection for the duration of the block."""
+        self._acquire(self.write_lock, 'writer')
+        try:
+            yield self._writer
+        finally:
+            self.write_lock.release()
+
+    def _acquire(self, lock, lane: str):
+        if self.metrics is None:
+            lock.acquire()
+            return
+        started = time.perf_counter()
+        lock.acquire()
+        self.metrics.record_lock_wait(lane, time.perf_counter() - started)
+
+    def connections(self):
+        with self._all_lock:
+            return list(self._all)
+
+    def close(self):
+        with self._all_lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+def is_read_query(query: str) -> bool:
+    """True when the statement only reads and can run on a pooled reader."""
+    words = query.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in READ_COMMANDS
+
+
 class SqliteDB:
-    def __init__(self, db_file: str):
+    def __init__(self, db_file: str, max_connections: int = 8, statement_cache_size: int = 128,
+                 metrics: Optional[ServerMetrics] = None, max_statements: int = 1024):
         self.db_file = db_file 
-        self.lock = threading.Lock()
+        self.pool = ConnectionPool(db_file, max_connections, statement_cache_size=statement_cache_size,
+                                   metrics=metrics)
+        self.lock = self.pool.write_lock
+        # registry of prepared statements, least recently used first, capped at max_statements
+        self.statements = OrderedDict()
+        self.statement_ids = {}
+        self.max_statements = max_statements
+        self._next_statement_id = 1
+        self.statements_lock = threading.Lock()
 
     def create_example_table(self):
         query = """
@@ -190,23 +382,114 @@ class SqliteDB:
         self.execute_query(query)
 
 
-    def execute_query(self, query: str) -> Any:
-        with self.lock:
-            conn = None
+    def execute_query(self, query: str, params: Tuple = ()) -> Any:
+        logger.debug("Executing query: %s", query)
+        try:
+            if is_read_query(query):
+                with self.pool.reader() as conn:
+                    result = conn.execute(query, params).fetchall()
+            else:
+                with self.pool.writer() as conn:
+                    try:
+                        cursor = conn.execute(query, params)
+                        result = cursor.fetchall()
+                        conn.commit()
+                    except sqlite3.DatabaseError:
+                        conn.rollback()
+                        raise
+            return result if result else ACK
+        except sqlite3.DatabaseError as e:
+            logger.info("Database error: %s", e)
+            return NAK + str(e).encode('utf-8')
+
+    def prepare(self, sql: str) -> int:
+        """Registers a parameterized statement and returns its id; the same SQL keeps the same id.
+
+        Past max_statements the least recently used statement is dropped, and
+        running its id answers "Unknown statement id" until it is prepared
+        again (under a new id).
+        """
+        if not sqlite3.complete_statement(sql + ';'):
+            raise sqlite3.ProgrammingError("Prepared statements must be one complete SQL statement.")
+        with self.statements_lock:
+            statement_id = self.statement_ids.get(sql)
+            if statement_id is not None:
+                self.statements.move_to_end(statement_id)
+                return statement_id
+            statement_id = self._next_statement_id
+            self._next_statement_id += 1
+            self.statements[statement_id] = Statement(statement_id, sql, is_read_query(sql))
+            self.statement_ids[sql] = statement_id
+            if len(self.statements) > self.max_statements:
+                _, evicted = self.statements.popitem(last=False)
+                del self.statement_ids[evicted.sql]
+            return statement_id
+
+    def execute_encoded(self, query: str, params: Tuple = ()) -> bytes:
+        """Like execute_query, but returns ACK, an encode_result buffer of the rows, or NAK."""
+        logger.debug("Executing query: %s", query)
+        return self._execute_encoded(is_read_query(query), lambda conn: query, params)
+
+    def execute_prepared(self, statement_id: int, params: Tuple = ()) -> bytes:
+        """Runs a registered statement; returns ACK, an encode_result buffer of its rows, or NAK."""
+        with self.statements_lock:
+            statement = self.statements.get(statement_id)
+            if statement is not None:
+                self.statements.move_to_end(statement_id)
+        if statement is None:
+            return NAK + f"Unknown statement id {statement_id}".encode('utf-8')
+        return self._execute_encoded(statement.is_read, lambda conn: conn.statements.get(statement), params)
+
+    def _execute_encoded(self, is_read: bool, sql_for, params: Tuple) -> bytes:
+        """Runs sql_for(connection) on a reader or the writer and encodes any result rows."""
+        try:
+            if is_read:
+                with self.pool.reader() as conn:
+                    cursor = conn.execute(sql_for(conn), params)
+                    result = encode_result(cursor)
+            else:
+                with self.pool.writer() as conn:
+                    try:
+                        cursor = conn.execute(sql_for(conn), params)
+                        result = encode_result(cursor) if cursor.description else b''
+                        conn.commit()
+                    except sqlite3.DatabaseError:
+                        conn.rollback()
+                        raise
+            return result if cursor.description else ACK
+        except sqlite3.DatabaseError as e:
+            logger.info("Database error: %s", e)
+            return NAK + str(e).encode('utf-8')
+
+    def statement_stats(self) -> dict:
+        """Prepared-statement cache hits and misses summed over every pooled connection."""
+        caches = [conn.statements for conn in self.pool.connections()]
+        hits = sum(cache.hits for cache in caches)
+        misses = sum(cache.misses for cache in caches)
+        return {
+            "statements": len(self.statements),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def stream_query(self, query: str, params: Tuple = (), batch_size: int = 1000):
+        """Yields the query's result as resultcodec blocks, fetching batch_size rows at a time."""
+        logger.debug("Streaming query: %s", query)
+        if is_read_query(query):
+            with self.pool.reader() as conn:
+                yield from iter_encoded(conn.execute(query, params), batch_size)
+            return
+        with self.pool.writer() as conn:
             try:
-                print(f"Executing query: {query}")
-                conn = sqlite3.connect(self.db_file)
-                cursor = conn.cursor()
-                cursor.execute(query)
+                yield from iter_encoded(conn.execute(query, params), batch_size)
                 conn.commit()
-                result = cursor.fetchall()
-                return result if result else ACK
-            except sqlite3.DatabaseError as e:
-                print(f"Database error: {e}")
-                return NAK + str(e).encode('utf-8')
-            finally:
-                if conn:
-                    conn.close()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def close(self):
+        self.pool.close()
 
     def create_table(self, table_name: str, columns: str):
         """Create a table with specified columns if it doesn't exist."""
@@ -230,75 +513,643 @@ class SqliteDB:
 
 #actual server and client classes below:
 
+def encode_response(response: Any) -> bytes:
+    """Turns an execute_query result into bytes for the wire."""
+    if isinstance(response, bytes):
+        return response
+    return str(response).encode('utf-8')
+
+
+def decode_rows(payload: bytes) -> List[tuple]:
+    """The rows of an encode_result reply, without the column names."""
+    rows = decode_result(payload)
+    next(rows)
+    return list(rows)
+
+
+def split_status(query: str, response: Any) -> Tuple[bytes, bytes]:
+    """Splits an execute_query result into a status byte and a response payload."""
+    if response == ACK:
+        return ACK, b''
+    if isinstance(response, bytes) and response.startswith(NAK):
+        words = query.lstrip().split(None, 1)
+        command = words[0].upper() if words else ''
+        return ERROR_STATUS.get(command, NAK), response[1:]
+    return ACK, encode_response(response)
+
+
+def pack_frame(msg_type: bytes, request_id: int, payload: bytes = b'') -> bytes:
+    return FRAME_HEADER.pack(len(payload), msg_type, request_id) + payload
+
+
+def send_frame(sock: socket.socket, msg_type: bytes, request_id: int, payload: bytes = b''):
+    sock.sendall(FRAME_HEADER.pack(len(payload), msg_type, request_id))
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Reads exactly size bytes; None on a clean EOF before the first byte."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed in the middle of a frame.")
+        received += n
+    return bytes(buf)
+
+
+def check_frame_size(length: int):
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[bytes, int, bytes]]:
+    """Reads one (message type, request id, payload) frame; None when the peer hung up."""
+    header = recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    length, msg_type, request_id = FRAME_HEADER.unpack(header)
+    check_frame_size(length)
+    payload = recv_exactly(sock, length) if length else b''
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame.")
+    return msg_type, request_id, payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Tuple[bytes, int, bytes]]:
+    """asyncio counterpart of recv_frame."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionError("Connection closed in the middle of a frame.")
+    length, msg_type, request_id = FRAME_HEADER.unpack(header)
+    check_frame_size(length)
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Connection closed in the middle of a frame.")
+    return msg_type, request_id, payload
+
+
+class Upload:
+    """One streamed upload, written to its own temp file and renamed into place once verified."""
+
+    def __init__(self, upload_dir: str, header: bytes):
+        if len(header) <= UPLOAD_HEADER.size:
+            raise ValueError("Upload header is missing the file name.")
+        self.size, self.digest = UPLOAD_HEADER.unpack_from(header)
+        self.name = os.path.basename(header[UPLOAD_HEADER.size:].decode('utf-8'))
+        if not self.name or self.name in ('.', '..'):
+            raise ValueError("Upload file name is empty.")
+        self.path = os.path.join(upload_dir, self.name)
+        self.hasher = hashlib.sha256()
+        fd, self.tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.hasher.update(chunk)
+
+    def finish(self) -> Tuple[bytes, bytes]:
+        self.file.close()
+        if self.hasher.digest() != self.digest:
+            os.remove(self.tmp_path)
+            return NAK, f"Checksum mismatch for {self.name}".encode('utf-8')
+        os.replace(self.tmp_path, self.path)
+        return ACK, self.name.encode('utf-8')
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def write_atomically(path: str, data: bytes):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
 class SocketServer:
-    def __init__(self, host: str, port: int, db_file: str):
+    """Threaded server: each keep-alive session runs on one thread of a fixed pool.
+
+    At most ``sessions`` connections are served at once; a connection
+    accepted past that waits in the pool's queue until a session ends.
+    QUERY replies carry the rows as a resultcodec buffer (see decode_rows).
+    """
+
+    def __init__(self, host: str, port: int, db_file: str, backlog: int = 5, max_connections: int = 8,
+                 upload_dir: str = '.', stats_file: Optional[str] = None, stats_interval: float = 10.0,
+                 sessions: int = 32):
         self.host = host
         self.port = port
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.db = SqliteDB(db_file)
+        self.backlog = backlog
+        self.sessions = sessions
+        self.upload_dir = upload_dir
+        self.stats_file = stats_file
+        self.stats_interval = stats_interval
+        self.result_batch_size = 1000
+        self.server_socket = None
+        self.metrics = ServerMetrics()
+        self.db = SqliteDB(db_file, max_connections, metrics=self.metrics)
         self.db.create_example_table()
 
     def start_server(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
-        print("Server is running and waiting for connections...")
+        self.server_socket.listen(self.backlog)
+        self.start_snapshots()
+        logger.info("Server is running and waiting for connections...")
+
+        with ThreadPoolExecutor(max_workers=self.sessions, thread_name_prefix='session') as sessions:
+            while True:
+                client_socket, address = self.server_socket.accept()
+                logger.debug("Connection established with %s", address)
+                sessions.submit(self.handle_request, client_socket)
+
+    def start_snapshots(self):
+        if self.stats_file:
+            self.metrics.start_snapshots(self.stats_file, self.stats_interval)
+
+    def record_request(self, msg_type: bytes, started: float, bytes_in: int, bytes_out: int, status: bytes):
+        error = STATUS_NAMES.get(status, repr(status)) if status != ACK else None
+        self.metrics.record_request(MESSAGE_NAMES.get(msg_type, 'unknown'), time.perf_counter() - started,
+                                    bytes_in, bytes_out, error)
+
+    def process_message(self, msg_type: bytes, payload: bytes) -> Tuple[bytes, bytes]:
+        """Runs one request frame and returns its (status byte, payload) reply."""
+        logger.debug("Received %s request of %d bytes", MESSAGE_NAMES.get(msg_type, msg_type), len(payload))
+        try:
+            if msg_type == BINARY:
+                write_atomically(os.path.join(self.upload_dir, 'received_binary_file'), payload)
+                return ACK, b''
+            if msg_type == QUERY:
+                query = BitstringConverter().convert(payload, to_bytes=False)
+                return split_status(query, self.db.execute_encoded(query))
+            if msg_type == STATS:
+                return ACK, json.dumps(self.metrics.snapshot()).encode('utf-8')
+            if msg_type == PREPARE:
+                statement_id = self.db.prepare(BitstringConverter().convert(payload, to_bytes=False))
+                return ACK, STATEMENT_ID.pack(statement_id)
+            if msg_type == EXECUTE:
+                statement_id, count = EXECUTE_HEADER.unpack_from(payload)
+                params = next(iter(decode_batch(payload[EXECUTE_HEADER.size:], count)), ()) if count else ()
+                response = self.db.execute_prepared(statement_id, params)
+                statement = self.db.statements.get(statement_id)
+                return split_status(statement.sql if statement else '', response)
+            return NAK, f"Unknown message type {msg_type!r}".encode('utf-8')
+        except Exception as e:
+            logger.warning("Exception in process_message: %s", e)
+            return NAK, str(e).encode('utf-8')
+
+    def stream_rows(self, payload: bytes):
+        """Yields (status, payload) reply frames for a ROWS request.
 
-        while True:
-            client_socket, address = self.server_socket.accept()
-            print(f"Connection established with {address}")
-            threading.Thread(target=self.handle_request, args=(client_socket,)).start()
+        Each ACK frame carries one resultcodec block (the header, then one per
+        batch); an empty ACK frame ends the result. A failure part way through
+        ends it with an error status instead.
+        """
+        query = BitstringConverter().convert(payload, to_bytes=False)
+        try:
+            for block in self.db.stream_query(query, batch_size=self.result_batch_size):
+                yield ACK, block
+        except sqlite3.DatabaseError as e:
+            logger.info("Database error: %s", e)
+            yield split_status(query, NAK + str(e).encode('utf-8'))
+            return
+        yield ACK, b''
+
+    def receive_upload(self, client_socket: socket.socket, header: bytes, view: memoryview) -> Tuple[bytes, bytes]:
+        """Streams an upload's raw bytes from the socket to disk through the reusable view."""
+        upload = Upload(self.upload_dir, header)
+        try:
+            remaining = upload.size
+            while remaining:
+                n = client_socket.recv_into(view[:min(len(view), remaining)])
+                if n == 0:
+                    raise ConnectionError("Connection closed in the middle of an upload.")
+                upload.write(view[:n])
+                remaining -= n
+        except BaseException:
+            upload.abort()
+            raise
+        return upload.finish()
 
     def handle_request(self, client_socket: socket.socket):
+        """Serves one keep-alive session: frames are answered in the order they arrive."""
+        view = None
+        self.metrics.connection_opened()
         try:
-            data = client_socket.recv(4096)
-            print(f"Received data from client: {data}")
-            if data.startswith(b'BINARY'):
-                content = data[6:]
-                with open('received_binary_file', 'wb') as f:
-                    f.write(content)
-                client_socket.send(ACK)
-            else:
-                query = BitstringConverter().convert(data, to_bytes=False)
-                response = self.db.execute_query(query)
-                client_socket.send(response if response != ACK else ACK)
-        except Exception as e:
-            print(f"Exception in handle_request: {e}")
-            client_socket.send(NAK + str(e).encode('utf-8'))
+            while True:
+                frame = recv_frame(client_socket)
+                if frame is None or frame[0] == CLOSE:
+                    break
+                started = time.perf_counter()
+                msg_type, request_id, payload = frame
+                bytes_in = FRAME_HEADER.size + len(payload)
+                # each request is recorded before its final frame goes out, so a STATS
+                # the client pipelines right behind that frame already counts it
+                if msg_type == ROWS:
+                    bytes_out = 0
+                    for status, body in self.stream_rows(payload):
+                        bytes_out += FRAME_HEADER.size + len(body)
+                        if status != ACK or not body:
+                            self.record_request(msg_type, started, bytes_in, bytes_out, status)
+                        send_frame(client_socket, status, request_id, body)
+                    continue
+                if msg_type == UPLOAD:
+                    if view is None:
+                        view = memoryview(bytearray(CHUNK_SIZE))
+                    bytes_in += UPLOAD_HEADER.unpack_from(payload)[0]
+                    status, body = self.receive_upload(client_socket, payload, view)
+                else:
+                    status, body = self.process_message(msg_type, payload)
+                self.record_request(msg_type, started, bytes_in, FRAME_HEADER.size + len(body), status)
+                send_frame(client_socket, status, request_id, body)
+        except (ConnectionError, ValueError, struct.error) as e:
+            logger.warning("Exception in handle_request: %s", e)
         finally:
+            self.metrics.connection_closed()
             client_socket.close()
 
 
+class AsyncSocketServer(SocketServer):
+    """SocketServer on asyncio.start_server with a fixed pool of SQLite workers.
+
+    Connections are cheap coroutines instead of threads. At most
+    ``max_in_flight`` requests are processed at once across all sessions;
+    past that the server stops reading new frames, so clients back up into
+    their socket buffers and the accept backlog. Pipelined requests on one
+    session run concurrently and may be answered out of order.
+    """
+
+    def __init__(self, host: str, port: int, db_file: str, workers: int = 8,
+                 max_in_flight: int = 256, backlog: int = 1024, upload_dir: str = '.'):
+        super().__init__(host, port, db_file, backlog, max_connections=workers, upload_dir=upload_dir)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_in_flight = max_in_flight
+        self.ready = threading.Event()
+        self.server = None
+
+    def start_server(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.in_flight = asyncio.Semaphore(self.max_in_flight)
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, backlog=self.backlog)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.start_snapshots()
+        logger.info("Server is running and waiting for connections...")
+        self.ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                logger.info("Server stopped.")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self.metrics.connection_opened()
+        try:
+            while True:
+                await self.in_flight.acquire()
+                try:
+                    frame = await read_frame(reader)
+                except BaseException:
+                    self.in_flight.release()
+                    raise
+                if frame is None or frame[0] == CLOSE:
+                    self.in_flight.release()
+                    break
+                if frame[0] == UPLOAD:
+                    # the raw file bytes follow on this stream, so uploads are read inline
+                    await self.respond_upload(reader, writer, write_lock, frame[1], frame[2])
+                    continue
+                respond = self.respond_rows if frame[0] == ROWS else self.respond
+                task = asyncio.create_task(respond(writer, write_lock, *frame))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError, struct.error) as e:
+            logger.warning("Exception in handle_connection: %s", e)
+        finally:
+            if tasks:
+                # responses still running when the session broke fail on their own writes
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.metrics.connection_closed()
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                      msg_type: bytes, request_id: int, payload: bytes):
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            status, body = await loop.run_in_executor(self.executor, self.process_message, msg_type, payload)
+            self.record_request(msg_type, started, FRAME_HEADER.size + len(payload),
+                                FRAME_HEADER.size + len(body), status)
+            async with write_lock:
+                writer.write(pack_frame(status, request_id, body))
+                await writer.drain()
+        finally:
+            self.in_flight.release()
+
+    async def respond_rows(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                           msg_type: bytes, request_id: int, payload: bytes):
+        """Runs stream_rows on one worker thread and writes its frames as they are produced.
+
+        If writing fails part way (the client went away), the producer is told
+        to stop and the queue is drained until it returns, so its worker thread
+        and the pooled connection stream_query holds are given back.
+        """
+        loop = asyncio.get_running_loop()
+        frames = asyncio.Queue(maxsize=4)
+        cancelled = threading.Event()
+
+        def put(frame):
+            asyncio.run_coroutine_threadsafe(frames.put(frame), loop).result()
+
+        def produce():
+            rows = self.stream_rows(payload)
+            try:
+                for frame in rows:
+                    if cancelled.is_set():
+                        return
+                    put(frame)
+            except Exception as e:
+                if not cancelled.is_set():
+                    put((NAK, str(e).encode('utf-8')))
+            finally:
+                rows.close()
+
+        started = time.perf_counter()
+        bytes_out = 0
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                status, body = await frames.get()
+                bytes_out += FRAME_HEADER.size + len(body)
+                last = status != ACK or not body
+                if last:
+                    # recorded before the reply goes out, so a STATS pipelined behind it sees it
+                    self.record_request(msg_type, started, FRAME_HEADER.size + len(payload), bytes_out, status)
+                async with write_lock:
+                    writer.write(pack_frame(status, request_id, body))
+                    await writer.drain()
+                if last:
+                    break
+        finally:
+            cancelled.set()
+            while not producer.done():
+                # a producer blocked on a full queue needs room to get past its put
+                while not frames.empty():
+                    frames.get_nowait()
+                await asyncio.wait({producer}, timeout=0.01)
+            if not producer.cancelled() and producer.exception() is not None:
+                logger.warning("ROWS producer failed: %s", producer.exception())
+            self.in_flight.release()
+
+    async def respond_upload(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                             write_lock: asyncio.Lock, request_id: int, header: bytes):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            upload = Upload(self.upload_dir, header)
+            try:
+                remaining = upload.size
+                while remaining:
+                    chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ConnectionError("Connection closed in the middle of an upload.")
+                    await loop.run_in_executor(self.executor, upload.write, chunk)
+                    remaining -= len(chunk)
+            except BaseException:
+                upload.abort()
+                raise
+            status, body = await loop.run_in_executor(self.executor, upload.finish)
+            self.record_request(UPLOAD, started, FRAME_HEADER.size + len(header) + upload.size,
+                                FRAME_HEADER.size + len(body), status)
+            async with write_lock:
+                writer.write(pack_frame(status, request_id, body))
+                await writer.drain()
+        finally:
+            self.in_flight.release()
+
+    def stop_server(self):
+        self.metrics.stop_snapshots()
+        if self.server is not None:
+            self.server.get_loop().call_soon_threadsafe(self.server.close)
+        self.executor.shutdown(wait=False)
+
+
 class SocketClient:
+    """Keep-alive client: one TCP session carries every request.
+
+    Requests are tagged with a request id, so several can be in flight at once
+    (see submit and pipeline); a background reader thread matches each
+    response frame back to its request.
+    """
+
     def __init__(self, host: str, port: int):
         self.host = host
         self.port = port
+        self._sock = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port))
+            self._pending = {}
+            threading.Thread(target=self._read_responses, args=(self._sock, self._pending), daemon=True).start()
+        return self._sock
+
+    def _read_responses(self, sock: socket.socket, pending: dict):
+        error = ConnectionError("Connection closed by server.")
+        try:
+            while pending or self._sock is sock:
+                frame = recv_frame(sock)
+                if frame is None:
+                    break
+                status, request_id, payload = frame
+                waiter = pending.get(request_id)
+                if isinstance(waiter, queue.Queue):
+                    waiter.put((status, payload))
+                    if status != ACK or not payload:
+                        del pending[request_id]
+                elif waiter is not None:
+                    del pending[request_id]
+                    waiter.set_result((status, payload))
+        except (OSError, ValueError) as e:
+            error = e
+        finally:
+            with self._lock:
+                if self._sock is sock:
+                    self._sock = None
+                sock.close()
+                for waiter in pending.values():
+                    if isinstance(waiter, queue.Queue):
+                        waiter.put(error)
+                    else:
+                        waiter.set_exception(error)
+                pending.clear()
+
+    def _send(self, msg_type: bytes, payload: bytes, waiter):
+        with self._lock:
+            sock = self._connect()
+            request_id = next(self._ids)
+            self._pending[request_id] = waiter
+            send_frame(sock, msg_type, request_id, payload)
+        return waiter
+
+    def submit(self, message: Union[str, bytes], is_binary=False) -> Future:
+        """Sends one request without waiting; the future resolves to (status, payload)."""
+        payload = message if is_binary else BitstringConverter().convert(message)
+        return self._send(BINARY if is_binary else QUERY, payload, Future())
+
+    def prepare(self, sql: str) -> int:
+        """Registers a parameterized statement on the server and returns its id."""
+        status, payload = self._send(PREPARE, BitstringConverter().convert(sql), Future()).result()
+        if status != ACK:
+            raise sqlite3.DatabaseError(payload.decode('utf-8', 'replace'))
+        return STATEMENT_ID.unpack(payload)[0]
+
+    def submit_prepared(self, statement_id: int, params: Tuple = ()) -> Future:
+        payload = EXECUTE_HEADER.pack(statement_id, len(params))
+        if params:
+            payload += encode_batch([tuple(params)], len(params))
+        return self._send(EXECUTE, payload, Future())
+
+    def execute_prepared(self, statement_id: int, params: Tuple = ()):
+        """Runs a prepared statement with bound parameters.
+
+        Returns the list of result rows, ACK for statements without a result,
+        or the error status byte.
+        """
+        status, payload = self.submit_prepared(statement_id, params).result()
+        if status != ACK:
+            return self.interpret(status, payload)
+        if not payload:
+            return ACK
+        return decode_rows(payload)
+
+    def stats(self) -> dict:
+        """The server's current metrics snapshot."""
+        status, payload = self._send(STATS, b'', Future()).result()
+        if status != ACK:
+            raise sqlite3.DatabaseError(payload.decode('utf-8', 'replace'))
+        return json.loads(payload)
+
+    def query_rows(self, query: str):
+        """Runs a query with binary result encoding and yields rows as batches arrive.
+
+        Like csv.reader, the first item is the tuple of column names. A server
+        side error raises sqlite3.DatabaseError.
+        """
+        replies = self._send(ROWS, BitstringConverter().convert(query), queue.Queue())
+
+        def blocks():
+            while True:
+                reply = replies.get()
+                if isinstance(reply, Exception):
+                    raise reply
+                status, payload = reply
+                if status != ACK:
+                    raise sqlite3.DatabaseError(payload.decode('utf-8', 'replace'))
+                if not payload:
+                    return
+                yield payload
+
+        return decode_blocks(blocks())
+
+    def upload(self, path: str, name: Optional[str] = None):
+        """Streams a file to the server with socket.sendfile, never holding it in memory."""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+            size = f.tell()
+            f.seek(0)
+            header = UPLOAD_HEADER.pack(size, hasher.digest()) + (name or os.path.basename(path)).encode('utf-8')
+            future = Future()
+            with self._lock:
+                sock = self._connect()
+                request_id = next(self._ids)
+                self._pending[request_id] = future
+                send_frame(sock, UPLOAD, request_id, header)
+                if size:
+                    sock.sendfile(f, 0, size)
+        try:
+            status, payload = future.result()
+        except (OSError, ValueError) as e:
+            logger.warning("No response from server: %s", e)
+            return NAK
+        return self.interpret(status, payload)
 
     def send_message(self, message: Union[str, bytes], is_binary=False):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
-            client_socket.connect((self.host, self.port))
-            if is_binary:
-                client_socket.sendall(b'BINARY' + message)
-            else:
-                client_socket.sendall(BitstringConverter().convert(message))
-            response = client_socket.recv(4096)
-            if not response:
-                print("No response from server.")
-                return NAK
-
-            # ACK NAK handling
-            if response.startswith(ACK):
-                print("Server acknowledged the request.")
-                print("Client received:", response)
-                return ACK
-            elif response.startswith(NAK):
-                print(f"Error: {response[1:].decode('utf-8')}")
-                print("Client received:", response)
-                return NAK
-            else:
-                print("Response:", response.decode('utf-8'))
-                print("Client received:", response)
-                return response
-            
+        """Sends one request and waits for its reply.
+
+        A query returns its list of result rows, ACK when it has no result,
+        or the error status byte.
+        """
+        try:
+            status, payload = self.submit(message, is_binary).result()
+        except (OSError, ValueError) as e:
+            logger.warning("No response from server: %s", e)
+            return NAK
+        return self.interpret(status, payload, rows=not is_binary)
+
+    def pipeline(self, messages: List[Union[str, bytes]], is_binary=False) -> List[Any]:
+        """Sends every message before reading any reply, then returns replies in order."""
+        futures = [self.submit(message, is_binary) for message in messages]
+        return [self.interpret(*future.result(), rows=not is_binary) for future in futures]
+
+    def interpret(self, status: bytes, payload: bytes, rows: bool = False):
+        """The status byte on an error, ACK for an empty reply, else the payload (decoded rows with rows set)."""
+        # ACK NAK handling
+        if status != ACK:
+            logger.info("Error %s: %s", STATUS_NAMES.get(status, status), payload.decode('utf-8', 'replace'))
+            return status
+        if not payload:
+            logger.debug("Server acknowledged the request.")
+            return ACK
+        if rows:
+            return decode_rows(payload)
+        logger.debug("Response: %s", payload[:200].decode('utf-8', 'replace'))
+        return payload
+
+    def close(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+            if sock is not None:
+                try:
+                    send_frame(sock, CLOSE, 0)
+                    sock.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 # Code to use server and client
 '''if __name__ == "__main__":
@@ -369,6 +1220,241 @@ class TestSocketServer(unittest.TestCase):
         self.assertEqual(client_socket.sendall.call_count, 1)
 
 
+    def test_pooled_reads_and_writes(self):
+    #Tests that writes go through the writer lane and reads see them from pooled readers
+        with tempfile.TemporaryDirectory() as tmp:
+            db = SqliteDB(os.path.join(tmp, 'pool.db'), max_connections=4)
+            db.create_example_table()
+            self.assertEqual(db.execute_query("INSERT INTO example_table (name) VALUES (?)", ('ceres',)), ACK)
+
+            results = []
+            def read():
+                results.append(db.execute_query("SELECT name FROM example_table"))
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(results, [[('ceres',)]] * 8)
+            self.assertLessEqual(len(db.pool._all), 5)
+
+            response = db.execute_query("SELECT * FROM missing_table")
+            self.assertTrue(response.startswith(NAK))
+            db.close()
+
+    def test_async_server_round_trip(self):
+    #Tests the asyncio server answers queries and ACKs with the same wire protocol
+        with tempfile.TemporaryDirectory() as tmp:
+            server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'async.db'), workers=2, max_in_flight=4)
+            threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(server.ready.wait(5))
+            client = SocketClient('localhost', server.port)
+
+            self.assertEqual(client.send_message("INSERT INTO example_table (name) VALUES ('eris')"), ACK)
+            self.assertEqual(client.send_message("SELECT name FROM example_table"), [('eris',)])
+            self.assertEqual(client.send_message("SELECT name FROM example_table WHERE name = 'pluto'"), [])
+            self.assertEqual(client.send_message("SELECT * FROM missing_table"), NAK)
+            replies = client.pipeline([f"SELECT {i}, {i} * 0.5, 'n{i}'" for i in range(50)])
+            self.assertEqual(replies, [[(i, i * 0.5, f'n{i}')] for i in range(50)])
+            client.close()
+            server.stop_server()
+            server.db.close()
+
+    def test_framed_session_pipelining(self):
+    #Tests many pipelined requests over one threaded-server session, including results over 4096 bytes
+        with tempfile.TemporaryDirectory() as tmp:
+            server = SocketServer('localhost', 0, os.path.join(tmp, 'framed.db'))
+            threading.Thread(target=server.start_server, daemon=True).start()
+            while server.server_socket is None:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            with SocketClient('localhost', server.server_socket.getsockname()[1]) as client:
+                inserts = [f"INSERT INTO example_table (name) VALUES ('{'x' * 100}{i}')" for i in range(100)]
+                self.assertEqual(client.pipeline(inserts), [ACK] * 100)
+                sock = client._sock
+
+                status, payload = client.submit("SELECT name FROM example_table").result()
+                self.assertGreater(len(payload), 4096)
+                self.assertEqual(decode_rows(payload), [(f"{'x' * 100}{i}",) for i in range(100)])
+                self.assertIs(client._sock, sock)
+
+                self.assertEqual(client.send_message("INSERT INTO missing_table VALUES (1)"), INSERT_ERROR)
+                self.assertEqual(client.send_message("DELETE FROM missing_table"), DELETE_ERROR)
+
+    def test_threaded_session_pool(self):
+    #Tests the threaded server serves at most `sessions` connections at once and queues the rest
+        with tempfile.TemporaryDirectory() as tmp:
+            server = SocketServer('localhost', 0, os.path.join(tmp, 'sessions.db'), sessions=2)
+            threading.Thread(target=server.start_server, daemon=True).start()
+            while server.server_socket is None:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            port = server.server_socket.getsockname()[1]
+            first, second, third = (SocketClient('localhost', port) for _ in range(3))
+            self.assertEqual(first.send_message("SELECT 1"), [(1,)])
+            self.assertEqual(second.send_message("SELECT 2"), [(2,)])
+            waiting = third.submit("SELECT 3")
+            time.sleep(0.2)
+            self.assertFalse(waiting.done())
+            first.close()
+            status, payload = waiting.result(timeout=5)
+            self.assertEqual((status, decode_rows(payload)), (ACK, [(3,)]))
+            second.close()
+            third.close()
+
+    def test_streaming_upload(self):
+    #Tests sendfile uploads land verified under their own name, on both servers
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'photo.bin')
+            with open(source, 'wb') as f:
+                f.write(os.urandom(CHUNK_SIZE * 3 + 17))
+            uploads = os.path.join(tmp, 'uploads')
+            os.mkdir(uploads)
+
+            server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'upload.db'), upload_dir=uploads)
+            threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(server.ready.wait(5))
+            with SocketClient('localhost', server.port) as client:
+                self.assertEqual(client.upload(source), b'photo.bin')
+                self.assertEqual(client.upload(source, name='copy.bin'), b'copy.bin')
+                self.assertEqual(client.send_message("SELECT 1"), [(1,)])
+            server.stop_server()
+
+            for name in ('photo.bin', 'copy.bin'):
+                with open(os.path.join(uploads, name), 'rb') as received, open(source, 'rb') as original:
+                    self.assertEqual(received.read(), original.read())
+
+            threaded = SocketServer('localhost', 0, os.path.join(tmp, 'upload.db'), upload_dir=uploads)
+            view = memoryview(bytearray(1024))
+            header = UPLOAD_HEADER.pack(5, hashlib.sha256(b'wrong').digest()) + b'bad.bin'
+            left, right = socket.socketpair()
+            left.sendall(b'hello')
+            status, body = threaded.receive_upload(right, header, view)
+            left.close()
+            right.close()
+            self.assertEqual(status, NAK)
+            self.assertEqual(sorted(os.listdir(uploads)), ['copy.bin', 'photo.bin'])
+
+    def test_binary_result_rows(self):
+    #Tests ROWS requests stream typed rows in batches over both servers
+        with tempfile.TemporaryDirectory() as tmp:
+            threaded = SocketServer('localhost', 0, os.path.join(tmp, 'rows.db'))
+            asynchronous = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'rows.db'))
+            for server in (threaded, asynchronous):
+                server.result_batch_size = 7
+                threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(asynchronous.ready.wait(5))
+            while threaded.server_socket is None:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            threaded.db.execute_query("INSERT INTO example_table (name) VALUES ('ceres'), (NULL), ('eris')")
+
+            for port in (threaded.server_socket.getsockname()[1], asynchronous.port):
+                with SocketClient('localhost', port) as client:
+                    rows = client.query_rows("SELECT id, name FROM example_table")
+                    self.assertEqual(next(rows), ('id', 'name'))
+                    self.assertEqual(list(rows), [(1, 'ceres'), (2, None), (3, 'eris')])
+                    many = list(client.query_rows("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50) SELECT i, i * 0.5 FROM n"))
+                    self.assertEqual(many[1:], [(i, i * 0.5) for i in range(1, 51)])
+                    with self.assertRaises(sqlite3.DatabaseError):
+                        list(client.query_rows("SELECT * FROM missing_table"))
+                    self.assertEqual(client.send_message("SELECT 1"), [(1,)])
+            asynchronous.stop_server()
+
+    def test_rows_client_disconnect(self):
+    #Tests a client dropping in the middle of a ROWS stream gives back its worker and the writer lane
+        with tempfile.TemporaryDirectory() as tmp:
+            server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'drop.db'), workers=2)
+            server.result_batch_size = 1
+            threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(server.ready.wait(5))
+            streams = ["WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) "
+                       "SELECT i, 'padding padding padding' FROM n",
+                       "INSERT INTO example_table (name) WITH RECURSIVE n(i) AS "
+                       "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) SELECT 'x' || i FROM n RETURNING id"]
+            for query in streams * 2:
+                sock = socket.create_connection(('localhost', server.port))
+                send_frame(sock, ROWS, 1, query.encode('utf-8'))
+                self.assertEqual(recv_frame(sock)[0], ACK)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                sock.close()
+            replies = []
+            def write_then_read():
+                with SocketClient('localhost', server.port) as client:
+                    replies.append(client.send_message("INSERT INTO example_table (name) VALUES ('ceres')"))
+                    replies.append(client.send_message("SELECT name FROM example_table WHERE name = 'ceres'"))
+            thread = threading.Thread(target=write_then_read, daemon=True)
+            thread.start()
+            thread.join(15)
+            self.assertEqual(replies, [ACK, [('ceres',)]])
+            server.stop_server()
+
+    def test_prepared_statements(self):
+    #Tests statements are registered once, run by id with bound parameters, and hit the per-connection cache
+        with tempfile.TemporaryDirectory() as tmp:
+            server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'prepared.db'), workers=2)
+            threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(server.ready.wait(5))
+            with SocketClient('localhost', server.port) as client:
+                insert = client.prepare("INSERT INTO example_table (name) VALUES (?)")
+                self.assertEqual(client.prepare("INSERT INTO example_table (name) VALUES (?)"), insert)
+                select = client.prepare("SELECT id, name FROM example_table WHERE name = ?")
+                for name in ("ceres", "eris", "it's"):
+                    self.assertEqual(client.execute_prepared(insert, (name,)), ACK)
+                self.assertEqual(client.execute_prepared(select, ("it's",)), [(3, "it's")])
+                self.assertEqual(client.execute_prepared(select, ("pluto",)), [])
+                self.assertEqual(client.execute_prepared(999), NAK)
+                self.assertEqual(client.execute_prepared(insert, ()), INSERT_ERROR)
+            stats = server.db.statement_stats()
+            self.assertEqual(stats["statements"], 2)
+            self.assertGreaterEqual(stats["hits"], 3)
+            server.stop_server()
+
+        cache = StatementCache(size=2)
+        first, second, third = (Statement(i, f"SELECT {i}", True) for i in range(3))
+        for statement in (first, second, first, third, second):
+            cache.get(statement)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 4, 2))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = SqliteDB(os.path.join(tmp, 'registry.db'), max_statements=2)
+            one, two = db.prepare("SELECT 1"), db.prepare("SELECT 2")
+            db.execute_prepared(one)
+            three = db.prepare("SELECT 3")
+            self.assertEqual(list(db.statements), [one, three])
+            self.assertTrue(db.execute_prepared(two).startswith(NAK))
+            self.assertNotIn(db.prepare("SELECT 2"), (one, two, three))
+            self.assertEqual(len(db.statements), len(db.statement_ids))
+            db.close()
+
+    def test_metrics_and_stats_command(self):
+    #Tests request latency, bytes, errors and lock waits show up in the stats reply and snapshot file
+        with tempfile.TemporaryDirectory() as tmp:
+            stats_file = os.path.join(tmp, 'stats.json')
+            server = AsyncSocketServer('localhost', 0, os.path.join(tmp, 'metrics.db'), workers=2)
+            server.stats_file, server.stats_interval = stats_file, 0.05
+            threading.Thread(target=server.start_server, daemon=True).start()
+            self.assertTrue(server.ready.wait(5))
+            try:
+                with SocketClient('localhost', server.port) as client:
+                    client.pipeline(["INSERT INTO example_table (name) VALUES ('ceres')", "SELECT name FROM example_table"])
+                    client.send_message("INSERT INTO missing_table VALUES (1)")
+                    list(client.query_rows("SELECT * FROM example_table"))
+                    stats = client.stats()
+                self.assertEqual(stats["active_connections"], 1)
+                self.assertEqual(stats["latency"]["query"]["count"], 3)
+                self.assertEqual(stats["latency"]["rows"]["count"], 1)
+                self.assertEqual(stats["errors"], {"INSERT_ERROR": 1})
+                self.assertGreater(stats["bytes_in"], 0)
+                self.assertGreater(stats["bytes_out"], 0)
+                self.assertGreaterEqual(stats["lock_wait"]["writer"]["count"], 2)
+                time.sleep(0.2)
+                with open(stats_file) as f:
+                    self.assertGreaterEqual(json.load(f)["requests"], 4)
+            finally:
+                # the snapshot thread must be gone before the temporary directory is
+                server.stop_server()
+
     def test_bitstring_converter(self):
     #Tests BitstringConverter for string and byte conversion
         converter = BitstringConverter()
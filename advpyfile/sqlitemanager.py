@@ -1,8 +1,12 @@
+import io
 import json
 import pandas as pd
+import re
 import sqlite3
 import pickle
 import os
+import tempfile
+import time
 import unittest
 
 class QueryBuilder:
@@ -81,28 +85,256 @@ class QueryBuilder:
     def validate_table_set_data_condition(self, table, set_data, condition):
         assert table and set_data and condition, "Table name, set data, and condition cannot be empty."
 
+COLUMN_RENAMES = {"Name": "Dwarf"}
+SQLITE_TYPES = {bool: "INTEGER", int: "INTEGER", float: "REAL", str: "TEXT"}
+LOAD_MODES = ("replace", "append", "upsert")
+# one "key": scalar entry and the delimiter after it; the delimiter is required
+# so a value cut off at the end of the buffer never matches
+SCALAR_ENTRY = re.compile(r'\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*'
+                          r'(-?\d+(\.\d+)?([eE][-+]?\d+)?|"[^"\\]*(?:\\.[^"\\]*)*"|true|false|null)\s*([,}])')
+LITERALS = {'true': True, 'false': False, 'null': None}
+# the longest run of a JSON string's body made only of complete characters and escapes
+STRING_RUN = re.compile(r'(?:[^"\\]+|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*')
+
+
+class JSONStringStream:
+    """File-like view of the body of a JSON string literal, unescaped as it is read.
+
+    f must be positioned past the opening quote, with raw holding any text
+    already read beyond it. read() returns whatever complete characters the
+    next chunk holds (its size argument is only a hint) and '' once the
+    closing quote has been reached. A \\u escape for the first half of a
+    surrogate pair is held back until its second half has arrived.
+    """
+
+    def __init__(self, f, raw='', chunk_size=1 << 16):
+        self.f = f
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.done = False
+
+    def read(self, size=-1):
+        while not self.done:
+            end = STRING_RUN.match(self.raw).end()
+            if end < len(self.raw) and self.raw[end] == '"':
+                self.done = True
+                return json.loads(f'"{self.raw[:end]}"')
+            text = json.loads(f'"{self.raw[:end]}"')
+            if text and '\ud800' <= text[-1] <= '\udbff':
+                end, text = end - 6, text[:-1]
+            chunk = self.f.read(self.chunk_size)
+            if not text and not chunk:
+                raise ValueError("Unterminated JSON string.")
+            self.raw = self.raw[end:] + chunk
+            if text:
+                return text
+        return ''
+
+
+class ColumnJSONReader:
+    """Incremental reader for column-oriented JSON: {"Column": {"row key": value, ...}, ...}.
+
+    Yields one (column, row key, value) cell at a time while reading the file
+    in chunks, so memory does not grow with the file. A file whose whole
+    content is a JSON string holding such a document (as pandas' to_json
+    output passed through json.dump is) is read through a JSONStringStream,
+    so it is unescaped and parsed chunk by chunk as well.
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char!r}.")
+        self.pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number cut off by the end of the buffer ("2." of "2.77") parses short;
+            # every complete value is followed by a delimiter or whitespace
+            if (end == len(self.buffer) or self.buffer[end] not in ',:}] \t\r\n') \
+                    and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _scalar_entries(self):
+        """Decodes the run of "key": scalar entries at the current position in one sweep.
+
+        Returns (entries, closed) where closed is set when the run ended the
+        column's object.
+        """
+        entries = []
+        match, buffer, pos = SCALAR_ENTRY.match, self.buffer, self.pos
+        closed = False
+        while True:
+            entry = match(buffer, pos)
+            if entry is None:
+                break
+            key, value, fraction, exponent, delimiter = entry.groups()
+            pos = entry.end()
+            if '\\' in key:
+                key = json.loads(f'"{key}"')
+            if value[0] == '"':
+                value = json.loads(value) if '\\' in value else value[1:-1]
+            elif value in LITERALS:
+                value = LITERALS[value]
+            else:
+                value = float(value) if fraction or exponent else int(value)
+            entries.append((key, value))
+            if delimiter == '}':
+                closed = True
+                break
+        self.pos = pos
+        return entries, closed
+
+    def batches(self):
+        """Yields (column, [(row key, value), ...]) runs, at most a buffer's worth each."""
+        if self._peek() == '"':
+            inner = JSONStringStream(self.f, self.buffer[self.pos + 1:], self.chunk_size)
+            yield from ColumnJSONReader(inner, self.chunk_size).batches()
+            return
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            column = self._value()
+            self._expect(':')
+            self._expect('{')
+            if self._peek() != '}':
+                while True:
+                    entries, closed = self._scalar_entries()
+                    if entries:
+                        yield column, entries
+                    if closed:
+                        break
+                    # a nested value, or an entry cut off by the end of the buffer
+                    key = self._value()
+                    self._expect(':')
+                    yield column, [(key, self._value())]
+                    if self._expect(',}') == '}':
+                        break
+            else:
+                self.pos += 1
+            if self._expect(',}') == '}':
+                return
+
+    def __iter__(self):
+        for column, entries in self.batches():
+            for key, value in entries:
+                yield column, key, value
+
+
 class SqliteDB:
-    def __init__(self, json_file, table_name):
+    def __init__(self, json_file, table_name, mode="replace", batch_size=10000):
         self.json_file = json_file
         self.table_name = table_name
         self.db_name = json_file.replace('.json', '.db')
-        self.load_data()
-        self.create_table()
-        self.insert_dataframe()  
-
-    def load_data(self):
-        with open(self.json_file) as f:
-            raw_data = json.load(f)
-            #print("Raw content from JSON file:", raw_data)
-            self.df = pd.DataFrame(raw_data)
-            self.df.rename(columns={"Name": "Dwarf"}, inplace=True)
-            #print("DataFrame created:\n", self.df)
-
-    def create_table(self):
-        with sqlite3.connect(self.db_name) as conn:
-            self.conn = conn
-            self.df.to_sql(self.table_name, conn, if_exists='replace', index_label='id')
-            #print("DataFrame inserted into the database.")
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(self.db_name)
+        self.query_builder = QueryBuilder()
+        self.actions = {
+            "select_all": self.select_all,
+            "select_condition": lambda: self.select_condition,
+        }
+        self.load_data(mode)
+
+    @property
+    def df(self):
+        """The table as a DataFrame indexed by id, read from the database on each access.
+
+        load_data no longer builds a DataFrame; this keeps the attribute for
+        callers that still use it.
+        """
+        return pd.read_sql_query(self.query_builder.select(self.table_name), self.conn, index_col='id')
+
+    def load_data(self, mode="replace", batch_size=None, report=False):
+        """Streams the JSON file into the table inside one transaction.
+
+        Cells are staged in batches of batch_size with executemany, then
+        pivoted into rows keyed by the JSON row key (the id column). mode is
+        "replace" (drop and recreate the table), "append" (keep the table and
+        add only rows whose id is new) or "upsert" (also overwrite rows whose
+        id already exists). Returns (rows loaded, rows per second).
+        """
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode: {mode}")
+        batch_size = batch_size or self.batch_size
+        start = time.perf_counter()
+        columns = {}
+        types = {}
+        with self.conn, open(self.json_file, encoding='utf-8') as f:
+            self.conn.execute("DROP TABLE IF EXISTS temp.json_cells")
+            self.conn.execute("CREATE TEMP TABLE json_cells (key TEXT, col INTEGER, value)")
+            batch = []
+            for column, entries in ColumnJSONReader(f).batches():
+                index = columns.setdefault(column, len(columns))
+                if column not in types:
+                    value = next((value for _, value in entries if value is not None), None)
+                    if value is not None:
+                        types[column] = SQLITE_TYPES.get(type(value), "TEXT")
+                batch.extend((key, index, json.dumps(value) if isinstance(value, (dict, list)) else value)
+                             for key, value in entries)
+                if len(batch) >= batch_size:
+                    self.conn.executemany("INSERT INTO json_cells VALUES (?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                self.conn.executemany("INSERT INTO json_cells VALUES (?, ?, ?)", batch)
+
+            names = [COLUMN_RENAMES.get(column, column) for column in columns]
+            if mode == "replace":
+                self.conn.execute(f"DROP TABLE IF EXISTS {self.table_name}")
+            definitions = ', '.join(f'"{name}" {types.get(column, "TEXT")}' for name, column in zip(names, columns))
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table_name} "
+                              f"(id TEXT PRIMARY KEY{', ' if definitions else ''}{definitions})")
+            quoted = ''.join(f', "{name}"' for name in names)
+            pivot = ''.join(f", MAX(CASE col WHEN {i} THEN value END)" for i in range(len(names)))
+            conflict = ''
+            if mode == "upsert" and names:
+                updates = ', '.join(f'"{name}" = excluded."{name}"' for name in names)
+                conflict = f" ON CONFLICT(id) DO UPDATE SET {updates}"
+            verb = "INSERT OR IGNORE" if mode == "append" or not conflict else "INSERT"
+            cursor = self.conn.execute(
+                f"{verb} INTO {self.table_name} (id{quoted}) "
+                f"SELECT key{pivot} FROM json_cells WHERE true GROUP BY key ORDER BY MIN(rowid){conflict}")
+            rows = cursor.rowcount
+            self.conn.execute("DROP TABLE temp.json_cells")
+        elapsed = time.perf_counter() - start
+        rows_per_sec = rows / elapsed if elapsed else float('inf')
+        if report:
+            print(f"Loaded {rows} rows into {self.table_name} ({mode}) at {rows_per_sec:,.0f} rows/sec")
+        return rows, rows_per_sec
 
     def insert_row_column(self, row_data):
         with self.conn:
@@ -116,17 +348,63 @@ class SqliteDB:
         return self.actions.get(action_name, lambda: "Unknown action.")()
 
     def select_all(self):
-        return self.query_builder.select(self.table_name).execute(self.conn)
+        return self.conn.execute(self.query_builder.select(self.table_name)).fetchall()
 
     def select_condition(self, condition):
-        return self.query_builder.select(self.table_name).where(condition).execute(self.conn)
+        return self.conn.execute(self.query_builder.select(self.table_name, '*', condition)).fetchall()
+
+
+class TestColumnJSONLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_file = os.path.join(self.tmp.name, 'dwarfs.json')
+        self.write({"Name": {"dwarf0": "Ceres", "dwarf1": "Pluto"},
+                    "Distance": {"dwarf0": 2.77, "dwarf1": 39.5},
+                    "Period": {"dwarf0": 4.61, "dwarf1": None}})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data, wrap=False):
+        with open(self.json_file, 'w') as f:
+            json.dump(json.dumps(data) if wrap else data, f)
+
+    def rows(self):
+        return self.db.conn.execute(f"SELECT * FROM {self.db.table_name} ORDER BY id").fetchall()
+
+    def test_reader_streams_cells_across_chunks(self):
+        text = json.dumps({"A": {"k1": 12345, "k2": "x\"y"}, "B": {}, "C": {"k1": [1, {"z": 2}]}})
+        cells = list(ColumnJSONReader(io.StringIO(text), chunk_size=3))
+        self.assertEqual(cells, [("A", "k1", 12345), ("A", "k2", 'x"y'), ("C", "k1", [1, {"z": 2}])])
+
+    def test_wrapped_document_streams(self):
+        data = {"A": {"k1": "tab\tquote\" \U0001F30D", "k2": 2.5}, "B": {"k\\1": [1, {"z": "\u00e9"}]}}
+        wrapped = json.dumps(json.dumps(data))
+        expected = list(ColumnJSONReader(io.StringIO(json.dumps(data))))
+        for chunk_size in (1, 2, 5, 7, 64):
+            self.assertEqual(list(ColumnJSONReader(io.StringIO(wrapped), chunk_size=chunk_size)), expected)
+        with self.assertRaises(ValueError):
+            list(ColumnJSONReader(io.StringIO(wrapped[:-5])))
+
+    def test_replace_append_upsert(self):
+        self.db = SqliteDB(self.json_file, 'DwarfPlanets', batch_size=2)
+        self.addCleanup(self.db.conn.close)
+        self.assertEqual(self.rows(), [('dwarf0', 'Ceres', 2.77, 4.61), ('dwarf1', 'Pluto', 39.5, None)])
+        self.write({"Name": {"dwarf1": "Pluto", "dwarf2": "Eris"}, "Distance": {"dwarf1": 39.48, "dwarf2": 67.84},
+                    "Period": {"dwarf1": 247.69, "dwarf2": 558.77}}, wrap=True)
+        self.assertEqual(self.db.load_data("append")[0], 1)
+        self.assertEqual(self.rows()[1:], [('dwarf1', 'Pluto', 39.5, None), ('dwarf2', 'Eris', 67.84, 558.77)])
+        self.db.load_data("upsert")
+        self.assertEqual(self.rows()[1], ('dwarf1', 'Pluto', 39.48, 247.69))
+        self.db.load_data("replace")
+        self.assertEqual(len(self.rows()), 2)
 
 
 class TestSqliteDB(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls.test_json_file = 'test_data.json'
-        cls.test_data = {
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.test_json_file = os.path.join(self.tmp.name, 'test_data.json')
+        self.test_data = {
             "Name": {
                 "dwarf0": "Ceres",
                 "dwarf1": "Pluto",
@@ -149,29 +427,28 @@ class TestSqliteDB(unittest.TestCase):
                 "dwarf4": 558.77
             }
         }
-        with open(cls.test_json_file, 'w') as f:
-            json.dump(cls.test_data, f)
+        with open(self.test_json_file, 'w') as f:
+            json.dump(self.test_data, f)
 
-        cls.table_name = 'DwarfPlanets'
-        cls.db = SqliteDB(cls.test_json_file, cls.table_name)
+        self.table_name = 'DwarfPlanets'
+        self.db = SqliteDB(self.test_json_file, self.table_name)
 
-    @classmethod
-    def tearDownClass(cls):
-        if os.path.exists(cls.db.db_name):
-            os.remove(cls.db.db_name)
-        if os.path.exists(cls.test_json_file):
-            os.remove(cls.test_json_file)
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
 
     def test_dataframe_creation(self):
         expected_columns = {'Dwarf', 'Distance', 'Period'}
         self.assertSetEqual(set(self.db.df.columns), expected_columns)
         self.assertEqual(len(self.db.df), 5)  
+        self.assertEqual(self.db.df.loc['dwarf4', 'Dwarf'], 'Eris')
 
-    def test_insert_dataframe(self):
+    def test_reload_data(self):
         initial_count = self.db.conn.execute(f"SELECT COUNT(*) FROM {self.db.table_name}").fetchone()[0]
-        self.db.insert_dataframe()
+        self.assertEqual(self.db.load_data("append")[0], 0)
+        self.assertEqual(self.db.load_data("upsert")[0], 5)
         final_count = self.db.conn.execute(f"SELECT COUNT(*) FROM {self.db.table_name}").fetchone()[0]
-        self.assertEqual(final_count, initial_count + 5)
+        self.assertEqual(final_count, initial_count)
 
     def test_insert_row_column(self):
         new_data = {'Dwarf': 'Orcus', 'Distance': 39.22, 'Period': 245.62}
@@ -182,9 +459,9 @@ class TestSqliteDB(unittest.TestCase):
 
         row = self.db.conn.execute(f"SELECT * FROM {self.db.table_name} WHERE Dwarf = 'Orcus'").fetchone()
         self.assertIsNotNone(row)
-        self.assertEqual(row[0], 'Orcus')
-        self.assertEqual(row[1], 39.22)    
-        self.assertEqual(row[2], 245.62)   
+        self.assertEqual(row[1], 'Orcus')
+        self.assertEqual(row[2], 39.22)    
+        self.assertEqual(row[3], 245.62)   
 
     def test_select_all(self):
         results = self.db.KVfunction("select_all")
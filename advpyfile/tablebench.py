@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import pathlib
+import resource
+import sys
+import tempfile
+import time
+from bs4 import BeautifulSoup
+from tablestream import iter_table_rows
+
+SCALE = 1000
+
+
+def scaled_co2(path, scale=SCALE):
+    """Writes Co2.html with its data rows repeated scale times; returns the file size."""
+    with open('Co2.html', 'r') as f:
+        html = f.read()
+    lower = html.lower()
+    body_start = lower.index('<tbody>', lower.index('<tr', lower.index('year')))
+    body_end = lower.rindex('</table>')
+    with open(path, 'w') as f:
+        f.write(html[:body_start])
+        for _ in range(scale):
+            f.write(html[body_start:body_end])
+        f.write(html[body_end:])
+    return os.path.getsize(path)
+
+
+def soup_rows(path):
+    """The dataframes.py path: build the whole tree, then walk the first table."""
+    with open(path, 'r') as f:
+        soup = BeautifulSoup(f, 'html.parser')
+    table = soup.find('table')
+    return sum(1 for row in table.find_all('tr') if row.find_all('td'))
+
+
+def stream_rows(path):
+    return sum(1 for _ in iter_table_rows(pathlib.Path(path), index=0))
+
+
+def measure(func, path, results):
+    start = time.perf_counter()
+    rows = func(path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux
+    results.put((rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run_isolated(func, path):
+    """Runs one parser in a fresh process so its peak RSS is its own."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(func, path, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return None
+    return results.get()
+
+
+def main(scale=SCALE):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'co2_scaled.html')
+        size = scaled_co2(path, scale)
+        print(f"Co2.html x{scale}: {size / 2**20:.1f} MiB")
+        print(f"{'parser':<16} {'rows':>10} {'seconds':>9} {'rows/sec':>12} {'peak RSS':>10}")
+        for name, func in (("tablestream", stream_rows), ("BeautifulSoup", soup_rows)):
+            result = run_isolated(func, path)
+            if result is None:
+                print(f"{name:<16} failed (out of memory?)")
+                continue
+            rows, elapsed, peak = result
+            print(f"{name:<16} {rows:>10} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {peak:>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SCALE)
@@ -0,0 +1,445 @@
+import codecs
+from collections import deque
+from html.parser import HTMLParser
+import hashlib
+import io
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+
+CELL_TAGS = ('td', 'th')
+
+
+class _OpenTable:
+    __slots__ = ('number', 'matched', 'row', 'cell', 'has_header', 'tags')
+
+    def __init__(self, number, matched):
+        self.number = number
+        self.matched = matched
+        self.row = None
+        self.cell = None
+        self.has_header = False
+        self.tags = []
+
+
+class TableExtractor(HTMLParser):
+    """Incremental parser that keeps only the rows of one chosen <table>.
+
+    Tables are numbered in document order, nested ones included, the same
+    order soup.select('table') uses. Pick one with ``index`` or with
+    ``caption``, a case-insensitive substring of its <caption>. With neither,
+    rows from every table are collected, tagged with their table number.
+    Only finished rows waiting to be consumed are held, so memory stays flat
+    however big the page is; index=-1 has to keep the latest top-level table
+    until the document ends. With split_cells, a row's <th> and <td> cells
+    come out as two separate rows (header cells first), each only when the
+    row has cells of that kind.
+    """
+
+    def __init__(self, index=None, caption=None, header_rows=True, split_cells=False):
+        super().__init__(convert_charrefs=True)
+        self.index = index
+        self.caption = caption.lower() if caption else None
+        self.header_rows = header_rows
+        self.split_cells = split_cells
+        self.all_tables = index is None and caption is None
+        self.rows = deque()
+        self.done = False
+        self.table_count = 0
+        self._stack = []
+        self._caption_text = None
+        self._last_table = []
+
+    def _decide(self, table):
+        """Settles whether a table picked by caption is the target once its caption is known."""
+        if table.matched is None:
+            table.matched = self.caption in ''.join(self._caption_text or ()).lower()
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'table':
+            number = self.table_count
+            self.table_count += 1
+            if self.all_tables or self.index == -1:
+                matched = True
+            elif self.index is not None:
+                matched = number == self.index
+            else:
+                matched = None
+            if self.index == -1 and not self._stack:
+                self._last_table = []
+            self._stack.append(_OpenTable(number, matched))
+            return
+        if not self._stack:
+            return
+        table = self._stack[-1]
+        if tag == 'caption':
+            self._caption_text = []
+        elif tag == 'tr':
+            self._decide(table)
+            self._end_row(table)
+            table.row = []
+        elif tag in CELL_TAGS:
+            self._decide(table)
+            self._end_cell(table)
+            if table.row is None:
+                table.row = []
+            table.cell = []
+            table.tags.append(tag)
+            table.has_header |= tag == 'th'
+
+    def handle_endtag(self, tag):
+        if self.done or not self._stack:
+            return
+        table = self._stack[-1]
+        if tag == 'caption' and self._caption_text is not None:
+            self._decide(table)
+            self._caption_text = None
+        elif tag in CELL_TAGS:
+            self._end_cell(table)
+        elif tag == 'tr':
+            self._end_row(table)
+        elif tag == 'table':
+            self._end_row(table)
+            self._stack.pop()
+            if table.matched and not self.all_tables and self.index != -1:
+                self.done = True
+
+    def handle_data(self, data):
+        if self._caption_text is not None:
+            self._caption_text.append(data)
+        elif self._stack and self._stack[-1].cell is not None:
+            self._stack[-1].cell.append(data)
+
+    def _end_cell(self, table):
+        if table.cell is not None:
+            table.row.append(' '.join(''.join(table.cell).split()))
+            table.cell = None
+
+    def _end_row(self, table):
+        self._end_cell(table)
+        row, has_header, tags = table.row, table.has_header, table.tags
+        table.row, table.has_header, table.tags = None, False, []
+        if row is None or not table.matched or (has_header and not self.header_rows):
+            return
+        if self.split_cells:
+            rows = [tuple(cell for cell, tag in zip(row, tags) if tag == kind) for kind in CELL_TAGS[::-1]]
+            rows = [row for row in rows if row]
+        else:
+            rows = [tuple(row)]
+        if self.index == -1:
+            if len(self._stack) == 1:
+                self._last_table.extend(rows)
+        elif self.all_tables:
+            self.rows.extend((table.number, row) for row in rows)
+        else:
+            self.rows.extend(rows)
+
+    def finish(self):
+        """Flushes the parser and, for index=-1, releases the last table's rows."""
+        self.close()
+        while self._stack and not self.done:
+            self.handle_endtag('table')
+        if self.index == -1:
+            self.rows.extend(self._last_table)
+            self._last_table = []
+
+
+def _chunks(source, chunk_size):
+    if isinstance(source, os.PathLike):
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            yield from iter(lambda: f.read(chunk_size), '')
+        return
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    elif isinstance(source, bytes):
+        source = io.BytesIO(source)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        # multi-byte characters can straddle chunk boundaries
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+
+def iter_table_rows(source, index=None, caption=None, header_rows=True, chunk_size=64 * 1024, split_cells=False):
+    """Yields one table's rows as tuples of cell text while the document streams in.
+
+    source is a file path as an os.PathLike (pathlib.Path), an HTML string
+    or bytes, or any file-like object (an HTTP response works). A plain str
+    is always markup, never a file name. With neither index nor caption, yields
+    (table number, row) pairs for every table. header_rows=False skips rows
+    that contain a <th>; split_cells=True yields a row's <th> and <td> cells
+    as separate rows. Stops reading once the chosen table has ended.
+    Only index=-1 is supported among negative indexes.
+    """
+    if index is not None and index < -1:
+        raise ValueError("Only index=-1 is supported among negative table indexes.")
+    parser = TableExtractor(index=index, caption=caption, header_rows=header_rows, split_cells=split_cells)
+    for chunk in _chunks(source, chunk_size):
+        parser.feed(chunk)
+        while parser.rows:
+            yield parser.rows.popleft()
+        if parser.done:
+            return
+    parser.finish()
+    while parser.rows:
+        yield parser.rows.popleft()
+
+
+class TableScanner(HTMLParser):
+    """One pass over a whole page noting, for every table, where it starts and
+    ends, its caption and its first row when that row has <th> cells."""
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.html = html
+        self.line_starts = [0]
+        position = html.find('\n')
+        while position != -1:
+            self.line_starts.append(position + 1)
+            position = html.find('\n', position + 1)
+        self.tables = []
+        self._stack = []      # [entry, first row cells or None, cell text or None, rows seen]
+        self._caption_text = None
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            entry = {'index': len(self.tables), 'caption': '', 'header': None,
+                     'start': self._offset(), 'end': None}
+            self.tables.append(entry)
+            self._stack.append([entry, None, None, 0])
+            return
+        if not self._stack:
+            return
+        state = self._stack[-1]
+        if tag == 'caption':
+            self._caption_text = []
+        elif tag == 'tr':
+            self._end_first_row(state)
+            state[3] += 1
+        elif tag in CELL_TAGS and state[3] <= 1:
+            state[3] = max(state[3], 1)
+            if state[1] is None:
+                state[1] = []
+            self._end_cell(state)
+            state[2] = []
+            if tag == 'th':
+                state[0]['header'] = ()
+
+    def handle_endtag(self, tag):
+        if not self._stack:
+            return
+        state = self._stack[-1]
+        if tag == 'caption' and self._caption_text is not None:
+            state[0]['caption'] = ' '.join(''.join(self._caption_text).split())
+            self._caption_text = None
+        elif tag in CELL_TAGS:
+            self._end_cell(state)
+        elif tag == 'tr':
+            self._end_first_row(state)
+        elif tag == 'table':
+            self._end_first_row(state)
+            offset = self._offset()
+            state[0]['end'] = self.html.find('>', offset) + 1 or len(self.html)
+            self._stack.pop()
+
+    def handle_data(self, data):
+        if self._caption_text is not None:
+            self._caption_text.append(data)
+        elif self._stack and self._stack[-1][2] is not None:
+            self._stack[-1][2].append(data)
+
+    def _end_cell(self, state):
+        if state[2] is not None:
+            state[1].append(' '.join(''.join(state[2]).split()))
+            state[2] = None
+
+    def _end_first_row(self, state):
+        self._end_cell(state)
+        if state[1] is not None:
+            if state[0]['header'] is not None:
+                state[0]['header'] = tuple(state[1])
+            state[1] = None
+
+    def scan(self):
+        self.feed(self.html)
+        self.close()
+        for state in reversed(self._stack):
+            self._end_first_row(state)
+            state[0]['end'] = len(self.html)
+        self._stack = []
+        return self.tables
+
+
+class IndexedTable:
+    """A table on an indexed page; its body rows are parsed on first access."""
+    __slots__ = ('index', 'caption', 'header', 'start', 'end', '_page', '_rows')
+
+    def __init__(self, page, index, caption, header, start, end):
+        self._page = page
+        self.index = index
+        self.caption = caption
+        self.header = tuple(header) if header is not None else None
+        self.start = start
+        self.end = end
+        self._rows = None
+
+    @property
+    def rows(self):
+        """Body rows: every row of the table except the header row."""
+        if self._rows is None:
+            rows = self.iter_rows()
+            if self.header is not None:
+                next(rows, None)
+            self._rows = list(rows)
+        return self._rows
+
+    def iter_rows(self, **options):
+        """Streams every row of the table from its own span; options go to iter_table_rows."""
+        return iter_table_rows(self._page.html[self.start:self.end], index=0, **options)
+
+    def __repr__(self):
+        return f"IndexedTable(index={self.index}, caption={self.caption!r})"
+
+
+class TableIndex:
+    """Every table on a page, parsed once and looked up by position or caption.
+
+    The scan result (captions, header rows and each table's character span)
+    is kept in cache_dir under the page's sha256, so indexing the same page
+    again reads a small JSON file instead of parsing. Body rows are only
+    parsed from a table's own span when .rows is first read.
+    """
+
+    def __init__(self, html, cache_dir=None):
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', errors='replace')
+        self.html = html
+        self.digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        self.cache_dir = cache_dir
+        self.from_cache = False
+        entries = self._load()
+        if entries is None:
+            entries = TableScanner(html).scan()
+            self._store(entries)
+        self.tables = [IndexedTable(self, **entry) for entry in entries]
+        self._captions = [(table.caption.lower(), table) for table in self.tables]
+
+    @classmethod
+    def from_file(cls, path, cache_dir=None):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return cls(f.read(), cache_dir)
+
+    def _cache_path(self):
+        return os.path.join(self.cache_dir, self.digest + '.json')
+
+    def _load(self):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path()) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.from_cache = True
+        return entries
+
+    def _store(self, entries):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.index-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self._cache_path())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __getitem__(self, index):
+        return self.tables[index]
+
+    def find(self, caption):
+        """The first table whose caption contains caption (case-insensitive), or None."""
+        caption = caption.lower()
+        return next((table for text, table in self._captions if caption in text), None)
+
+
+class TestTableStream(unittest.TestCase):
+    PAGE = """<html><body>
+    <table><caption>Other data</caption><tr><th>a</th></tr><tr><td>1</td></tr></table>
+    <TABLE><caption>CO2 emissions per capita</caption>
+      <tr><th>Country</th><th>Tonnes</th></tr>
+      <tr><td> Chad </td><td>0.1<br>2</td>
+      <tr><td>Qatar<table><tr><td>nested</td></tr></table></td><td>35&amp;9</td></tr>
+    </TABLE>
+    <table><tr><th>Year</th><td>2020</td></tr><tr><td>2021</td><td>x</td></tr></table>
+    </body></html>"""
+
+    def test_by_caption(self):
+        rows = list(iter_table_rows(self.PAGE, caption='emissions per capita', chunk_size=17))
+        self.assertEqual(rows, [('Country', 'Tonnes'), ('Chad', '0.12'), ('Qatar', '35&9')])
+
+    def test_by_index_including_nested(self):
+        self.assertEqual(list(iter_table_rows(self.PAGE, index=2)), [('nested',)])
+        self.assertEqual(list(iter_table_rows(self.PAGE, index=0)), [('a',), ('1',)])
+
+    def test_str_is_always_markup(self):
+        self.assertEqual(list(iter_table_rows('\ufeffCo2.html <table><tr><td>a</td></tr></table>', index=0)), [('a',)])
+        self.assertEqual(list(iter_table_rows('Co2.html', index=0)), [])
+
+    def test_split_cells(self):
+        rows = list(iter_table_rows(self.PAGE, index=3, split_cells=True))
+        self.assertEqual(rows, [('Year',), ('2020',), ('2021', 'x')])
+        self.assertEqual(list(TableIndex(self.PAGE)[3].iter_rows(split_cells=True)), rows)
+
+    def test_last_table_without_header_rows(self):
+        self.assertEqual(list(iter_table_rows(self.PAGE, index=-1, header_rows=False)), [('2021', 'x')])
+
+    def test_all_tables(self):
+        tagged = list(iter_table_rows(self.PAGE))
+        self.assertEqual([number for number, _ in tagged], [0, 0, 1, 1, 2, 1, 3, 3])
+
+    def test_table_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = TableIndex(self.PAGE, cache_dir=tmp)
+            self.assertFalse(index.from_cache)
+            self.assertEqual(len(index), 4)
+            table = index.find('EMISSIONS per')
+            self.assertEqual((table.index, table.header), (1, ('Country', 'Tonnes')))
+            self.assertEqual(table.rows, [('Chad', '0.12'), ('Qatar', '35&9')])
+            self.assertIsNone(index.find('missing'))
+            self.assertIsNone(index[2].header)
+            self.assertEqual(index[2].rows, [('nested',)])
+            self.assertEqual((index[3].header, index[3].rows), (('Year', '2020'), [('2021', 'x')]))
+
+            cached = TableIndex(self.PAGE.encode('utf-8'), cache_dir=tmp)
+            self.assertTrue(cached.from_cache)
+            self.assertEqual(cached.find('other').rows, [('1',)])
+
+    def test_co2_file(self):
+        rows = iter_table_rows(pathlib.Path(__file__).resolve().parent / 'Co2.html', index=0)
+        self.assertEqual(next(rows), ('# Total carbon emissions',))
+        next(rows)
+        self.assertEqual(next(rows)[:4], ('year', 'month', 'decimal', 'average'))
+        self.assertEqual(next(rows)[:4], ('1959', '1', '1959.042', '315.62'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,48 @@ from queue import Queue
 import sqlite3
 from tkinter import Tk, ttk
 import tkinter as tk
-from urllib.request import urlopen
-from bs4 import BeautifulSoup
+import time
+import math
+import bisect
+from array import array
+from itertools import islice
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import hashlib
+import json
+from tablestream import iter_table_rows
 import unittest
+import os
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # 1. WebScraper Class
+def parse_table_2(html):
+    """Reads the year and six gas columns from the last table on an AGGI-style page.
+
+    html may be a string, bytes or an open response; it is parsed as it
+    streams in, without building a document tree.
+    """
+    data = []
+    try:
+        for cells in iter_table_rows(html, index=-1, header_rows=False):
+            try:
+                year = int(cells[0])
+                gas_data = [float(cells[i].replace(',', '')) if cells[i] else 0.0 for i in range(1, 7)]
+                data.append([year] + gas_data)
+            except (ValueError, IndexError) as e:
+                print(f"Error converting cell data: {e}")
+                continue
+    except Exception as e:
+        print(f"Error parsing HTML content: {e}")
+        return []
+    if not data:
+        print("No table rows found on the webpage.")
+    return data
+
+
 class WebScraper:
     def __init__(self, url: str):
         self.url = url
@@ -19,41 +56,111 @@ class WebScraper:
         except Exception as e:
             print(f"Error accessing the URL: {e}")
             return []
+        return parse_table_2(response)
+
+
+# 1b. Concurrent scraper engine with an on-disk page cache
+class HTMLCache:
+    """Raw page bodies on disk, each with its ETag/Last-Modified and fetch time in a sidecar JSON file."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.html', base + '.json'
+
+    def load(self, url):
+        """Returns (body, metadata), or (None, {}) when the url has not been cached."""
+        body_path, meta_path = self._paths(url)
         try:
-            soup = BeautifulSoup(response, 'html.parser')
-        except Exception as e:
-            print(f"Error parsing HTML content: {e}")
-            return []
-        tables = soup.select('table')
-        if not tables:
-            print("No tables found on the webpage.")
-            return []
+            with open(meta_path) as f:
+                metadata = json.load(f)
+            with open(body_path, 'rb') as f:
+                return f.read(), metadata
+        except (OSError, ValueError):
+            return None, {}
+
+    def store(self, url, body, metadata):
+        body_path, meta_path = self._paths(url)
+        for path, content, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(metadata), 'w')):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+
+class ScraperEngine:
+    """Fetches many AGGI-style pages concurrently and parses them in worker processes.
+
+    At most max_fetchers downloads run at once. A cached page younger than
+    max_age seconds is reused without touching the network; an older one is
+    revalidated with If-None-Match/If-Modified-Since and reused on a 304.
+    """
+
+    def __init__(self, cache_dir="scraper_cache", max_fetchers=8, parse_workers=None, max_age=3600,
+                 timeout=30, parse=parse_table_2):
+        self.cache = HTMLCache(cache_dir)
+        self.max_fetchers = max_fetchers
+        self.parse_workers = parse_workers
+        self.max_age = max_age
+        self.timeout = timeout
+        self.parse = parse
+
+    def fetch(self, url):
+        """Returns the page body from the cache or the network; None when neither has it."""
+        body, metadata = self.cache.load(url)
+        if body is not None and time.time() - metadata.get("fetched_at", 0) < self.max_age:
+            return body
+
+        request = Request(url)
+        if body is not None:
+            if metadata.get("etag"):
+                request.add_header("If-None-Match", metadata["etag"])
+            if metadata.get("last_modified"):
+                request.add_header("If-Modified-Since", metadata["last_modified"])
         try:
-            emissionstable2_data = tables[-1]
-            rows = emissionstable2_data.find_all('tr')
+            with urlopen(request, timeout=self.timeout) as response:
+                fresh = response.read()
+                headers = response.headers
+        except HTTPError as e:
+            if e.code == 304 and body is not None:
+                metadata["fetched_at"] = time.time()
+                self.cache.store(url, body, metadata)
+                return body
+            print(f"Error accessing the URL {url}: {e}")
+            return body
         except Exception as e:
-            print(f"Error extracting data from table: {e}")
-            return []
-
-        data = []
-        for row in rows:
-            headers = row.find_all('th')
-            cells = row.find_all('td')
-
-            if headers:
-                continue
-            if cells:
+            print(f"Error accessing the URL {url}: {e}")
+            return body
+
+        self.cache.store(url, fresh, {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+        return fresh
+
+    def run(self, urls):
+        """Returns {url: rows} for every url; a page that could not be fetched or parsed maps to []."""
+        results = {url: [] for url in urls}
+        with ThreadPoolExecutor(max_workers=self.max_fetchers) as fetchers, \
+                ProcessPoolExecutor(max_workers=self.parse_workers) as parsers:
+            fetches = {fetchers.submit(self.fetch, url): url for url in results}
+            parses = {}
+            for future in as_completed(fetches):
+                body = future.result()
+                if body is not None:
+                    parses[parsers.submit(self.parse, body)] = fetches[future]
+            for future in as_completed(parses):
                 try:
-                    year = int(cells[0].text.strip())
-                    gas_data = [
-                        float(cells[i].text.strip().replace(',', '')) if cells[i].text.strip() else 0.0
-                        for i in range(1, 7)
-                    ]
-                    data.append([year] + gas_data)
-                except ValueError as e:
-                    print(f"Error converting cell data: {e}")
-                    continue
-        return data
+                    results[parses[future]] = future.result()
+                except Exception as e:
+                    print(f"Error parsing {parses[future]}: {e}")
+        return results
 
 
 # 2. SqliteDB Class
@@ -63,6 +170,13 @@ class SqliteDB:
             self.db_name = db_name
             self.conn = sqlite3.connect(db_name, check_same_thread=False)
             self.cursor = self.conn.cursor()
+            # read-through cache of get_year_data results; the lock guards the
+            # shared connection and is only taken on a cache miss or a write
+            self.year_cache = {}
+            self.db_lock = threading.RLock()
+            self.stats_lock = threading.Lock()     # guards the two counters, so hits stay off db_lock
+            self.cache_hits = 0
+            self.cache_misses = 0
             self.create_table()
         except sqlite3.Error as e:
             print(f"Error connecting to SQLite database: {e}")
@@ -86,21 +200,103 @@ class SqliteDB:
 
     def insert_data(self, data):
         try:
-            for row in data:
-                self.cursor.execute('''INSERT OR REPLACE INTO greenhouse_data 
-                                        (year, CO2, CH4, N2O, CFCs, HCFCs, HFCs)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?)''', row)
-            self.conn.commit()
+            self.bulk_insert(data)
         except sqlite3.Error as e:
             print(f"Error inserting data into the database: {e}")
 
+    @contextmanager
+    def load_pragmas(self):
+        """Trades durability for speed while a bulk load runs, then restores the settings."""
+        synchronous = self.conn.execute("PRAGMA synchronous").fetchone()[0]
+        cache_size = self.conn.execute("PRAGMA cache_size").fetchone()[0]
+        temp_store = self.conn.execute("PRAGMA temp_store").fetchone()[0]
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        try:
+            yield
+        finally:
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+            self.conn.execute(f"PRAGMA cache_size={cache_size}")
+            self.conn.execute(f"PRAGMA temp_store={temp_store}")
+
+    def bulk_insert(self, rows, batch_size=10000, report=False):
+        """Inserts any iterable of (year, CO2, CH4, N2O, CFCs, HCFCs, HFCs) rows.
+
+        Rows are consumed lazily, batch_size at a time, each batch in its own
+        transaction. Returns the number of rows and the rows/sec achieved.
+        """
+        rows = iter(rows)
+        total = 0
+        start = time.perf_counter()
+        with self.db_lock, self.load_pragmas():
+            if self.conn.in_transaction:
+                self.conn.commit()
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self.conn.execute("BEGIN")
+                try:
+                    self.conn.executemany('''INSERT OR REPLACE INTO greenhouse_data 
+                                            (year, CO2, CH4, N2O, CFCs, HCFCs, HFCs)
+                                            VALUES (?, ?, ?, ?, ?, ?, ?)''', batch)
+                    self.conn.commit()
+                except sqlite3.Error:
+                    self.conn.rollback()
+                    raise
+                finally:
+                    for row in batch:
+                        self.year_cache.pop(row[0], None)
+                total += len(batch)
+        elapsed = time.perf_counter() - start
+        rows_per_sec = total / elapsed if elapsed else 0.0
+        if report:
+            print(f"Inserted {total} rows in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+        return total, rows_per_sec
+
     def get_year_data(self, year):
         try:
-            self.cursor.execute('SELECT CO2, CH4, N2O, CFCs, HCFCs, HFCs FROM greenhouse_data WHERE year = ?', (year,))
-            return self.cursor.fetchone()
-        except sqlite3.Error as e:
-            print(f"Error retrieving data for year {year}: {e}")
-            return None
+            row = self.year_cache[year]
+            self._count_hit()
+            return row
+        except KeyError:
+            pass
+        with self.db_lock:
+            if year in self.year_cache:
+                self._count_hit()
+                return self.year_cache[year]
+            try:
+                self.cursor.execute('SELECT CO2, CH4, N2O, CFCs, HCFCs, HFCs FROM greenhouse_data WHERE year = ?', (year,))
+                row = self.cursor.fetchone()
+            except sqlite3.Error as e:
+                print(f"Error retrieving data for year {year}: {e}")
+                return None
+            with self.stats_lock:
+                self.cache_misses += 1
+            self.year_cache[year] = row
+            return row
+
+    def _count_hit(self):
+        with self.stats_lock:
+            self.cache_hits += 1
+
+    def get_range(self, start_year, end_year):
+        """Loads every year from start_year to end_year in one query and caches them all.
+
+        Returns a dict of year -> (CO2, CH4, N2O, CFCs, HCFCs, HFCs) for the years present.
+        """
+        with self.db_lock:
+            try:
+                self.cursor.execute('SELECT year, CO2, CH4, N2O, CFCs, HCFCs, HFCs FROM greenhouse_data '
+                                    'WHERE year BETWEEN ? AND ? ORDER BY year', (start_year, end_year))
+                rows = {row[0]: row[1:] for row in self.cursor.fetchall()}
+            except sqlite3.Error as e:
+                print(f"Error retrieving data for years {start_year}-{end_year}: {e}")
+                return {}
+            for year in range(start_year, end_year + 1):
+                self.year_cache[year] = rows.get(year)
+            return rows
         
     def select_all(self):
         return self.query_builder.select(self.table_name).execute(self.conn)
@@ -119,7 +315,6 @@ class SqliteDB:
 class Server:
     def __init__(self, db: SqliteDB):
         self.db = db
-        self.lock = threading.Lock()
 
     def start_server(self):
         self.server_socket.bind((self.host, self.port))
@@ -132,12 +327,18 @@ class Server:
             threading.Thread(target=self.handle_request, args=(client_socket,)).start()
 
     def handle_request(self, year):
-        with self.lock:
-            try:
-                return self.db.get_year_data(year)
-            except Exception as e:
-                print(f"Error handling request for year {year}: {e}")
-                return None
+        try:
+            return self.db.get_year_data(year)
+        except Exception as e:
+            print(f"Error handling request for year {year}: {e}")
+            return None
+
+    def handle_range(self, start_year, end_year):
+        try:
+            return self.db.get_range(start_year, end_year)
+        except Exception as e:
+            print(f"Error handling request for years {start_year}-{end_year}: {e}")
+            return {}
 
 
 # 4. Client Class
@@ -162,8 +363,160 @@ class Client(threading.Thread):
         print(f"Client {self.gas_index} finished.")
 
 
+def run_clients(server, result_queue, gas_count=6, start_year=1979, end_year=2022):
+    """Warms the year cache with one range query, then runs a Client per gas and waits for them all.
+
+    The clients' per-year reads are then cache hits that never take the database lock.
+    """
+    server.handle_range(start_year, end_year)
+    clients = [Client(server, gas_index, result_queue, start_year, end_year) for gas_index in range(gas_count)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return clients
+
+
+# 4b. Pluggable client phase: per-gas analytics on threads, processes or inline
+def rolling_mean(values, window):
+    """Trailing mean over up to `window` values, computed from a running sum.
+
+    Missing readings (NaN) are left out of the sum; a window with none
+    present gives NaN.
+    """
+    means = array('d')
+    total = 0.0
+    present = 0
+    for i, value in enumerate(values):
+        if not math.isnan(value):
+            total += value
+            present += 1
+        if i >= window and not math.isnan(values[i - window]):
+            total -= values[i - window]
+            present -= 1
+        means.append(total / present if present else math.nan)
+    return means
+
+
+def growth_rates(values):
+    """Percent change from the previous value; NaN where either is missing or the previous value is zero."""
+    rates = array('d', [math.nan]) if values else array('d')
+    for previous, current in zip(values, values[1:]):
+        usable = previous and not math.isnan(previous) and not math.isnan(current)
+        rates.append((current - previous) / previous * 100 if usable else math.nan)
+    return rates
+
+
+def trend_slope(years, values):
+    """Least-squares slope of values against years, over the years with a reading."""
+    points = [(x, y) for x, y in zip(years, values) if not math.isnan(y)]
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return sxy / sxx if sxx else 0.0
+
+
+def anomalies(years, values, means, threshold=3.0):
+    """Years whose value strays more than threshold standard deviations from its rolling mean.
+
+    Years without a reading are never anomalies and do not count towards the spread.
+    """
+    residuals = [(year, value - mean) for year, value, mean in zip(years, values, means)
+                 if not math.isnan(value - mean)]
+    if not residuals:
+        return array('i')
+    spread = math.sqrt(sum(r * r for _, r in residuals) / len(residuals))
+    return array('i', [year for year, r in residuals if spread and abs(r) > threshold * spread])
+
+
+def analyze_gas(gas_index, years, values, window=5):
+    """Per-gas analytics; takes and returns compact arrays so it is cheap to send to a process."""
+    means = rolling_mean(values, window)
+    return gas_index, {
+        "rolling_mean": means,
+        "growth_rate": growth_rates(values),
+        "trend_slope": trend_slope(years, values),
+        "anomalies": anomalies(years, values, means),
+    }
+
+
+class InlineExecutor(Executor):
+    """Runs each submitted call immediately in the calling thread."""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor, "inline": InlineExecutor}
+
+
+class ClientPhase:
+    """Fetches the year range once, then fans the per-gas work out on the chosen executor.
+
+    mode is "thread", "process" or "inline". Each gas's rows travel to its
+    worker as an array('i') of years and an array('d') of values, with NaN
+    for a missing reading; missing readings are not put on result_queue.
+    """
+
+    def __init__(self, server, result_queue=None, gas_count=6, mode="thread", max_workers=None,
+                 window=5, start_year=1979, end_year=2022):
+        if mode not in EXECUTORS:
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.server = server
+        self.result_queue = result_queue
+        self.gas_count = gas_count
+        self.mode = mode
+        self.max_workers = max_workers
+        self.window = window
+        self.start_year = start_year
+        self.end_year = end_year
+
+    def gas_arrays(self, rows):
+        years = array('i', sorted(rows))
+        columns = [array('d') for _ in range(self.gas_count)]
+        for year in years:
+            for column, value in zip(columns, rows[year]):
+                column.append(math.nan if value is None else value)
+        return years, columns
+
+    def run(self):
+        rows = self.server.handle_range(self.start_year, self.end_year)
+        years, columns = self.gas_arrays(rows)
+        if self.result_queue is not None:
+            for gas_index, values in enumerate(columns):
+                for year, value in zip(years, values):
+                    if not math.isnan(value):
+                        self.result_queue.put((year, gas_index, value))
+        results = {}
+        with EXECUTORS[self.mode](max_workers=self.max_workers) as executor:
+            futures = [executor.submit(analyze_gas, gas_index, years, values, self.window)
+                       for gas_index, values in enumerate(columns)]
+            for future in as_completed(futures):
+                try:
+                    gas_index, analysis = future.result()
+                    results[gas_index] = analysis
+                except Exception as e:
+                    print(f"Error analyzing gas data: {e}")
+        return results
+
+
 # 5. GreenhouseUI Class
 class GreenhouseUI:
+    # queue items handled per tick; the rest wait for the next tick so Tk stays responsive
+    POLL_BATCH = 500
+
     def __init__(self, root, result_queue, gases):
         self.root = root
         self.result_queue = result_queue
@@ -179,31 +532,38 @@ class GreenhouseUI:
         for gas in self.gases:
             tab = ttk.Frame(self.notebook)
             self.notebook.add(tab, text=gas)
-            self.tabs[gas] = {"frame": tab, "data": {}}
+            tree = ttk.Treeview(tab, columns=("year", "value"), show="headings")
+            tree.heading("year", text="Year")
+            tree.heading("value", text=gas)
+            tree.column("year", anchor="w", width=80)
+            tree.column("value", anchor="w", width=120)
+            scrollbar = ttk.Scrollbar(tab, orient="vertical", command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side="left", expand=True, fill="both")
+            scrollbar.pack(side="right", fill="y")
+            self.tabs[gas] = {"frame": tab, "tree": tree, "data": {}, "years": []}
 
     def poll_queue(self):
-        while not self.result_queue.empty():
+        handled = 0
+        while handled < self.POLL_BATCH:
             try:
                 year, gas_index, value = self.result_queue.get_nowait()
-                gas_name = self.gases[gas_index]
-                tab_info = self.tabs[gas_name]
-
-                if year not in tab_info["data"]:
-                    tab_info["data"][year] = value
-                    self.update_tab(tab_info["frame"], tab_info["data"])
             except queue.Empty:
-                pass
+                break
+            handled += 1
+            tab_info = self.tabs[self.gases[gas_index]]
+            if year not in tab_info["data"]:
+                tab_info["data"][year] = value
+                self.add_row(tab_info, year, value)
 
-        self.root.after(100, self.poll_queue)
+        # come straight back while a backlog remains, otherwise idle-poll
+        self.root.after(1 if handled == self.POLL_BATCH else 100, self.poll_queue)
 
-    def update_tab(self, tab, data):
-        for widget in tab.winfo_children():
-            widget.destroy()
-
-        sorted_data = sorted(data.items())
-        for i, (year, value) in enumerate(sorted_data):
-            tk.Label(tab, text=f"{year}", fg="black").grid(row=i, column=0, padx=5, pady=2, sticky="w")
-            tk.Label(tab, text=f"{value:.3f}", fg="black").grid(row=i, column=1, padx=5, pady=2, sticky="w")
+    def add_row(self, tab_info, year, value):
+        """Inserts one year at its sorted position; existing rows are left alone."""
+        index = bisect.bisect(tab_info["years"], year)
+        tab_info["years"].insert(index, year)
+        tab_info["tree"].insert("", index, iid=str(year), values=(year, f"{value:.3f}"))
 
 
 def main():
@@ -218,9 +578,10 @@ def main():
     server = Server(sqlite_db)
     result_queue = queue.Queue()
 
-    clients = [Client(server, gas_index, result_queue) for gas_index in range(6)]
-    for client in clients:
-        client.start()
+    # mode can be "thread", "process" or "inline"
+    phase = ClientPhase(server, result_queue, mode="thread")
+    client_thread = threading.Thread(target=phase.run, daemon=True)
+    client_thread.start()
 
     root = Tk()
     root.title("Greenhouse Gas Data")
@@ -228,8 +589,7 @@ def main():
     app = GreenhouseUI(root, result_queue, ["CO2", "CH4", "N2O", "CFCs", "HCFCs", "HFCs"])
     root.mainloop()
 
-    for client in clients:
-        client.join()
+    client_thread.join()
 
 if __name__ == "__main__":
     main()
@@ -280,5 +640,195 @@ class TestGreenhouseSystem(unittest.TestCase):
 
         self.assertFalse(self.result_queue.empty(), "Result queue should not be empty after thread execution.")
 
+class TestYearCache(unittest.TestCase):
+    def setUp(self):
+        self.db_name = "test_cache_greenhouse.db"
+        self.sqlite_db = SqliteDB(self.db_name)
+        self.sqlite_db.insert_data([(year, 1.0, 2.0, 3.0, 4.0, 5.0, float(year)) for year in range(1979, 2023)])
+
+    def tearDown(self):
+        self.sqlite_db.close()
+        os.remove(self.db_name)
+
+    def test_repeated_reads_hit_cache(self):
+        server = Server(self.sqlite_db)
+        result_queue = Queue()
+        calls = []
+        handle_range = server.handle_range
+        server.handle_range = lambda *years: calls.append(years) or handle_range(*years)
+        run_clients(server, result_queue)
+        self.assertEqual(calls, [(1979, 2022)])
+        self.assertEqual(result_queue.qsize(), 6 * 44)
+        self.assertEqual(self.sqlite_db.cache_misses, 0)
+        self.assertEqual(self.sqlite_db.cache_hits, 6 * 44)
+
+    def test_get_range_and_invalidation(self):
+        rows = self.sqlite_db.get_range(2000, 2030)
+        self.assertEqual(sorted(rows), list(range(2000, 2023)))
+        self.assertIsNone(self.sqlite_db.get_year_data(2025))
+        self.sqlite_db.insert_data([(2025, 1.0, 2.0, 3.0, 4.0, 5.0, 9.5), (2000, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)])
+        self.assertEqual(self.sqlite_db.get_year_data(2025)[-1], 9.5)
+        self.assertEqual(self.sqlite_db.get_year_data(2000)[0], 0.0)
+
+
+class TestClientPhase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = "test_phase_greenhouse.db"
+        self.sqlite_db = SqliteDB(self.db_name)
+        self.sqlite_db.insert_data([(year, 1.0 + i, 2.0, 3.0 * i, 4.0, 5.0, 0.0)
+                                    for i, year in enumerate(range(1979, 2023))])
+        self.server = Server(self.sqlite_db)
+
+    def tearDown(self):
+        self.sqlite_db.close()
+        os.remove(self.db_name)
+
+    def test_modes_agree(self):
+        results = {}
+        for mode in ("inline", "thread", "process"):
+            result_queue = Queue()
+            results[mode] = ClientPhase(self.server, result_queue, mode=mode, max_workers=2).run()
+            self.assertEqual(result_queue.qsize(), 6 * 44)
+        self.assertEqual(results["inline"][0]["rolling_mean"], results["process"][0]["rolling_mean"])
+        self.assertAlmostEqual(results["thread"][0]["trend_slope"], 1.0)
+        self.assertAlmostEqual(results["inline"][2]["trend_slope"], 3.0)
+
+    def test_analytics(self):
+        self.assertEqual(list(rolling_mean([1.0, 2.0, 3.0, 4.0], 2)), [1.0, 1.5, 2.5, 3.5])
+        rates = growth_rates(array('d', [0.0, 2.0, 3.0]))
+        self.assertTrue(math.isnan(rates[0]) and math.isnan(rates[1]))
+        self.assertAlmostEqual(rates[2], 50.0)
+        years = array('i', range(20))
+        values = array('d', [1.0] * 19 + [50.0])
+        self.assertEqual(list(anomalies(years, values, rolling_mean(values, 5), threshold=2.0)), [19])
+
+    def test_missing_readings_are_nan(self):
+        self.sqlite_db.insert_data([(1980, None, 2.0, 3.0, 4.0, 5.0, 0.0)])
+        result_queue = Queue()
+        phase = ClientPhase(self.server, result_queue, mode="inline")
+        years, columns = phase.gas_arrays(self.server.handle_range(1979, 1982))
+        self.assertTrue(math.isnan(columns[0][1]))
+        self.assertEqual(list(rolling_mean(columns[0], 2))[:3], [1.0, 1.0, 3.0])
+        rates = growth_rates(columns[0])
+        self.assertTrue(math.isnan(rates[1]) and math.isnan(rates[2]))
+        self.assertAlmostEqual(trend_slope(years, columns[0]), 1.0)
+        results = phase.run()
+        self.assertAlmostEqual(results[0]["trend_slope"], 1.0)
+        self.assertEqual(result_queue.qsize(), 6 * 44 - 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            ClientPhase(self.server, mode="gpu")
+
+
+class TestGreenhouseUI(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = Tk()
+        except tk.TclError:
+            self.skipTest("no display available for Tk")
+        self.root.withdraw()
+        self.result_queue = Queue()
+        self.ui = GreenhouseUI(self.root, self.result_queue, ["CO2", "CH4"])
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_rows_inserted_in_year_order(self):
+        for year in (2001, 1999, 2000, 1999):
+            self.result_queue.put((year, 0, float(year)))
+        self.ui.poll_queue()
+        tree = self.ui.tabs["CO2"]["tree"]
+        self.assertEqual(tree.get_children(), ("1999", "2000", "2001"))
+
+    def test_poll_is_bounded(self):
+        for year in range(GreenhouseUI.POLL_BATCH + 10):
+            self.result_queue.put((year, 1, 1.0))
+        self.ui.poll_queue()
+        self.assertEqual(self.result_queue.qsize(), 10)
+
+
+class AGGIFixtureHandler(BaseHTTPRequestHandler):
+    """Serves small AGGI-style pages with ETags, standing in for NOAA."""
+    requests_seen = []
+
+    def do_GET(self):
+        AGGIFixtureHandler.requests_seen.append(self.path)
+        etag = f'"{self.path}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = int(self.path.strip('/') or 1979)
+        rows = ''.join(f"<tr><td>{year}</td>" + "<td>1,234.5</td>" * 5 + "<td></td></tr>"
+                       for year in range(start, start + 3))
+        body = f"<html><table><tr><td>x</td></tr></table><table><tr><th>Year</th></tr>{rows}</table></html>"
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestScraperEngine(unittest.TestCase):
+    def setUp(self):
+        AGGIFixtureHandler.requests_seen = []
+        self.httpd = ThreadingHTTPServer(('localhost', 0), AGGIFixtureHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.base = f"http://localhost:{self.httpd.server_address[1]}"
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.cache_dir.cleanup()
+
+    def test_concurrent_fetch_and_parse(self):
+        urls = [f"{self.base}/{start}" for start in (1979, 1990, 2000, 2010)]
+        results = ScraperEngine(self.cache_dir.name, max_fetchers=4, parse_workers=2).run(urls)
+        self.assertEqual(results[urls[1]][0], [1990, 1234.5, 1234.5, 1234.5, 1234.5, 1234.5, 0.0])
+        self.assertTrue(all(len(rows) == 3 for rows in results.values()))
+
+    def test_cache_freshness_and_revalidation(self):
+        url = f"{self.base}/1979"
+        ScraperEngine(self.cache_dir.name).run([url])
+        ScraperEngine(self.cache_dir.name).run([url])
+        self.assertEqual(len(AGGIFixtureHandler.requests_seen), 1)
+
+        results = ScraperEngine(self.cache_dir.name, max_age=0).run([url])
+        self.assertEqual(len(AGGIFixtureHandler.requests_seen), 2)
+        self.assertEqual(len(results[url]), 3)
+
+    def test_unreachable_url(self):
+        self.assertEqual(ScraperEngine(self.cache_dir.name, timeout=2).run(["http://localhost:1/"]),
+                         {"http://localhost:1/": []})
+
+
+class TestBulkInsert(unittest.TestCase):
+    def setUp(self):
+        self.db_name = "test_bulk_greenhouse.db"
+        self.sqlite_db = SqliteDB(self.db_name)
+
+    def tearDown(self):
+        self.sqlite_db.close()
+        os.remove(self.db_name)
+
+    def test_bulk_insert_generator(self):
+        rows = ((year, 1.0, 2.0, 3.0, 4.0, 5.0, float(year)) for year in range(1000, 3500))
+        count, rows_per_sec = self.sqlite_db.bulk_insert(rows, batch_size=1000)
+        self.assertEqual(count, 2500)
+        self.assertGreater(rows_per_sec, 0)
+        self.assertEqual(self.sqlite_db.get_year_data(3499)[-1], 3499.0)
+
+    def test_failed_batch_rolls_back(self):
+        rows = [(1979, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0), (1980, 1.0)]
+        with self.assertRaises(sqlite3.Error):
+            self.sqlite_db.bulk_insert(rows)
+        self.assertIsNone(self.sqlite_db.get_year_data(1979))
+        self.assertEqual(self.sqlite_db.conn.execute("PRAGMA synchronous").fetchone()[0], 2)
+        self.assertEqual(self.sqlite_db.conn.execute("PRAGMA temp_store").fetchone()[0], 0)
+
 if __name__ == "__main__":
     unittest.main()
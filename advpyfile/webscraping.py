@@ -1,50 +1,37 @@
 from urllib.request import urlopen
-from bs4 import BeautifulSoup
 from collections import defaultdict
+import sys
+from tablestream import TableIndex
 
 url = 'https://en.wikipedia.org/wiki/List_of_countries_by_carbon_dioxide_emissions_per_capita'
-response = urlopen(url)
-soup = BeautifulSoup(response, 'html.parser')
+CACHE_DIR = 'table_index_cache'
 
-def findTag(wpage, tag):
-    return wpage.select(tag)
 
-tables = findTag(soup, 'table')
+def load_page(source):
+    """Indexes a saved page (file path) or the live url; scans are cached by content hash."""
+    if source.startswith(('http://', 'https://')):
+        with urlopen(source) as response:
+            return TableIndex(response.read(), cache_dir=CACHE_DIR)
+    return TableIndex.from_file(source, cache_dir=CACHE_DIR)
 
-emmisionstable_data = [] # stores data for the emissions per capita table
 
-for table in tables:
-    caption = table.select_one('caption')
-    if caption and 'emissions per capita' in caption.text.lower():
-        rows = table.select('tr') 
-        for row in rows:
-            headers = row.select('th') 
-            cells = row.select('td')
-            if headers:
-                emmisionstable_data.append([header.text.strip() for header in headers])
-            if cells:
-                emmisionstable_data.append([cell.text.strip() for cell in cells])
-        break  
+def table_content(table):
+    """Each row's <th> texts and <td> texts as separate lists, header cells first."""
+    return [list(row) for row in table.iter_rows(split_cells=True)]
+
+
+page = load_page(sys.argv[1] if len(sys.argv) > 1 else url)
+
+emissions_table = page.find('emissions per capita')
+emmisionstable_data = table_content(emissions_table) if emissions_table else [] # stores data for the emissions per capita table
 
 print("Here are the contents of the emissions per capita table. \n")
 print(emmisionstable_data)
 
-tables = findTag(soup, 'table')
-
 tag_dict = defaultdict(lambda: "there is no such table") #dict for all tables + their contents
 
-for i, table in enumerate(tables):
-    key = f'table{i}'  
-    rows = table.select('tr') 
-    table_content = [] 
-    for row in rows:
-        headers = row.select('th')  
-        cells = row.select('td') 
-        if headers:
-            table_content.append([header.text.strip() for header in headers])
-        if cells:
-            table_content.append([cell.text.strip() for cell in cells])
-    tag_dict[key] = table_content
+for table in page:
+    tag_dict[f'table{table.index}'] = table_content(table)
 
 print("\n\n\n Here is dictionary of all the contents in each table\n")
 print(tag_dict)